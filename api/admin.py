@@ -1,3 +1,37 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CacheVersion, RegionRollup, SlowQuery
+
+
+@admin.register(RegionRollup)
+class RegionRollupAdmin(admin.ModelAdmin):
+    list_display = ('name', 'level', 'children', 'completed', 'defaulters', 'doses', 'updated_at')
+    list_filter = ('level',)
+    search_fields = ('name',)
+
+
+@admin.register(CacheVersion)
+class CacheVersionAdmin(admin.ModelAdmin):
+    list_display = ('namespace', 'version', 'updated_at')
+    readonly_fields = ('namespace', 'version', 'updated_at')
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'duration_ms', 'view', 'caller', 'database', 'has_plan')
+    list_filter = ('database', 'view')
+    search_fields = ('sql', 'caller', 'view', 'path')
+    date_hierarchy = 'created_at'
+    readonly_fields = ('created_at', 'duration_ms', 'database', 'view', 'path', 'caller',
+                       'sql', 'params', 'many', 'stack', 'plan')
+    fields = readonly_fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(boolean=True, description="EXPLAIN")
+    def has_plan(self, obj):
+        return bool(obj.plan)
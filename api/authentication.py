@@ -0,0 +1,87 @@
+"""
+مصادقة التوكن مع كاش قصير: token ← المستخدم + مركزه في قراءة واحدة من الكاش.
+
+TokenAuthentication الأصلية تنفذ استعلام (token + user) مع كل طلب، ثم تحمّل الصلاحيات
+(IsCenterStaffOrReadOnly) والـ views المركز user.health_center باستعلام آخر.
+هنا يُحمّل التوكن مع user و user.health_center مرة واحدة (select_related) ويُخزن
+لمدة AUTH_CACHE_SECONDS في كاش الـ API (api/cache.py).
+
+الإبطال (api/signals.py) — يرى كل العمال التغيير خلال CACHE_VERSION_CHECK_SECONDS:
+- لكل مستخدم (invalidate_user): تعطيله أو تغيير دوره أو مركزه، حذفه، حذف توكنه (تسجيل الخروج).
+  نسخة المستخدم (مجموعة 'auth:<user_id>') تُخزن مع التوكن وتُقارن عند القراءة —
+  حفظ مستخدم لا يبطل توكنات بقية المستخدمين.
+- للكل (مجموعة 'auth'): تعطيل مركز أو حذفه — نادر.
+صفوف نسخ المستخدمين تُحذف بعد USER_VERSION_TTL (كل التوكنات المخزنة قبلها انتهت صلاحيتها).
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import bump_version, cache_get, get_cache, get_version, make_key
+
+AUTH_NAMESPACE = 'auth'
+DEFAULT_TIMEOUT = 60
+
+
+def user_namespace(user_id):
+    return f"{AUTH_NAMESPACE}:{user_id}"
+
+
+def _timeout():
+    return getattr(settings, 'AUTH_CACHE_SECONDS', DEFAULT_TIMEOUT)
+
+
+def invalidate_user(user_id):
+    """إبطال التوكنات المخزنة لمستخدم واحد (بعد نجاح الـ transaction)"""
+    from .models import CacheVersion
+
+    bump_version(user_namespace(user_id))
+    # نسخة أقدم من ضعف مدة الكاش لا يوجد توكن مخزن يقارن بها — حذفها يبقي جدول النسخ صغيراً
+    horizon = timezone.now() - datetime.timedelta(seconds=2 * _timeout() + 60)
+    CacheVersion.objects.filter(namespace__startswith=f"{AUTH_NAMESPACE}:", updated_at__lt=horizon).delete()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """بديل TokenAuthentication (نفس الترويسة: Authorization: Token <key>)"""
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        # المفتاح بصمة التوكن لا التوكن نفسه (لا يظهر في مفاتيح redis مثلاً)
+        cache_key = make_key(AUTH_NAMESPACE, (hashlib.sha256(key.encode()).hexdigest(),))
+
+        # (token، نسخة المستخدم عند التخزين). None يُخزن أيضاً حتى لا تضرب التوكنات الخاطئة
+        # قاعدة البيانات مع كل محاولة
+        entry = cache_get(AUTH_NAMESPACE, cache_key)
+        if not isinstance(entry, tuple):
+            entry = self._load(model, key)
+            get_cache().set(cache_key, entry, timeout=_timeout())
+        elif entry[0] is not None and entry[1] != get_version(user_namespace(entry[0].user_id)):
+            entry = self._load(model, key, entry[0].user_id)
+            get_cache().set(cache_key, entry, timeout=_timeout())
+
+        token = entry[0]
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
+
+    @staticmethod
+    def _load(model, key, user_id=None):
+        """
+        (token، نسخة المستخدم). النسخة تُقرأ قبل بيانات المستخدم: إبطال يحدث أثناء القراءة
+        يُكتشف في الطلب التالي بدل تخزين بيانات قديمة مع النسخة الجديدة.
+        """
+        if user_id is None:
+            # صاحب التوكن لا يتغير — يُعرف من الكاش عند إعادة القراءة
+            user_id = model.objects.filter(key=key).values_list('user_id', flat=True).first()
+            if user_id is None:
+                return (None, None)
+        version = get_version(user_namespace(user_id))
+        token = model.objects.select_related('user', 'user__health_center').filter(key=key).first()
+        return (token, version)
@@ -0,0 +1,230 @@
+"""
+قياس أداء الـ endpoints الأكثر استخداماً عبر Django test client (أمر benchmark).
+
+لكل سيناريو: زمن الاستجابة p50 / p95 / المتوسط، عدد الاستعلامات، وذروة الذاكرة.
+النتائج تُحفظ كخط أساس (baseline) بصيغة JSON وتُقارن بها التشغيلات التالية؛
+أي تراجع يتجاوز النسبة المسموحة يُعتبر regression.
+
+- يُشغّل على بيانات مولدة (generate_synthetic_data) — المقارنة صالحة فقط على نفس الحجم.
+- الذاكرة تُقاس في تكرار منفصل (tracemalloc يبطئ التنفيذ) حتى لا تتأثر الأزمنة.
+- التشغيل كله داخل transaction يُلغى في النهاية: مستخدم القياس (benchmark-ministry) وما تكتبه
+  السيناريوهات (send_reminders) لا يبقى في قاعدة البيانات.
+- FCM في وضع المحاكاة أثناء القياس (initialize_firebase معطلة) — لا تُرسل إشعارات حقيقية،
+  وتبقى كتابة NotificationLog ضمن القياس.
+
+    from api.benchmarks import run, compare
+    results = run(iterations=20)
+    regressions = compare(results, baseline, threshold=0.2)
+"""
+import io
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from centers.models import HealthCenter
+from medical.models import Child, VaccineRecord
+
+from .cache import get_cache
+
+BENCHMARK_USER = 'benchmark-ministry'
+
+# (الاسم، النوع، الهدف، المستخدم) — الهدف مسار GET أو اسم أمر إدارة.
+# {child_id} و {center_id}: طفل ومركز من البيانات (أكبر مركز).
+SCENARIOS = (
+    ('children_list', 'get', '/api/children/', 'ministry'),
+    ('children_list_staff', 'get', '/api/children/', 'staff'),
+    ('child_detail', 'get', '/api/children/{child_id}/', 'ministry'),
+    ('dashboard_stats', 'get', '/api/dashboard/stats/', 'ministry'),
+    ('dashboard_stats_staff', 'get', '/api/dashboard/stats/', 'staff'),
+    ('health_centers', 'get', '/api/health-centers/', 'ministry'),
+    ('reports_by_center', 'get', '/api/reports/by-center/', 'ministry'),
+    ('all_vaccines_coverage', 'get', '/api/reports/all-vaccines-coverage/', 'ministry'),
+    ('dose_coverage', 'get', '/api/reports/dose-coverage/', 'ministry'),
+    ('cohort_coverage', 'get', '/api/reports/cohort-coverage/', 'ministry'),
+    ('send_reminders', 'command', 'send_reminders', None),
+)
+
+# المقاييس التي تُقارن بخط الأساس (الأعلى = أسوأ)
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb')
+# فروق صغيرة جداً بالقيمة المطلقة لا تُعتبر تراجعاً مهما كانت نسبتها
+MIN_ABSOLUTE_DIFF = {'p50_ms': 2.0, 'p95_ms': 5.0, 'queries': 0, 'peak_memory_kb': 256}
+
+
+def percentile(values, pct):
+    """الرتبة الأقرب (nearest-rank) — بدون استيفاء"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def dataset_info():
+    """حجم البيانات (لمعرفة هل المقارنة بخط الأساس صالحة)"""
+    return {
+        'children': Child.objects.count(),
+        'records': VaccineRecord.objects.count(),
+        'centers': HealthCenter.objects.count(),
+    }
+
+
+def _client_kwargs():
+    hosts = [h for h in settings.ALLOWED_HOSTS if h != '*']
+    if '*' in settings.ALLOWED_HOSTS or not hosts or 'testserver' in hosts:
+        return {}
+    return {'HTTP_HOST': hosts[0].lstrip('.')}
+
+
+class Fixtures:
+    """المستخدمون والمعرفات التي تحتاجها السيناريوهات (تُنشأ داخل transaction run() الملغى)"""
+
+    def __init__(self):
+        User = get_user_model()
+        center = HealthCenter.objects.annotate(n=Count('children')).order_by('-n', 'id').first()
+        if center is None:
+            raise ValueError("no health centers — run generate_synthetic_data first")
+        child = Child.objects.filter(health_center=center).order_by('id').first()
+        if child is None:
+            raise ValueError("no children — run generate_synthetic_data first")
+
+        # is_staff لتقارير الإدارة (IsAdminUser) مثل reports/by-center
+        ministry, _ = User.objects.update_or_create(
+            username=BENCHMARK_USER,
+            defaults={'role': 'MINISTRY', 'is_staff': True, 'is_active': True},
+            create_defaults={'role': 'MINISTRY', 'is_staff': True, 'password': UNUSABLE_PASSWORD_PREFIX},
+        )
+        staff = User.objects.filter(health_center=center, role='CENTER_STAFF', is_active=True).order_by('id').first()
+        self.users = {'ministry': ministry, 'staff': staff}
+        self.params = {'child_id': child.id, 'center_id': center.id}
+
+    def client(self, role):
+        user = self.users.get(role)
+        if user is None:
+            return None
+        client = Client(**_client_kwargs())
+        client.force_login(user)
+        return client
+
+
+def _call(kind, target, client):
+    """تنفيذ واحد؛ يعيد رمز الحالة (200 للأوامر الناجحة)"""
+    if kind == 'get':
+        return client.get(target).status_code
+    with transaction.atomic():
+        call_command(target, stdout=io.StringIO())
+        transaction.set_rollback(True)
+    return 200
+
+
+def run_scenario(kind, target, client, iterations=20, warmup=2, cold=False):
+    """
+    cold=True يفرغ كاش الـ API قبل كل تنفيذ (قياس الحساب الفعلي لا القراءة من الكاش).
+    """
+    def once():
+        if cold:
+            get_cache().clear()
+        return _call(kind, target, client)
+
+    for _ in range(warmup):
+        once()
+
+    # عدد الاستعلامات: الأقل بين التكرارات — إعادة قراءة نسخ الكاش (CACHE_VERSION_CHECK_SECONDS)
+    # تضيف استعلاماً في بعض التكرارات فقط
+    timings, queries, statuses = [], None, set()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            statuses.add(once())
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(ctx) if queries is None else min(queries, len(ctx))
+
+    tracemalloc.start()
+    try:
+        once()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': sorted(statuses),
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'queries': queries,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(iterations=20, warmup=2, cold=False, only=None, progress=None):
+    """
+    تشغيل السيناريوهات (أو المحددة في only) ويعيد قاموس النتائج مع بيانات التشغيل.
+    progress(name, result) تُستدعى بعد كل سيناريو.
+    """
+    with mock.patch('notifications.services.initialize_firebase', return_value=False), transaction.atomic():
+        results = _run(iterations, warmup, cold, only, progress)
+        transaction.set_rollback(True)
+    return results
+
+
+def _run(iterations, warmup, cold, only, progress):
+    fixtures = Fixtures()
+    results = {}
+    for name, kind, target, role in SCENARIOS:
+        if only and name not in only:
+            continue
+        client = None
+        if kind == 'get':
+            client = fixtures.client(role)
+            if client is None:
+                results[name] = {'skipped': f"no {role} user"}
+                continue
+            target = target.format(**fixtures.params)
+        results[name] = run_scenario(kind, target, client, iterations, warmup, cold)
+        if progress:
+            progress(name, results[name])
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(timespec='seconds'),
+            'dataset': dataset_info(),
+            'database': connection.vendor,
+            'cache': settings.CACHES[getattr(settings, 'API_CACHE_ALIAS', 'default')]['BACKEND'],
+            'cold_cache': cold,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    التراجعات مقارنة بخط الأساس: [(السيناريو، المقياس، القديم، الجديد، نسبة التغير)].
+    الأزمنة والذاكرة: تراجع إذا زادت بأكثر من threshold (0.2 = 20%).
+    عدد الاستعلامات: أي زيادة تراجع (الرقم حتمي لا يتأثر بالضجيج).
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old or 'skipped' in result or 'skipped' in old:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), result.get(metric)
+            if before is None or after is None or after - before <= MIN_ABSOLUTE_DIFF[metric]:
+                continue
+            change = (after - before) / before if before else float('inf')
+            if metric == 'queries' or change > threshold:
+                regressions.append((name, metric, before, after, change))
+    return regressions
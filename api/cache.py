@@ -0,0 +1,198 @@
+"""
+طبقة الكاش للـ API (نتائج التقارير، البيانات المرجعية، ردود الـ views).
+
+- الـ backend من الإعدادات: CACHES[API_CACHE_ALIAS] — locmem (الافتراضي) / file / redis
+  (انظر CACHE_BACKEND في core/settings.py).
+- كل مجموعة (namespace) لها "نسخة" في جدول CacheVersion بقاعدة البيانات تدخل في مفتاح الكاش؛
+  رفع النسخة يجعل كل المفاتيح القديمة غير مستخدمة في كل العمال (gunicorn workers)
+  حتى مع locmem، بدون معرفة المفاتيح وحذفها واحداً واحداً.
+  كل عامل يعيد قراءة النسخ (استعلام واحد لجدول صغير) مرة كل CACHE_VERSION_CHECK_SECONDS.
+- عدادات hit / miss لكل مجموعة في هذا العامل: stats()، ولكل العمال: مقاييس Prometheus
+  (c4c_api_cache_requests_total في core/metrics.py).
+
+    from api.cache import bump_version, cache_response, cached, cached_call
+
+    data = cached('coverage', (governorate_id, directorate_id), compute)
+    bump_version('coverage')   # من الـ signals عند تسجيل جرعة (يُطبق بعد نجاح الـ transaction)
+
+    @cached_call('reference')
+    def vaccine_choices(): ...
+
+    class MyReport(APIView):
+        @cache_response('coverage', per_user=True)
+        def get(self, request): ...
+"""
+import functools
+import hashlib
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+from core.metrics import count_cache
+
+# مدة الصلاحية القصوى (ثوانٍ) حتى لو لم تصل إشارة إبطال (تعديلات update() الجماعية مثلاً)
+DEFAULT_TIMEOUT = 10 * 60
+
+_MISSING = object()
+_SAFE_KEY = re.compile(r'^[\w:.,=\-]{0,200}$')
+
+_lock = threading.Lock()
+_versions = {}
+_versions_checked_at = None
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_local = threading.local()
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+# ---------- النسخ (الإبطال بين العمال) ----------
+
+def _refresh_versions():
+    from .models import CacheVersion
+
+    global _versions, _versions_checked_at
+    versions = dict(CacheVersion.objects.values_list('namespace', 'version'))
+    with _lock:
+        _versions, _versions_checked_at = versions, time.monotonic()
+
+
+def get_version(namespace):
+    interval = getattr(settings, 'CACHE_VERSION_CHECK_SECONDS', 1)
+    checked_at = _versions_checked_at
+    if checked_at is None or time.monotonic() - checked_at >= interval:
+        _refresh_versions()
+    return _versions.get(namespace, 1)
+
+
+def bump_version(namespace):
+    """
+    إبطال كل النتائج المخزنة لهذه المجموعة بعد نجاح الـ transaction الحالي
+    (فوراً خارج الـ transaction). الرفع المتكرر داخل transaction واحد يُدمج في رفع واحد.
+    """
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = set()
+    pending.add(namespace)
+    transaction.on_commit(_flush_bumps)
+
+
+def _flush_bumps():
+    pending = getattr(_local, 'pending', None)
+    _local.pending = set()
+    for namespace in sorted(pending or ()):
+        _bump_now(namespace)
+
+
+def _bump_now(namespace):
+    from .models import CacheVersion
+
+    updated = CacheVersion.objects.filter(namespace=namespace).update(version=F('version') + 1)
+    if not updated:
+        _, created = CacheVersion.objects.get_or_create(namespace=namespace, defaults={'version': 2})
+        if not created:
+            CacheVersion.objects.filter(namespace=namespace).update(version=F('version') + 1)
+    # هذا العامل يرى النسخة الجديدة فوراً، والبقية خلال CACHE_VERSION_CHECK_SECONDS
+    _refresh_versions()
+
+
+# ---------- المفاتيح والقراءة ----------
+
+def make_key(namespace, parts):
+    suffix = ':'.join('' if p is None else str(p) for p in parts)
+    if not _SAFE_KEY.match(suffix):
+        # مسافات / عربي / مفاتيح طويلة — بصمة ثابتة الطول تصلح لكل الـ backends
+        suffix = hashlib.sha256(suffix.encode()).hexdigest()
+    return f"c4c:{namespace}:v{get_version(namespace)}:{suffix}"
+
+
+def _count(namespace, hit):
+    with _lock:
+        _stats[namespace]['hits' if hit else 'misses'] += 1
+    count_cache(namespace, hit)
+
+
+def cache_get(namespace, key):
+    value = get_cache().get(key, _MISSING)
+    _count(namespace, value is not _MISSING)
+    return value
+
+
+def cached(namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """إرجاع النتيجة المخزنة أو حسابها بـ compute() وتخزينها"""
+    key = make_key(namespace, parts)
+    value = cache_get(namespace, key)
+    if value is _MISSING:
+        value = compute()
+        get_cache().set(key, value, timeout=timeout)
+    return value
+
+
+def stats():
+    """{namespace: {hits, misses, hit_rate, version}} لهذا العامل منذ بدء تشغيله"""
+    with _lock:
+        counters = {ns: dict(c) for ns, c in _stats.items()}
+    result = {}
+    # نسخ فرعية بلا عدادات (نسخ المستخدمين 'auth:<id>' في api/authentication.py) لا تُعرض
+    for namespace in sorted(set(counters) | {ns for ns in _versions if ':' not in ns}):
+        c = counters.get(namespace, {'hits': 0, 'misses': 0})
+        total = c['hits'] + c['misses']
+        result[namespace] = {
+            **c,
+            'hit_rate': round(c['hits'] / total * 100, 1) if total else None,
+            'version': _versions.get(namespace, 1),
+        }
+    return result
+
+
+# ---------- المزخرفات (decorators) ----------
+
+def cached_call(namespace, key=None, timeout=DEFAULT_TIMEOUT):
+    """
+    تخزين نتيجة دالة (حساب تقرير، بيانات serializer ...).
+    key(*args, **kwargs) تعيد أجزاء المفتاح؛ الافتراضي: اسم الدالة + المعاملات.
+    الدالة الأصلية متاحة بـ .uncached
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs) if key else (
+                func.__module__, func.__qualname__, *args, *sorted(kwargs.items())
+            )
+            return cached(namespace, parts, lambda: func(*args, **kwargs), timeout)
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def cache_response(namespace, timeout=DEFAULT_TIMEOUT, per_user=False):
+    """
+    تخزين ردود get() في APIView حسب المسار ومعاملات الرابط.
+    per_user=True للـ views التي يختلف ردها حسب المستخدم (تقييد موظفي المراكز مثلاً).
+    الردود غير 200 (أخطاء التحقق مثلاً) لا تُخزن.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            params = urlencode(sorted((k, v) for k, values in request.query_params.lists() for v in values))
+            parts = (type(view).__name__, request.path, params, request.user.pk if per_user else None)
+            key = make_key(namespace, parts)
+
+            data = cache_get(namespace, key)
+            if data is not _MISSING:
+                return Response(data)
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                get_cache().set(key, response.data, timeout=timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,77 @@
+"""
+طلبات GET المشروطة (ETag / If-None-Match → 304 Not Modified).
+
+VersionedRetrieveMixin لتفاصيل الطفل والعائلة: الـ ETag يُبنى من عدادات النسخة
+(Child.version / Family.version) باستعلام مفهرس واحد، فإذا لم يتغير شيء يُرد بـ 304
+قبل أي عمل للـ serializer — وهذه حالة أغلب طلبات التحديث الدوري من تطبيق العائلة.
+"""
+import hashlib
+
+from django.utils import timezone
+from django.utils.http import parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_version
+from .signals import CENTERS_NAMESPACE, REFERENCE_NAMESPACE
+
+# يُخزن لدى العميل لكن يُتحقق منه مع كل طلب
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*parts):
+    """ETag قوي من أجزاء (أرقام النسخ ...)"""
+    raw = ':'.join('' if p is None else str(p) for p in parts)
+    return quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+
+def not_modified(request, etag, modified=None):
+    """هل نسخة العميل حديثة؟ If-None-Match أولاً، ثم If-Modified-Since إن لم يُرسل"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in {e.removeprefix('W/') for e in etags}
+    if modified is None:
+        return False
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return since is not None and modified <= since
+
+
+def not_modified_response(headers):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+class VersionedRetrieveMixin:
+    """
+    retrieve مع ETag من عدادات النسخة.
+    version_parts(pk) — مطلوبة في كل ViewSet يستخدم الـ mixin (يُتحقق منها عند تعريف الصنف) —
+    تعيد أجزاء النسخة للكائن ضمن صلاحيات المستخدم (أو None إن لم يوجد).
+    الـ ETag يشمل أيضاً نسخة البيانات المرجعية (أسماء اللقاحات وجداولها) ونسخة المراكز
+    (أسماؤها في التفاصيل) وتاريخ اليوم (العمر والمواعيد القادمة تُحسب نسبةً لليوم).
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'version_parts', None)):
+            raise TypeError(f"{cls.__name__} must define version_parts(pk) to use VersionedRetrieveMixin")
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            parts = self.version_parts(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (TypeError, ValueError):
+            parts = None
+        if parts is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = make_etag(
+            self.basename, *parts, get_version(REFERENCE_NAMESPACE), get_version(CENTERS_NAMESPACE),
+            timezone.localdate(),
+        )
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+        if not_modified(request, etag):
+            return not_modified_response(headers)
+
+        response = super().retrieve(request, *args, **kwargs)
+        for name, value in headers.items():
+            response[name] = value
+        return response
@@ -0,0 +1,114 @@
+"""
+تصدير البيانات كملفات CSV / NDJSON متدفقة (streaming).
+
+الصفوف تُقرأ من قاعدة البيانات بـ values_list().iterator() (server-side cursor على PostgreSQL)
+وتُكتب للعميل فوراً سطراً بسطر، فتبقى الذاكرة ثابتة مهما كان حجم التصدير
+ويبدأ التحميل مباشرة بدون انتظار بناء القائمة كاملة.
+"""
+import csv
+import json
+
+from medical.models import Child, ChildVaccineSchedule, VaccineRecord
+
+ITERATOR_CHUNK_SIZE = 2000
+
+# لكل مجموعة بيانات: الاستعلام، حقل المركز (للفلترة حسب المنطقة)، حقل التاريخ، والأعمدة (الاسم، الحقل)
+DATASETS = {
+    'children': {
+        'queryset': lambda: Child.objects.all(),
+        'center_field': 'health_center',
+        'date_field': 'date_of_birth',
+        'columns': [
+            ('id', 'id'),
+            ('full_name', 'full_name'),
+            ('gender', 'gender'),
+            ('date_of_birth', 'date_of_birth'),
+            ('access_code', 'family__access_code'),
+            ('health_center', 'health_center__center_code'),
+            ('governorate', 'health_center__governorate__name_ar'),
+            ('directorate', 'health_center__directorate__name_ar'),
+            ('is_completed', 'is_completed'),
+            ('completed_date', 'completed_date'),
+            ('created_at', 'created_at'),
+        ],
+    },
+    'records': {
+        'queryset': lambda: VaccineRecord.objects.all(),
+        'center_field': 'health_center',
+        'date_field': 'date_given',
+        'columns': [
+            ('id', 'id'),
+            ('child_id', 'child_id'),
+            ('child_name', 'child__full_name'),
+            ('vaccine', 'vaccine__key'),
+            ('vaccine_name', 'vaccine__name_ar'),
+            ('dose_number', 'dose_number'),
+            ('date_given', 'date_given'),
+            ('health_center', 'health_center__center_code'),
+            ('staff', 'staff__username'),
+        ],
+    },
+    'schedules': {
+        'queryset': lambda: ChildVaccineSchedule.objects.all(),
+        'center_field': 'child__health_center',
+        'date_field': 'due_date',
+        'columns': [
+            ('id', 'id'),
+            ('child_id', 'child_id'),
+            ('vaccine', 'vaccine_schedule__vaccine__key'),
+            ('dose_number', 'vaccine_schedule__dose_number'),
+            ('due_date', 'due_date'),
+            ('is_taken', 'is_taken'),
+        ],
+    },
+}
+
+
+def build_queryset(dataset, center_id=None, directorate_id=None, governorate_id=None, date_from=None, date_to=None):
+    """values_list مرتب بالـ id مع فلاتر المنطقة والتاريخ"""
+    config = DATASETS[dataset]
+    center_field, date_field = config['center_field'], config['date_field']
+
+    qs = config['queryset']()
+    if center_id:
+        qs = qs.filter(**{f'{center_field}_id': center_id})
+    if directorate_id:
+        qs = qs.filter(**{f'{center_field}__directorate_id': directorate_id})
+    if governorate_id:
+        qs = qs.filter(**{f'{center_field}__governorate_id': governorate_id})
+    if date_from:
+        qs = qs.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        qs = qs.filter(**{f'{date_field}__lte': date_to})
+
+    return qs.order_by('id').values_list(*[field for _, field in config['columns']])
+
+
+def _iterate(queryset):
+    return queryset.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+
+class _Echo:
+    """كائن شبيه بالملف يعيد السطر بدلاً من تخزينه (لـ csv.writer)"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(dataset, queryset):
+    writer = csv.writer(_Echo())
+    # BOM حتى يفتح Excel الأسماء العربية بشكل صحيح
+    yield '\ufeff' + writer.writerow([name for name, _ in DATASETS[dataset]['columns']])
+    for row in _iterate(queryset):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(dataset, queryset):
+    names = [name for name, _ in DATASETS[dataset]['columns']]
+    for row in _iterate(queryset):
+        yield json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str) + '\n'
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
@@ -0,0 +1,153 @@
+"""
+توقع الطلب على اللقاحات لكل أسبوع من المواعيد القادمة (ChildVaccineSchedule.due_date).
+
+الجرعات المستحقة في كل أسبوع لا تعني أن كل الأطفال سيحضرون، لذا يُضرب عدد
+المواعيد لكل مركز في "نسبة الحضور" التاريخية للمركز نفسه:
+    نسبة الحضور = المواعيد المأخوذة ÷ المواعيد المستحقة خلال آخر LOOKBACK_DAYS يوماً
+
+استعلامان فقط مهما كان عدد المراكز: نسب الحضور + المواعيد القادمة مجمعة حسب (مركز، لقاح، أسبوع).
+التوقع الوطني يُحسب ليلياً ويُحفظ في DemandForecast (أمر precompute_forecast).
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, DateField, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from medical.models import ChildVaccineSchedule, Vaccine
+
+from .models import DemandForecast
+
+DEFAULT_WEEKS = 8
+MAX_WEEKS = 52
+LOOKBACK_DAYS = 180
+
+
+def week_start(day):
+    return day - datetime.timedelta(days=day.weekday())  # الاثنين (مثل TruncWeek)
+
+
+def _scope_filters(center_id=None, directorate_id=None, governorate_id=None):
+    filters = {}
+    if center_id:
+        filters['child__health_center_id'] = center_id
+    if directorate_id:
+        filters['child__health_center__directorate_id'] = directorate_id
+    if governorate_id:
+        filters['child__health_center__governorate_id'] = governorate_id
+    return filters
+
+
+def show_up_rates(today, lookback_days=LOOKBACK_DAYS, **scope):
+    """
+    ({center_id: نسبة الحضور}, النسبة العامة) — النسبة العامة تُستخدم لمركز بلا تاريخ كافٍ
+    (مركز جديد مثلاً)، و1.0 إذا لم يوجد أي تاريخ إطلاقاً.
+    """
+    rows = ChildVaccineSchedule.objects.filter(
+        due_date__gte=today - datetime.timedelta(days=lookback_days), due_date__lt=today,
+        **_scope_filters(**scope)
+    ).values('child__health_center_id').annotate(
+        due=Count('id'), taken=Count('id', filter=Q(is_taken=True))
+    ).order_by()
+
+    rates, total_due, total_taken = {}, 0, 0
+    for row in rows:
+        rates[row['child__health_center_id']] = row['taken'] / row['due']
+        total_due += row['due']
+        total_taken += row['taken']
+    return rates, (total_taken / total_due if total_due else 1.0)
+
+
+def forecast_rows(weeks=DEFAULT_WEEKS, today=None, **scope):
+    """
+    [(week_start, vaccine_id, scheduled, expected)] للأسابيع القادمة (الأسبوع الحالي أولاً).
+    المواعيد الفائتة لا تدخل — هي في قائمة المتخلفين (defaulters).
+    """
+    today = today or timezone.now().date()
+    rates, default_rate = show_up_rates(today, **scope)
+    end = week_start(today) + datetime.timedelta(weeks=weeks)
+
+    rows = ChildVaccineSchedule.objects.filter(
+        is_taken=False, child__is_completed=False, due_date__gte=today, due_date__lt=end,
+        **_scope_filters(**scope)
+    ).annotate(week=Trunc('due_date', 'week', output_field=DateField())).values(
+        'child__health_center_id', 'vaccine_schedule__vaccine_id', 'week'
+    ).annotate(count=Count('id')).order_by()
+
+    scheduled, expected = defaultdict(int), defaultdict(float)
+    for row in rows:
+        key = (row['week'], row['vaccine_schedule__vaccine_id'])
+        scheduled[key] += row['count']
+        expected[key] += row['count'] * rates.get(row['child__health_center_id'], default_rate)
+    return [(week, vaccine_id, scheduled[(week, vaccine_id)], expected[(week, vaccine_id)])
+            for week, vaccine_id in sorted(scheduled)]
+
+
+def format_forecast(rows, weeks, today):
+    """جدول للعرض: صف لكل لقاح مع قائمة (مستحق / متوقع) لكل أسبوع"""
+    first = week_start(today)
+    week_starts = [first + datetime.timedelta(weeks=i) for i in range(weeks)]
+    index = {w: i for i, w in enumerate(week_starts)}
+    vaccines = {v.id: v for v in Vaccine.objects.filter(id__in={r[1] for r in rows})}
+
+    table = {}
+    for week, vaccine_id, scheduled, expected in rows:
+        if week not in index:
+            continue
+        if vaccine_id not in table:
+            vaccine = vaccines.get(vaccine_id)
+            table[vaccine_id] = {
+                'vaccine_id': vaccine_id,
+                'key': vaccine.key if vaccine else None,
+                'name': vaccine.name_ar if vaccine else None,
+                'scheduled': [0] * weeks,
+                'expected': [0.0] * weeks,
+            }
+        table[vaccine_id]['scheduled'][index[week]] = scheduled
+        table[vaccine_id]['expected'][index[week]] = round(expected, 1)
+
+    results = sorted(table.values(), key=lambda v: v['name'] or '')
+    for row in results:
+        row['total_expected'] = round(sum(row['expected']), 1)
+    return {'weeks': week_starts, 'vaccines': results}
+
+
+def forecast(weeks=DEFAULT_WEEKS, today=None, **scope):
+    """التوقع للعرض — يقرأ اللقطة الوطنية المحسوبة ليلاً إن كانت صالحة، وإلا يحسب مباشرة"""
+    today = today or timezone.now().date()
+    rows = None
+    if not any(scope.values()):
+        rows = national_snapshot(weeks, today)
+    if rows is None:
+        rows = forecast_rows(weeks, today, **scope)
+    return format_forecast(rows, weeks, today)
+
+
+# ---------- اللقطة الوطنية (ليلياً) ----------
+
+def precompute_national(weeks=MAX_WEEKS, today=None):
+    """حساب التوقع الوطني وحفظه (استبدال كامل). يعيد عدد الصفوف."""
+    today = today or timezone.now().date()
+    objs = [
+        DemandForecast(week_start=week, vaccine_id=vaccine_id, scheduled=scheduled,
+                       expected=expected, computed_on=today)
+        for week, vaccine_id, scheduled, expected in forecast_rows(weeks, today)
+    ]
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
+
+
+def national_snapshot(weeks, today):
+    """صفوف اللقطة إن كانت محسوبة اليوم — None إذا كانت قديمة أو غير موجودة"""
+    snapshot = list(
+        DemandForecast.objects.filter(
+            computed_on=today, week_start__lt=week_start(today) + datetime.timedelta(weeks=weeks)
+        ).values_list('week_start', 'vaccine_id', 'scheduled', 'expected')
+    )
+    if not snapshot and not DemandForecast.objects.filter(computed_on=today).exists():
+        return None
+    return snapshot
@@ -0,0 +1,335 @@
+"""
+استيراد جماعي لتسجيل الأطفال من ملفات CSV / XLSX (حملات التسجيل، السجلات الورقية).
+
+- يقرأ الملف سطراً بسطر (streaming) دون تحميله كاملاً في الذاكرة.
+- يتحقق من الصفوف على دفعات، ويوحّد العائلات بمفتاح الهوية (medical.identity).
+- يكتب العائلات والأطفال والجداول عبر bulk_create داخل deferred_signals().
+- حسابات العائلات الجديدة لا تُنشأ أثناء الاستيراد (تجزئة كلمات المرور مكلفة)؛
+  معرفاتها في new_family_ids ليتم إنشاؤها في المسار الخلفي.
+- يعيد تقريراً بالأخطاء لكل صف (رقم الصف + الرسائل)، ومنها الصفوف التي سجلها طلب آخر
+  بالتزامن (تعارض على القيود الفريدة) — لا يفشل الاستيراد كله بسببها.
+- lock_center=True (موظفو المراكز): كل الصفوف تُسجل في مركز المستخدم، والصف الذي يحدد
+  مركزاً آخر يُرفض — مثل مسار تسجيل الطفل الفردي.
+
+الأعمدة المدعومة (بالإنجليزية أو العربية):
+    full_name, gender, date_of_birth, father_name, mother_name,
+    place_of_birth, birth_governorate, birth_directorate, health_center
+(المحافظة/المديرية/المركز تُحدد بالكود)
+"""
+import csv
+import datetime
+import io
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from centers.models import Directorate, Governorate, HealthCenter
+from medical.batching import deferred_signals
+from medical.identity import family_identity_key
+from medical.models import Child, Family
+
+from .validators import validate_name, validate_past_date
+
+HEADER_ALIASES = {
+    'full_name': 'full_name', 'child_name': 'full_name', 'اسم الطفل': 'full_name',
+    'gender': 'gender', 'الجنس': 'gender',
+    'date_of_birth': 'date_of_birth', 'dob': 'date_of_birth', 'تاريخ الميلاد': 'date_of_birth',
+    'father_name': 'father_name', 'اسم الأب': 'father_name',
+    'mother_name': 'mother_name', 'اسم الأم': 'mother_name',
+    'place_of_birth': 'place_of_birth', 'مكان الميلاد': 'place_of_birth',
+    'birth_governorate': 'birth_governorate', 'محافظة الميلاد': 'birth_governorate',
+    'birth_directorate': 'birth_directorate', 'مديرية الميلاد': 'birth_directorate',
+    'health_center': 'health_center', 'center_code': 'health_center', 'كود المركز': 'health_center',
+}
+
+GENDER_ALIASES = {
+    'M': 'M', 'MALE': 'M', 'ذكر': 'M',
+    'F': 'F', 'FEMALE': 'F', 'أنثى': 'F', 'انثى': 'F',
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+
+def _normalize_header(header):
+    key = str(header or '').strip()
+    return HEADER_ALIASES.get(key.lower(), HEADER_ALIASES.get(key, key.lower()))
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value
+    return str(value).strip()
+
+
+def iter_csv_rows(fileobj):
+    reader = csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    headers = [_normalize_header(h) for h in next(reader, [])]
+    for row_number, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield row_number, dict(zip(headers, (_cell(v) for v in values)))
+
+
+def iter_xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValidationError("قراءة ملفات XLSX تتطلب تثبيت مكتبة openpyxl.")
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, dict(zip(headers, (_cell(v) for v in values)))
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename):
+    """اختيار القارئ المناسب حسب امتداد الملف"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        return iter_xlsx_rows(fileobj)
+    if ext in ('.csv', '.txt', ''):
+        return iter_csv_rows(fileobj)
+    raise ValidationError(f"نوع الملف غير مدعوم: {ext} (المدعوم: CSV, XLSX)")
+
+
+def _parse_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValidationError("تاريخ الميلاد غير صالح (الصيغة المتوقعة YYYY-MM-DD).")
+
+
+class ImportResult:
+    # نحتفظ بعدد محدود من رسائل الأخطاء في التقرير حتى لا يتضخم الرد؛
+    # errors_count يبقى العدد الكامل، و on_error يستقبل كل خطأ (مثل كتابته فوراً في ملف)
+    MAX_REPORTED_ERRORS = 1000
+
+    def __init__(self, on_error=None):
+        self.rows = 0
+        self.created_children = 0
+        self.created_families = 0
+        self.skipped_duplicates = 0
+        self.errors_count = 0
+        self.errors = []
+        self.on_error = on_error
+
+    @property
+    def errors_truncated(self):
+        return self.errors_count - len(self.errors)
+
+    def add_error(self, row_number, messages):
+        self.errors_count += 1
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': messages})
+        if self.on_error:
+            self.on_error(row_number, messages)
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created_children': self.created_children,
+            'created_families': self.created_families,
+            'skipped_duplicates': self.skipped_duplicates,
+            'errors_count': self.errors_count,
+            'errors_truncated': self.errors_truncated,
+            'errors': self.errors,
+        }
+
+
+class ChildImporter:
+    """
+    المستورد: يستقبل صفوفاً (row_number, dict) ويكتبها على دفعات.
+    health_center: المركز الافتراضي إذا لم يحدد الصف كود مركز.
+    lock_center: رفض الصفوف التي تحدد مركزاً غير health_center.
+    on_error: دالة (row_number, messages) تُستدعى لكل خطأ صف دون حد أقصى.
+    """
+
+    def __init__(self, health_center=None, created_by=None, batch_size=1000, lock_center=False,
+                 on_error=None):
+        self.health_center = health_center
+        self.lock_center = lock_center
+        self.created_by = created_by
+        self.batch_size = batch_size
+        self.result = ImportResult(on_error=on_error)
+
+        # بيانات مرجعية صغيرة تُحمّل مرة واحدة
+        self.governorates = {g.code: g.id for g in Governorate.objects.only('id', 'code')}
+        self.directorates = {
+            (d.governorate_id, d.code): d.id for d in Directorate.objects.only('id', 'code', 'governorate_id')
+        }
+        self.centers = dict(HealthCenter.objects.values_list('center_code', 'id'))
+
+        # عائلات تمت معالجتها في هذا الاستيراد: مفتاح الهوية → id
+        self.families = {}
+        self.new_family_ids = []
+
+    def run(self, rows):
+        batch = []
+        for row_number, row in rows:
+            self.result.rows += 1
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch)
+                batch = []
+        if batch:
+            self._process_batch(batch)
+        return self.result
+
+    def _validate(self, row):
+        errors = []
+        data = {}
+
+        for field in ('full_name', 'father_name', 'mother_name'):
+            value = ' '.join(str(row.get(field) or '').split())
+            try:
+                validate_name(value)
+            except ValidationError as e:
+                errors.append(f"{field}: {' '.join(e.messages)}")
+            data[field] = value
+
+        gender = GENDER_ALIASES.get(str(row.get('gender') or '').strip().upper())
+        if not gender:
+            errors.append("gender: الجنس يجب أن يكون M أو F.")
+        data['gender'] = gender
+
+        try:
+            dob = _parse_date(row.get('date_of_birth') or '')
+            validate_past_date(dob)
+            data['date_of_birth'] = dob
+        except ValidationError as e:
+            errors.append(f"date_of_birth: {' '.join(e.messages)}")
+
+        data['place_of_birth'] = str(row.get('place_of_birth') or '').strip()
+        if not data['place_of_birth']:
+            errors.append("place_of_birth: مكان الميلاد مطلوب.")
+
+        gov_code = str(row.get('birth_governorate') or '').strip()
+        dir_code = str(row.get('birth_directorate') or '').strip()
+        data['birth_governorate_id'] = self.governorates.get(gov_code) if gov_code else None
+        data['birth_directorate_id'] = None
+        if gov_code and data['birth_governorate_id'] is None:
+            errors.append(f"birth_governorate: لا توجد محافظة بالكود {gov_code}.")
+        elif dir_code:
+            data['birth_directorate_id'] = self.directorates.get((data['birth_governorate_id'], dir_code))
+            if data['birth_directorate_id'] is None:
+                errors.append(f"birth_directorate: لا توجد مديرية بالكود {dir_code} في هذه المحافظة.")
+
+        default_center_id = self.health_center.id if self.health_center else None
+        center_code = str(row.get('health_center') or '').strip()
+        if center_code:
+            data['health_center_id'] = self.centers.get(center_code)
+            if data['health_center_id'] is None:
+                errors.append(f"health_center: لا يوجد مركز بالكود {center_code}.")
+            elif self.lock_center and data['health_center_id'] != default_center_id:
+                errors.append(f"health_center: لا يمكنك تسجيل أطفال في مركز آخر ({center_code}).")
+        else:
+            data['health_center_id'] = default_center_id
+
+        return data, errors
+
+    def _resolve_families(self, names):
+        """
+        إيجاد العائلات الموجودة (بمفتاح الهوية) وإنشاء الجديدة دفعة واحدة.
+        names: {identity_key: (father_name, mother_name)}
+        """
+        missing = [k for k in names if k not in self.families]
+        if not missing:
+            return
+
+        self.families.update(
+            Family.objects.filter(identity_key__in=missing).values_list('identity_key', 'id')
+        )
+
+        new_keys = [k for k in missing if k not in self.families]
+        if not new_keys:
+            return
+
+        codes = Family.generate_access_codes(len(new_keys))
+        # عائلة أنشأها طلب آخر بالتزامن (نفس مفتاح الهوية) تُتجاهل هنا ثم تُقرأ كموجودة
+        Family.objects.bulk_create([
+            Family(
+                father_name=names[key][0], mother_name=names[key][1], identity_key=key,
+                access_code=code, created_by=self.created_by,
+            )
+            for key, code in zip(new_keys, codes)
+        ], ignore_conflicts=True)
+        ours = set(codes)
+        for key, family_id, access_code in Family.objects.filter(identity_key__in=new_keys)\
+                .values_list('identity_key', 'id', 'access_code'):
+            self.families[key] = family_id
+            if access_code in ours:
+                self.new_family_ids.append(family_id)
+                self.result.created_families += 1
+
+    def _insert_children(self, children):
+        """
+        children: [(row_number, Child)]. عند تعارض مع تسجيل متزامن (unique_child_registration)
+        يُعاد الإدراج صفاً صفاً وتُسجل الصفوف المتعارضة كأخطاء.
+        """
+        try:
+            with transaction.atomic():
+                return Child.objects.bulk_create([child for _, child in children])
+        except IntegrityError:
+            pass
+
+        created = []
+        for row_number, child in children:
+            try:
+                with transaction.atomic():
+                    created.extend(Child.objects.bulk_create([child]))
+            except IntegrityError:
+                self.result.add_error(row_number, ["الطفل مسجل مسبقاً في هذه العائلة (تسجيل متزامن)."])
+        return created
+
+    def _process_batch(self, batch):
+        valid = []
+        for row_number, row in batch:
+            data, errors = self._validate(row)
+            if errors:
+                self.result.add_error(row_number, errors)
+            else:
+                valid.append((row_number, data))
+        if not valid:
+            return
+
+        with deferred_signals(notify=False, defer_accounts=True) as signal_batch:
+            names = {}
+            for _, data in valid:
+                father, mother = data.pop('father_name'), data.pop('mother_name')
+                data['family_key'] = family_identity_key(father, mother)
+                names.setdefault(data['family_key'], (father, mother))
+            self._resolve_families(names)
+
+            family_ids = {self.families[k] for k in names}
+            existing = set(
+                Child.objects.filter(family_id__in=family_ids).values_list('family_id', 'full_name')
+            )
+
+            children = []
+            for row_number, data in valid:
+                family_id = self.families[data.pop('family_key')]
+                identity = (family_id, data['full_name'])
+                if identity in existing:
+                    self.result.skipped_duplicates += 1
+                    continue
+                existing.add(identity)
+                children.append((row_number, Child(family_id=family_id, created_by=self.created_by, **data)))
+
+            created = self._insert_children(children)
+            signal_batch.add_children(created)
+            self.result.created_children += len(created)
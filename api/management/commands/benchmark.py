@@ -0,0 +1,100 @@
+"""
+قياس أداء الـ endpoints الأساسية ومقارنتها بخط أساس محفوظ (api/benchmarks.py).
+
+الاستخدام:
+    python manage.py generate_synthetic_data --children 100000     # مرة واحدة
+    python manage.py benchmark --save                              # حفظ خط الأساس
+    python manage.py benchmark                                     # بعد التعديل: مقارنة
+    python manage.py benchmark --only children_list child_detail --iterations 50 --cold
+
+ينتهي بخطأ (exit code 1) عند وجود تراجع يتجاوز --threshold — يصلح لـ CI.
+"""
+import json
+import logging
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import SCENARIOS, compare, run
+
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'قياس زمن واستعلامات وذاكرة الـ endpoints الأساسية ومقارنتها بخط الأساس'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='ملف خط الأساس (JSON)')
+        parser.add_argument('--save', action='store_true', help='حفظ النتائج كخط أساس جديد بدل المقارنة')
+        parser.add_argument('--output', help='حفظ نتائج هذا التشغيل في ملف JSON')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='نسبة التراجع المسموحة للأزمنة والذاكرة (0.2 = 20%%)')
+        parser.add_argument('--cold', action='store_true', help='تفريغ كاش الـ API قبل كل طلب')
+        parser.add_argument('--only', nargs='+', choices=[s[0] for s in SCENARIOS], help='سيناريوهات محددة')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be >= 1')
+
+        # سطر لكل طلب من QueryMetricsMiddleware يغرق المخرجات — التحذيرات فقط
+        logging.getLogger('c4c.requests').setLevel(logging.WARNING)
+
+        self.stdout.write(f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>11}")
+
+        def progress(name, result):
+            status = '' if result['status'] == [200] else f"  status {result['status']}"
+            self.stdout.write(
+                f"{name:<24}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                f"{result['queries']:>9}{result['peak_memory_kb']:>11.0f}{status}"
+            )
+
+        try:
+            current = run(options['iterations'], options['warmup'], options['cold'],
+                          only=options['only'], progress=progress)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for name, result in current['results'].items():
+            if 'skipped' in result:
+                self.stdout.write(self.style.WARNING(f"{name:<24}skipped: {result['skipped']}"))
+
+        if options['output']:
+            self._write(options['output'], current)
+
+        baseline_path = options['baseline']
+        if options['save']:
+            self._write(baseline_path, current)
+            self.stdout.write(self.style.SUCCESS(f"\nتم حفظ خط الأساس في {baseline_path}"))
+            return
+
+        if not os.path.exists(baseline_path):
+            self.stdout.write(self.style.WARNING(
+                f"\nلا يوجد خط أساس في {baseline_path} — شغّل الأمر مع --save أولاً."
+            ))
+            return
+
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('dataset') != current['meta']['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f"\nتنبيه: حجم البيانات مختلف عن خط الأساس "
+                f"({baseline.get('meta', {}).get('dataset')} ≠ {current['meta']['dataset']}) — المقارنة تقريبية."
+            ))
+
+        regressions = compare(current, baseline, options['threshold'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"\nلا تراجع مقارنة بخط الأساس ({baseline['meta'].get('created_at')})."))
+            return
+
+        for name, metric, before, after, change in regressions:
+            self.stdout.write(self.style.ERROR(f"  ✗ {name}.{metric}: {before} → {after} ({change:+.0%})"))
+        raise CommandError(f"{len(regressions)} regression(s) beyond the baseline")
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,62 @@
+"""
+توليد بيانات تجريبية واقعية بحجم وطني (عائلات، أطفال، جداول، جرعات، تقييمات، إشعارات)
+لقياس الأداء. نفس --seed على قاعدة بيانات فارغة = نفس البيانات.
+
+الاستخدام:
+    python manage.py generate_synthetic_data --children 100000
+    python manage.py generate_synthetic_data --children 1000000 --centers 300 --seed 7 --batch-size 5000
+
+يحتاج جداول اللقاحات والمحافظات والمديريات (populate_*.py). لا تشغّله على قاعدة الإنتاج.
+"""
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic import SyntheticGenerator
+
+
+class Command(BaseCommand):
+    help = 'توليد بيانات تجريبية بحجم وطني لقياس الأداء'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--children', type=int, default=10000, help='عدد الأطفال المطلوب توليدهم')
+        parser.add_argument('--centers', type=int, default=0,
+                            help='أقل عدد للمراكز النشطة — تُنشأ مراكز تجريبية عند النقص')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--years', type=int, default=6, help='مدى تواريخ الميلاد بالسنوات')
+        parser.add_argument('--batch-size', type=int, default=2000, help='عدد العائلات في كل دفعة')
+        parser.add_argument('--no-complaints', action='store_true', help='بدون تقييمات المراكز')
+        parser.add_argument('--no-notifications', action='store_true', help='بدون سجل الإشعارات')
+
+    def handle(self, *args, **options):
+        if options['children'] < 1:
+            raise CommandError('--children must be >= 1')
+
+        generator = SyntheticGenerator(
+            seed=options['seed'], years=options['years'], batch_size=options['batch_size'],
+            complaints=not options['no_complaints'], notifications=not options['no_notifications'],
+        )
+        started = time.monotonic()
+        try:
+            generator.prepare(min_centers=options['centers'])
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+        self.stdout.write(f"{len(generator.centers)} مركز، {len(generator.visits)} زيارة في الجدول.")
+
+        def progress(result):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  {result.children}/{options['children']} طفل — "
+                f"{result.children / elapsed:.0f} طفل/ث", ending='\r'
+            )
+            self.stdout.flush()
+
+        result = generator.run(options['children'], progress=progress)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\nتم خلال {elapsed:.1f} ث: عائلات {result.families}، أطفال {result.children}، "
+            f"استحقاقات {result.schedules}، جرعات {result.records}، "
+            f"تقييمات {result.complaints}، إشعارات {result.notifications}."
+        ))
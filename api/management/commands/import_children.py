@@ -0,0 +1,97 @@
+"""
+استيراد جماعي للأطفال من ملف CSV أو XLSX.
+
+الاستخدام:
+    python manage.py import_children children.csv --center 14010001 --user staff1
+    python manage.py import_children register.xlsx --batch-size 2000 --errors-csv errors.csv
+
+حسابات العائلات الجديدة تُنشأ بعد انتهاء الاستيراد مع توزيع تجزئة كلمات المرور
+على عدة عمليات (--processes)، أو تُترك للمسار الخلفي مع --skip-accounts.
+"""
+import csv
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import ChildImporter, iter_rows
+from centers.models import HealthCenter
+from medical.services import provision_pending_family_accounts
+
+
+class Command(BaseCommand):
+    help = 'استيراد جماعي لتسجيل الأطفال من ملف CSV / XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسار ملف CSV أو XLSX')
+        parser.add_argument('--center', help='كود المركز الافتراضي للصفوف التي لا تحدد مركزاً')
+        parser.add_argument('--user', help='اسم المستخدم المسجِّل (created_by)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--errors-csv', help='حفظ أخطاء الصفوف في ملف CSV')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='عدد العمليات لتجزئة كلمات مرور الحسابات (الافتراضي: عدد الأنوية)')
+        parser.add_argument('--skip-accounts', action='store_true',
+                            help='عدم إنشاء حسابات العائلات الآن (يلتقطها provision_family_accounts لاحقاً)')
+
+    def handle(self, *args, **options):
+        center = None
+        if options['center']:
+            center = HealthCenter.objects.filter(center_code=options['center']).first()
+            if not center:
+                raise CommandError(f"لا يوجد مركز بالكود {options['center']}")
+
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if not user:
+                raise CommandError(f"لا يوجد مستخدم باسم {options['user']}")
+            center = center or user.health_center
+
+        # أخطاء الصفوف تُكتب في الملف فور حدوثها، فلا يطالها حد MAX_REPORTED_ERRORS
+        errors_out = None
+        on_error = None
+        if options['errors_csv']:
+            try:
+                errors_out = open(options['errors_csv'], 'w', newline='', encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(str(e))
+            writer = csv.writer(errors_out)
+            writer.writerow(['row', 'errors'])
+
+            def on_error(row_number, messages):
+                writer.writerow([row_number, ' | '.join(messages)])
+
+        importer = ChildImporter(
+            health_center=center, created_by=user, batch_size=options['batch_size'], on_error=on_error,
+        )
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = importer.run(iter_rows(fileobj, options['path']))
+        except (OSError, ValidationError) as e:
+            raise CommandError(str(e))
+        finally:
+            if errors_out:
+                errors_out.close()
+        elapsed = time.monotonic() - started
+
+        accounts = 0
+        if importer.new_family_ids and not options['skip_accounts']:
+            accounts = provision_pending_family_accounts(processes=options['processes'])
+
+        shown = result.errors[:20]
+        for error in shown:
+            self.stdout.write(self.style.WARNING(f"  ✗ صف {error['row']}: {' | '.join(error['errors'])}"))
+        if result.errors_count > len(shown):
+            hint = f" (كلها في {options['errors_csv']})" if options['errors_csv'] else ' (استخدم --errors-csv لحفظها كلها)'
+            self.stdout.write(self.style.WARNING(f"  … و {result.errors_count - len(shown)} خطأ آخر{hint}"))
+
+        rate = result.rows / elapsed if elapsed else result.rows
+        self.stdout.write(self.style.SUCCESS(
+            f"\nتم: {result.rows} صف خلال {elapsed:.1f} ث ({rate:.0f} صف/ث) — "
+            f"أطفال جدد {result.created_children}، عائلات جديدة {result.created_families}، "
+            f"مكرر {result.skipped_duplicates}، أخطاء {result.errors_count}."
+        ))
+        if accounts:
+            self.stdout.write(self.style.SUCCESS(f"تم إنشاء {accounts} حساب عائلة."))
@@ -0,0 +1,25 @@
+"""
+حساب توقع الطلب الوطني على اللقاحات (أسبوعياً لـ 52 أسبوعاً قادمة) وحفظه في DemandForecast.
+يُشغّل ليلياً (cron: /api/cron/jobs/precompute-forecast/) — لوحة الوزارة تقرأ اللقطة بدل حسابها مع كل طلب.
+
+الاستخدام:
+    python manage.py precompute_forecast
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.forecast import MAX_WEEKS, precompute_national
+from core.metrics import track_job
+
+
+class Command(BaseCommand):
+    help = 'حساب توقع الطلب الوطني على اللقاحات (DemandForecast)'
+
+    @track_job('precompute_forecast')
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = precompute_national(MAX_WEEKS)
+        self.stdout.write(self.style.SUCCESS(
+            f'تم حفظ {count} صف توقع ({MAX_WEEKS} أسبوعاً) خلال {time.monotonic() - started:.1f} ث.'
+        ))
@@ -0,0 +1,32 @@
+"""
+إعادة بناء مكعب التجميع (مركز ← مديرية ← محافظة) بالكامل.
+يُشغّل ليلياً (cron: /api/cron/jobs/refresh-rollups/ — CronJobView) لأن عدد المتخلفين يتغير بمرور الأيام بدون أي تعديل.
+--dirty: المراكز التي علّمتها الـ signals فقط (كل دقيقة مثلاً عبر cron، أو عند ROLLUPS_ASYNC=False).
+
+الاستخدام:
+    python manage.py refresh_rollups
+    python manage.py refresh_rollups --center 12 --center 14
+    python manage.py refresh_rollups --dirty
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.rollups import refresh_centers, refresh_dirty
+from core.metrics import track_job
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء تجميعات المناطق (RegionRollup) للتقارير'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--center', type=int, action='append', help='id مركز محدد (يمكن تكراره)')
+        parser.add_argument('--dirty', action='store_true', help='المراكز المعلّمة في DirtyCenter فقط')
+
+    @track_job('refresh_rollups')
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = refresh_dirty() if options['dirty'] else refresh_centers(options['center'])
+        self.stdout.write(self.style.SUCCESS(
+            f'تم تحديث تجميعات {count} مركز خلال {time.monotonic() - started:.1f} ث.'
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('medical', '0020_childvaccineschedule_untaken_due_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('governorate', 'محافظة'), ('directorate', 'مديرية'), ('center', 'مركز صحي')], max_length=12, verbose_name='المستوى')),
+                ('region_id', models.PositiveBigIntegerField(verbose_name='معرف المنطقة')),
+                ('parent_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='معرف المنطقة الأعلى')),
+                ('name', models.CharField(max_length=255, verbose_name='الاسم')),
+                ('children', models.PositiveIntegerField(default=0, verbose_name='الأطفال')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='مكتملو التطعيم')),
+                ('defaulters', models.PositiveIntegerField(default=0, verbose_name='المتخلفون')),
+                ('doses', models.PositiveIntegerField(default=0, verbose_name='الجرعات المعطاة')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'تجميع منطقة',
+                'verbose_name_plural': 'تجميعات المناطق',
+                'indexes': [models.Index(fields=['level', 'parent_id'], name='rollup_level_parent_idx')],
+                'unique_together': {('level', 'region_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RegionVaccineRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('governorate', 'محافظة'), ('directorate', 'مديرية'), ('center', 'مركز صحي')], max_length=12, verbose_name='المستوى')),
+                ('region_id', models.PositiveBigIntegerField(verbose_name='معرف المنطقة')),
+                ('dose_number', models.PositiveIntegerField(verbose_name='رقم الجرعة')),
+                ('doses', models.PositiveIntegerField(default=0, verbose_name='الجرعات المعطاة')),
+                ('vaccine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='medical.vaccine', verbose_name='اللقاح')),
+            ],
+            options={
+                'verbose_name': 'تجميع لقاح لمنطقة',
+                'verbose_name_plural': 'تجميعات اللقاحات للمناطق',
+                'unique_together': {('level', 'region_id', 'vaccine', 'dose_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        ('medical', '0020_childvaccineschedule_untaken_due_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(verbose_name='بداية الأسبوع')),
+                ('scheduled', models.PositiveIntegerField(default=0, verbose_name='الجرعات المستحقة')),
+                ('expected', models.FloatField(default=0, verbose_name='الجرعات المتوقعة')),
+                ('computed_on', models.DateField(verbose_name='تاريخ الحساب')),
+                ('vaccine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='medical.vaccine', verbose_name='اللقاح')),
+            ],
+            options={
+                'verbose_name': 'توقع طلب لقاح',
+                'verbose_name_plural': 'توقعات الطلب على اللقاحات',
+                'unique_together': {('week_start', 'vaccine')},
+            },
+        ),
+    ]
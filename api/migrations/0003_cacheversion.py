@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_demandforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('namespace', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='المجموعة')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='النسخة')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'نسخة كاش',
+                'verbose_name_plural': 'نسخ الكاش',
+            },
+        ),
+    ]
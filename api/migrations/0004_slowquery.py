@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='الوقت')),
+                ('duration_ms', models.FloatField(verbose_name='المدة (ms)')),
+                ('database', models.CharField(max_length=50, verbose_name='قاعدة البيانات')),
+                ('sql', models.TextField(verbose_name='الاستعلام')),
+                ('params', models.TextField(blank=True, verbose_name='المعاملات')),
+                ('many', models.BooleanField(default=False, verbose_name='executemany')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='الـ view')),
+                ('path', models.CharField(blank=True, max_length=500, verbose_name='المسار')),
+                ('caller', models.CharField(blank=True, max_length=500, verbose_name='مكان الاستدعاء')),
+                ('stack', models.TextField(blank=True, verbose_name='إطارات المشروع')),
+                ('plan', models.TextField(blank=True, verbose_name='خطة التنفيذ (EXPLAIN)')),
+            ],
+            options={
+                'verbose_name': 'استعلام بطيء',
+                'verbose_name_plural': 'الاستعلامات البطيئة',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_slowquery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyCenter',
+            fields=[
+                ('center_id', models.PositiveBigIntegerField(primary_key=True, serialize=False, verbose_name='معرف المركز')),
+                ('marked_at', models.DateTimeField(verbose_name='وقت التعليم')),
+            ],
+            options={
+                'verbose_name': 'مركز بانتظار التجميع',
+                'verbose_name_plural': 'مراكز بانتظار التجميع',
+            },
+        ),
+    ]
@@ -1,3 +1,123 @@
 from django.db import models
 
-# Create your models here.
+
+class RegionRollup(models.Model):
+    """
+    مكعب التجميع المسبق للتقارير: صف لكل (مستوى، منطقة).
+    يُحدّث تدريجياً من الـ signals (api/rollups.py) ويُعاد بناؤه ليلياً (refresh_rollups)
+    لأن "المتخلفين" يتغيرون بمرور الأيام بدون أي تعديل على البيانات.
+    """
+    LEVEL_CHOICES = (
+        ('governorate', 'محافظة'),
+        ('directorate', 'مديرية'),
+        ('center', 'مركز صحي'),
+    )
+
+    level = models.CharField(max_length=12, choices=LEVEL_CHOICES, verbose_name="المستوى")
+    region_id = models.PositiveBigIntegerField(verbose_name="معرف المنطقة")
+    # المنطقة الأعلى (للتنقل من مستوى لآخر): مديرية المركز / محافظة المديرية
+    parent_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="معرف المنطقة الأعلى")
+    name = models.CharField(max_length=255, verbose_name="الاسم")
+
+    children = models.PositiveIntegerField(default=0, verbose_name="الأطفال")
+    completed = models.PositiveIntegerField(default=0, verbose_name="مكتملو التطعيم")
+    defaulters = models.PositiveIntegerField(default=0, verbose_name="المتخلفون")
+    doses = models.PositiveIntegerField(default=0, verbose_name="الجرعات المعطاة")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_level_display()}: {self.name}"
+
+    class Meta:
+        verbose_name = "تجميع منطقة"
+        verbose_name_plural = "تجميعات المناطق"
+        unique_together = ('level', 'region_id')
+        indexes = [
+            models.Index(fields=['level', 'parent_id'], name='rollup_level_parent_idx'),
+        ]
+
+
+class DirtyCenter(models.Model):
+    """
+    مركز تغيرت بياناته وينتظر إعادة حساب تجميعه (api/rollups.py: refresh_dirty).
+    تُسجل من الـ signals بعد نجاح الـ transaction وتُعالج خارج الطلب.
+    """
+    center_id = models.PositiveBigIntegerField(primary_key=True, verbose_name="معرف المركز")
+    marked_at = models.DateTimeField(verbose_name="وقت التعليم")
+
+    class Meta:
+        verbose_name = "مركز بانتظار التجميع"
+        verbose_name_plural = "مراكز بانتظار التجميع"
+
+
+class RegionVaccineRollup(models.Model):
+    """عدد الجرعات المعطاة لكل (مستوى، منطقة، لقاح، جرعة)"""
+    level = models.CharField(max_length=12, choices=RegionRollup.LEVEL_CHOICES, verbose_name="المستوى")
+    region_id = models.PositiveBigIntegerField(verbose_name="معرف المنطقة")
+    vaccine = models.ForeignKey('medical.Vaccine', on_delete=models.CASCADE, verbose_name="اللقاح")
+    dose_number = models.PositiveIntegerField(verbose_name="رقم الجرعة")
+    doses = models.PositiveIntegerField(default=0, verbose_name="الجرعات المعطاة")
+
+    class Meta:
+        verbose_name = "تجميع لقاح لمنطقة"
+        verbose_name_plural = "تجميعات اللقاحات للمناطق"
+        unique_together = ('level', 'region_id', 'vaccine', 'dose_number')
+
+
+class DemandForecast(models.Model):
+    """
+    توقع الطلب الوطني على اللقاحات لكل (أسبوع، لقاح) — يُحسب ليلياً (precompute_forecast)
+    حتى تُعرض لوحة الوزارة بدون المرور على كل المواعيد القادمة.
+    """
+    week_start = models.DateField(verbose_name="بداية الأسبوع")
+    vaccine = models.ForeignKey('medical.Vaccine', on_delete=models.CASCADE, verbose_name="اللقاح")
+    scheduled = models.PositiveIntegerField(default=0, verbose_name="الجرعات المستحقة")
+    expected = models.FloatField(default=0, verbose_name="الجرعات المتوقعة")
+    computed_on = models.DateField(verbose_name="تاريخ الحساب")
+
+    class Meta:
+        verbose_name = "توقع طلب لقاح"
+        verbose_name_plural = "توقعات الطلب على اللقاحات"
+        unique_together = ('week_start', 'vaccine')
+
+
+class CacheVersion(models.Model):
+    """
+    نسخة كل مجموعة كاش (api/cache.py) — رفعها يبطل مفاتيح المجموعة في كل العمال.
+    """
+    namespace = models.CharField(max_length=50, primary_key=True, verbose_name="المجموعة")
+    version = models.PositiveBigIntegerField(default=1, verbose_name="النسخة")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
+
+    class Meta:
+        verbose_name = "نسخة كاش"
+        verbose_name_plural = "نسخ الكاش"
+
+
+class SlowQuery(models.Model):
+    """
+    استعلام تجاوز SLOW_QUERY_MS (api/slowqueries.py) — مع مكان استدعائه وخطة التنفيذ لعينة منها.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="الوقت")
+    duration_ms = models.FloatField(verbose_name="المدة (ms)")
+    database = models.CharField(max_length=50, verbose_name="قاعدة البيانات")
+    sql = models.TextField(verbose_name="الاستعلام")
+    params = models.TextField(blank=True, verbose_name="المعاملات")
+    many = models.BooleanField(default=False, verbose_name="executemany")
+    view = models.CharField(max_length=200, blank=True, verbose_name="الـ view")
+    path = models.CharField(max_length=500, blank=True, verbose_name="المسار")
+    # أول إطار من كود المشروع: ملف:سطر في دالة (serializer method مثلاً)
+    caller = models.CharField(max_length=500, blank=True, verbose_name="مكان الاستدعاء")
+    stack = models.TextField(blank=True, verbose_name="إطارات المشروع")
+    plan = models.TextField(blank=True, verbose_name="خطة التنفيذ (EXPLAIN)")
+
+    def __str__(self):
+        return f"{self.duration_ms:.0f}ms {self.caller or self.view}"
+
+    class Meta:
+        verbose_name = "استعلام بطيء"
+        verbose_name_plural = "الاستعلامات البطيئة"
+        ordering = ('-created_at',)
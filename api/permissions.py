@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 class IsCenterStaffOrReadOnly(permissions.BasePermission):
@@ -33,3 +36,18 @@ class IsAdminOrMinistry(permissions.BasePermission):
             request.user.is_authenticated and
             (request.user.is_superuser or getattr(request.user, 'role', None) == 'MINISTRY')
         )
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """
+    لخادم Prometheus: ترويسة Authorization: Bearer <METRICS_TOKEN>، أو مستخدم is_staff.
+    بدون METRICS_TOKEN في الإعدادات يبقى الوصول للـ staff فقط.
+    """
+    def has_permission(self, request, view):
+        if request.user and request.user.is_authenticated and request.user.is_staff:
+            return True
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not token or not header.startswith('Bearer '):
+            return False
+        return hmac.compare_digest(header[len('Bearer '):].encode(), token.encode())
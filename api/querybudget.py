@@ -0,0 +1,60 @@
+"""
+ميزانية الاستعلامات لكل endpoint: أقصى عدد لاستعلامات قاعدة البيانات في طلب واحد
+(بما فيها المصادقة والصلاحيات) مهما كان عدد الصفوف المعروضة.
+
+- QueryMetricsMiddleware (core/middleware.py) يقارن كل طلب بميزانيته ويسجل تحذيراً عند التجاوز.
+- assert_query_budget() للاختبارات و CI: يفشل مع قائمة الاستعلامات عند التجاوز.
+
+    from api.querybudget import assert_query_budget
+    assert_query_budget(client, '/api/children/')
+    assert_query_budget(client, '/api/dashboard/stats/', budget=6)
+"""
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+# هامش فوق أسوأ حالة مقاسة: استعلام ثابت إضافي مشروع (صلاحية جديدة مثلاً) لا يُطلق التحذير
+# في الإنتاج، بينما N+1 على صفحة كاملة يتجاوزه بكثير. الاختبارات تفرض الميزانية ناقص الهامش
+# (api/tests/test_querybudget.py) حتى لا يُستهلك الهامش بصمت.
+QUERY_HEADROOM = 1
+
+# اسم الرابط (resolver_match.view_name) -> أقصى عدد استعلامات.
+# الأرقام ثابتة لا تعتمد على طول القائمة؛ زيادتها تعني غالباً استعلاماً لكل صف (N+1).
+# كل رقم = أسوأ حالة + QUERY_HEADROOM. أسوأ حالة هي موظف مركز بكاش فارغ، وتشمل:
+# المصادقة بالجلسة (session + user)، ومركز الموظف لفحص is_active في الصلاحيات،
+# وإعادة قراءة نسخ الكاش (api/cache.py). مثال child-list: 7 = جلسة + مستخدم + مركز + COUNT
+# + الصفحة + prefetch للجدول والسجلات، والميزانية 8.
+QUERY_BUDGETS = {
+    'api:child-list': 8,
+    'api:child-detail': 9,
+    'api:family-detail': 9,
+    'api:family-children': 7,
+    'api:healthcenter-list': 4,
+    'api:healthcenter-children': 7,
+    'api:dashboard_stats': 12,
+}
+
+
+def budget_for(view_name):
+    """ميزانية الـ endpoint أو None إذا لم تُسجل له ميزانية"""
+    return QUERY_BUDGETS.get(view_name)
+
+
+def assert_query_budget(client, path, budget=None, data=None, using='default', **extra):
+    """
+    طلب GET عبر test client (Client / APIClient) والتأكد أن عدد الاستعلامات ضمن الميزانية.
+    budget الافتراضي من QUERY_BUDGETS حسب اسم الرابط. يعيد الرد للتحقق من محتواه.
+    """
+    if budget is None:
+        view_name = resolve(path.split('?')[0]).view_name
+        budget = budget_for(view_name)
+        if budget is None:
+            raise AssertionError(f"no query budget registered for {view_name!r} ({path})")
+
+    with CaptureQueriesContext(connections[using]) as ctx:
+        response = client.get(path, data, **extra)
+
+    if len(ctx) > budget:
+        queries = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1))
+        raise AssertionError(f"{path}: {len(ctx)} queries, budget is {budget}\n{queries}")
+    return response
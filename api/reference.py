@@ -0,0 +1,66 @@
+"""
+البيانات المرجعية (محافظات، مديريات، لقاحات) تتغير بضع مرات في السنة
+لكنها تُطلب في كل صفحة تقريباً. ReferenceDataMixin يخدمها من الكاش مع ETag قوي
+(بصمة محتوى الرد) و Last-Modified، ويرد بـ 304 Not Modified إذا كانت نسخة العميل حديثة،
+فلا يعيد المتصفح أو تطبيق الجوال تنزيلها.
+
+الكاش يُبطل من الـ signals (api/signals.py) عند أي تعديل على هذه الجداول.
+"""
+import hashlib
+import json
+import time
+
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import cached
+from .conditional import CACHE_CONTROL, not_modified, not_modified_response
+from .signals import REFERENCE_NAMESPACE
+
+# الإبطال يتم بالـ signals؛ المدة فقط لتعديلات update() الجماعية التي لا تطلقها
+REFERENCE_TIMEOUT = 60 * 60
+
+
+class ReferenceDataMixin:
+    """
+    لـ ModelViewSet: list / retrieve من الكاش مع ETag و 304.
+    reference_variant() تضيف جزءاً لمفتاح الكاش عندما يختلف الرد حسب المستخدم.
+    """
+    reference_actions = ('list', 'retrieve')
+
+    def reference_variant(self):
+        return ''
+
+    def _reference_response(self, request, compute):
+        params = urlencode(sorted((k, v) for k, values in request.query_params.lists() for v in values))
+        params_hash = hashlib.sha256(params.encode()).hexdigest()[:16] if params else ''
+        parts = (self.basename, self.action, self.kwargs.get('pk'), self.reference_variant(), params_hash)
+
+        def build():
+            body = json.dumps(compute(), cls=JSONEncoder, ensure_ascii=False)
+            return {
+                'etag': quote_etag(hashlib.sha256(body.encode()).hexdigest()[:32]),
+                'modified': int(time.time()),
+                'data': json.loads(body),
+            }
+
+        payload = cached(REFERENCE_NAMESPACE, parts, build, timeout=REFERENCE_TIMEOUT)
+        headers = {
+            'ETag': payload['etag'],
+            'Last-Modified': http_date(payload['modified']),
+            'Cache-Control': CACHE_CONTROL,
+        }
+        if not_modified(request, payload['etag'], payload['modified']):
+            return not_modified_response(headers)
+        return Response(payload['data'], headers=headers)
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.reference_actions:
+            return super().list(request, *args, **kwargs)
+        return self._reference_response(request, lambda: super(ReferenceDataMixin, self).list(request, *args, **kwargs).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.reference_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self._reference_response(request, lambda: super(ReferenceDataMixin, self).retrieve(request, *args, **kwargs).data)
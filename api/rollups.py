@@ -0,0 +1,287 @@
+"""
+بناء مكعب التجميع (RegionRollup / RegionVaccineRollup) على ثلاثة مستويات:
+مركز ← مديرية ← محافظة.
+
+- مستوى المركز يُحسب من الجداول الأساسية باستعلامات GROUP BY (للمراكز المطلوبة فقط).
+- المديرية والمحافظة تُجمعان من صفوف المستوى الأدنى (بضعة صفوف لا ملايين).
+- الـ signals تعلّم المراكز المتأثرة في جدول DirtyCenter (استعلام واحد بعد نجاح الـ transaction)،
+  ويعيد حسابها thread خلفي (ROLLUPS_ASYNC) أو الأمر refresh_rollups --dirty من cron —
+  لا شيء من إعادة الحساب داخل الطلب.
+- refresh_centers() بدون معاملات = إعادة بناء كاملة (أمر refresh_rollups الليلي).
+- كل إعادة حساب تأخذ قفلاً (advisory lock على PostgreSQL) لأن صفوف المديرية والمحافظة
+  مشتركة بين المراكز: تحديثان متزامنان يحذفان ويعيدان إدراج نفس الصفوف.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from centers.models import Directorate, Governorate, HealthCenter
+from medical.models import Child, ChildVaccineSchedule, VaccineRecord
+
+from .models import DirtyCenter, RegionRollup, RegionVaccineRollup
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+COUNTERS = ('children', 'completed', 'defaulters', 'doses')
+# مفتاح pg_advisory_xact_lock لإعادة حساب المكعب
+LOCK_KEY = 0x43344352
+# انتظار قصير قبل المعالجة الخلفية حتى تُجمع تعديلات متتالية في دفعة واحدة
+DEBOUNCE_SECONDS = 2
+
+_local = threading.local()
+_wake = threading.Event()
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _center_filter(field, center_ids):
+    return {f'{field}__in': center_ids} if center_ids is not None else {}
+
+
+def _compute_centers(center_ids=None):
+    """إحصائيات مستوى المركز: (صفوف RegionRollup، صفوف RegionVaccineRollup)"""
+    today = timezone.now().date()
+    centers = HealthCenter.objects.filter(**_center_filter('id', center_ids))\
+        .values_list('id', 'name_ar', 'directorate_id')
+
+    stats = {
+        center_id: RegionRollup(level='center', region_id=center_id, parent_id=directorate_id, name=name)
+        for center_id, name, directorate_id in centers
+    }
+    if not stats:
+        return [], []
+    ids = list(stats) if center_ids is not None else None
+
+    for row in Child.objects.filter(**_center_filter('health_center_id', ids))\
+            .exclude(health_center=None).values('health_center_id')\
+            .annotate(children=Count('id'), completed=Count('id', filter=Q(is_completed=True))):
+        stat = stats.get(row['health_center_id'])
+        if stat:
+            stat.children, stat.completed = row['children'], row['completed']
+
+    for row in ChildVaccineSchedule.objects.filter(
+        is_taken=False, due_date__lt=today, child__is_completed=False,
+        **_center_filter('child__health_center_id', ids)
+    ).exclude(child__health_center=None).values('child__health_center_id')\
+            .annotate(defaulters=Count('child_id', distinct=True)):
+        stat = stats.get(row['child__health_center_id'])
+        if stat:
+            stat.defaulters = row['defaulters']
+
+    vaccine_rows = []
+    for row in VaccineRecord.objects.filter(**_center_filter('child__health_center_id', ids))\
+            .exclude(child__health_center=None)\
+            .values('child__health_center_id', 'vaccine_id', 'dose_number').annotate(doses=Count('id')):
+        stat = stats.get(row['child__health_center_id'])
+        if not stat:
+            continue
+        stat.doses += row['doses']
+        vaccine_rows.append(RegionVaccineRollup(
+            level='center', region_id=stat.region_id,
+            vaccine_id=row['vaccine_id'], dose_number=row['dose_number'], doses=row['doses'],
+        ))
+
+    return list(stats.values()), vaccine_rows
+
+
+def _replace(level, region_ids, rows, vaccine_rows):
+    """استبدال صفوف مستوى معين (كل الصفوف إذا region_ids=None)"""
+    scope = {'level': level}
+    if region_ids is not None:
+        scope['region_id__in'] = region_ids
+    RegionRollup.objects.filter(**scope).delete()
+    RegionVaccineRollup.objects.filter(**scope).delete()
+    RegionRollup.objects.bulk_create(rows, batch_size=1000)
+    RegionVaccineRollup.objects.bulk_create(vaccine_rows, batch_size=1000)
+
+
+def _aggregate_level(level, child_level, parent_ids, names, grandparents):
+    """
+    تجميع مستوى أعلى من صفوف المستوى الأدنى المحفوظة.
+    parent_ids: المناطق المطلوب تحديثها (None = الكل)
+    """
+    children_scope = {'level': child_level}
+    if parent_ids is not None:
+        children_scope['parent_id__in'] = parent_ids
+
+    rows = []
+    for row in RegionRollup.objects.filter(**children_scope).exclude(parent_id=None)\
+            .values('parent_id').annotate(**{c: Sum(c) for c in COUNTERS}):
+        region_id = row['parent_id']
+        rows.append(RegionRollup(
+            level=level, region_id=region_id, parent_id=grandparents.get(region_id),
+            name=names.get(region_id, ''), **{c: row[c] or 0 for c in COUNTERS},
+        ))
+
+    child_parents = dict(
+        RegionRollup.objects.filter(**children_scope).exclude(parent_id=None).values_list('region_id', 'parent_id')
+    )
+    totals = defaultdict(int)
+    for chunk in _chunks(child_parents):
+        for region_id, vaccine_id, dose_number, doses in RegionVaccineRollup.objects.filter(
+            level=child_level, region_id__in=chunk
+        ).values_list('region_id', 'vaccine_id', 'dose_number', 'doses'):
+            totals[(child_parents[region_id], vaccine_id, dose_number)] += doses
+    vaccine_rows = [
+        RegionVaccineRollup(level=level, region_id=p, vaccine_id=v, dose_number=d, doses=n)
+        for (p, v, d), n in totals.items()
+    ]
+
+    _replace(level, None if parent_ids is None else list(parent_ids), rows, vaccine_rows)
+
+
+def _lock():
+    """تسلسل عمليات إعادة الحساب بين العمال والأوامر (حتى نهاية الـ transaction)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+    # SQLite: الكتابة متسلسلة أصلاً على مستوى قاعدة البيانات
+
+
+def refresh_centers(center_ids=None):
+    """
+    إعادة حساب المراكز المحددة (أو الكل) ثم مديرياتها ومحافظاتها.
+    يعيد عدد المراكز المحدّثة.
+    """
+    if center_ids is not None:
+        center_ids = list({c for c in center_ids if c})
+        if not center_ids:
+            return 0
+
+    with transaction.atomic():
+        _lock()
+        started = timezone.now()
+        directorate_ids = governorate_ids = None
+        if center_ids is not None:
+            # المديريات الحالية + السابقة (لمركز نُقل من مديرية لأخرى)
+            directorate_ids = set(
+                HealthCenter.objects.filter(id__in=center_ids).exclude(directorate=None)
+                .values_list('directorate_id', flat=True)
+            ) | set(
+                RegionRollup.objects.filter(level='center', region_id__in=center_ids).exclude(parent_id=None)
+                .values_list('parent_id', flat=True)
+            )
+
+        rows, vaccine_rows = _compute_centers(center_ids)
+        _replace('center', center_ids, rows, vaccine_rows)
+
+        directorates = Directorate.objects.all() if directorate_ids is None \
+            else Directorate.objects.filter(id__in=directorate_ids)
+        dir_names, dir_parents = {}, {}
+        for d_id, name, gov_id in directorates.values_list('id', 'name_ar', 'governorate_id'):
+            dir_names[d_id], dir_parents[d_id] = name, gov_id
+
+        if directorate_ids is not None:
+            governorate_ids = set(dir_parents.values()) | set(
+                RegionRollup.objects.filter(level='directorate', region_id__in=directorate_ids)
+                .exclude(parent_id=None).values_list('parent_id', flat=True)
+            )
+        _aggregate_level('directorate', 'center', directorate_ids, dir_names, dir_parents)
+
+        governorates = Governorate.objects.all() if governorate_ids is None \
+            else Governorate.objects.filter(id__in=governorate_ids)
+        _aggregate_level('governorate', 'directorate', governorate_ids,
+                         dict(governorates.values_list('id', 'name_ar')), {})
+
+        if center_ids is None:
+            # إعادة البناء الكاملة تغطي كل المراكز المعلّمة قبلها
+            DirtyCenter.objects.filter(marked_at__lte=started).delete()
+
+    return len(rows)
+
+
+def refresh_dirty():
+    """إعادة حساب المراكز المعلّمة في DirtyCenter. يعيد عددها."""
+    with transaction.atomic():
+        _lock()
+        started = timezone.now()
+        center_ids = list(DirtyCenter.objects.filter(marked_at__lte=started).values_list('center_id', flat=True))
+        if not center_ids:
+            return 0
+        refresh_centers(center_ids)
+        # المراكز التي عُلّمت من جديد أثناء الحساب تبقى للدورة التالية
+        for chunk in _chunks(center_ids):
+            DirtyCenter.objects.filter(center_id__in=chunk, marked_at__lte=started).delete()
+    return len(center_ids)
+
+
+# ---------- التحديث التدريجي من الـ signals ----------
+
+def mark_centers_dirty(center_ids):
+    """
+    تعليم مراكز لإعادة الحساب بعد نجاح الـ transaction الحالي.
+    المراكز تُجمع في مجموعة واحدة فتُسجل باستعلام واحد مهما تعددت التعديلات.
+    """
+    center_ids = {c for c in center_ids if c}
+    if not center_ids:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = set()
+    pending.update(center_ids)
+    transaction.on_commit(_flush_dirty)
+
+
+def _flush_dirty():
+    pending = getattr(_local, 'pending', None)
+    _local.pending = set()
+    if not pending:
+        return
+    now = timezone.now()
+    try:
+        DirtyCenter.objects.bulk_create(
+            [DirtyCenter(center_id=c, marked_at=now) for c in sorted(pending)],
+            update_conflicts=True, unique_fields=['center_id'], update_fields=['marked_at'],
+        )
+    except DatabaseError:
+        # الطلب نفسه نجح — لا نحوله لخطأ؛ إعادة البناء الليلية تصحح المكعب
+        logger.exception("Failed to mark %s centers for rollup refresh", len(pending))
+        return
+    if getattr(settings, 'ROLLUPS_ASYNC', True):
+        _wake.set()
+        _ensure_worker()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='rollup-refresh', daemon=True)
+            _worker.start()
+
+
+def _run():
+    while True:
+        _wake.wait()
+        time.sleep(DEBOUNCE_SECONDS)
+        _wake.clear()
+        try:
+            close_old_connections()
+            refresh_dirty()
+        except Exception:
+            logger.exception("Rollup refresh failed")
+        finally:
+            connections.close_all()
+
+
+def centers_of_children(child_ids):
+    centers = set()
+    for chunk in _chunks(child_ids):
+        centers.update(
+            Child.objects.filter(pk__in=chunk).exclude(health_center=None)
+            .values_list('health_center_id', flat=True).distinct()
+        )
+    return centers
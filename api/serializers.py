@@ -2,12 +2,13 @@
 Serializers لـ Django REST API
 """
 from rest_framework import serializers
-from django.db.models import Avg
+from django.db.models import Prefetch
 import datetime
 from .validators import validate_name, validate_phone_number, validate_past_date
 from users.models import CustomUser
 from centers.models import HealthCenter, Governorate, Directorate
-from medical.models import Child, Family, Vaccine, VaccineRecord
+from medical.models import Child, ChildVaccineSchedule, Family, Vaccine, VaccineRecord
+from medical.identity import family_identity_key
 
 
 # ============== Governorate & Directorate ==============
@@ -28,7 +29,23 @@ class DirectorateSerializer(serializers.ModelSerializer):
 
 # ============== Health Center ==============
 
-class HealthCenterListSerializer(serializers.ModelSerializer):
+class CenterRatingMixin:
+    """
+    متوسط التقييم وعدد التقييمات من ملخص المركز المحفوظ (CenterRatingSummary)
+    — استخدم select_related('rating_summary') لتجنب استعلام لكل مركز.
+    """
+
+    def get_average_rating(self, obj):
+        summary = getattr(obj, 'rating_summary', None)
+        return summary.average_rating if summary else 0.0
+
+    def get_reviews_count(self, obj):
+        # نعدّ فقط التقييمات اللي فيها نجوم فعلية
+        summary = getattr(obj, 'rating_summary', None)
+        return summary.stars_count if summary else 0
+
+
+class HealthCenterListSerializer(CenterRatingMixin, serializers.ModelSerializer):
     governorate_name = serializers.CharField(source='governorate.name_ar', read_only=True)
     directorate_name = serializers.CharField(source='directorate.name_ar', read_only=True)
     
@@ -40,29 +57,9 @@ class HealthCenterListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name_ar', 'name_en', 'center_code', 'governorate_name', 
                   'directorate_name', 'is_active', 'created_at', 'average_rating', 'reviews_count']
 
-    def get_average_rating(self, obj):
-        # نجوم حقيقية أولاً — نستخدم Avg() مباشرة من DB
-        result = obj.complaints.filter(stars__isnull=False).aggregate(avg=Avg('stars'))
-        if result['avg'] is not None:
-            return round(result['avg'], 1)
-        # fallback للبيانات القديمة (complaint_type)
-        comps = list(obj.complaints.exclude(complaint_type__isnull=True))
-        if not comps: return 0.0
-        score = 0
-        for c in comps:
-             if c.complaint_type == 'EXCELLENT': score += 5
-             elif c.complaint_type == 'GOOD': score += 4
-             elif c.complaint_type == 'OTHER': score += 3
-             elif c.complaint_type == 'SUBSTITUTE_GIVEN': score += 2
-             else: score += 1
-        return round(score / len(comps), 1)
-
-    def get_reviews_count(self, obj):
-        # نعدّ فقط التقييمات اللي فيها نجوم فعلية
-        return obj.complaints.filter(stars__isnull=False).count()
 
 
-class HealthCenterDetailSerializer(serializers.ModelSerializer):
+class HealthCenterDetailSerializer(CenterRatingMixin, serializers.ModelSerializer):
     governorate = GovernorateSerializer(read_only=True)
     directorate = DirectorateSerializer(read_only=True)
     staff_count = serializers.SerializerMethodField()
@@ -83,26 +80,6 @@ class HealthCenterDetailSerializer(serializers.ModelSerializer):
     def get_children_count(self, obj):
         return Child.objects.filter(health_center=obj).count()
 
-    def get_average_rating(self, obj):
-        # نجوم حقيقية أولاً — نستخدم Avg() مباشرة من DB
-        result = obj.complaints.filter(stars__isnull=False).aggregate(avg=Avg('stars'))
-        if result['avg'] is not None:
-            return round(result['avg'], 1)
-        # fallback للبيانات القديمة (complaint_type)
-        comps = list(obj.complaints.exclude(complaint_type__isnull=True))
-        if not comps: return 0.0
-        score = 0
-        for c in comps:
-            if c.complaint_type == 'EXCELLENT': score += 5
-            elif c.complaint_type == 'GOOD': score += 4
-            elif c.complaint_type == 'OTHER': score += 3
-            elif c.complaint_type == 'SUBSTITUTE_GIVEN': score += 2
-            else: score += 1
-        return round(score / len(comps), 1)
-
-    def get_reviews_count(self, obj):
-        # نعدّ فقط التقييمات اللي فيها نجوم فعلية
-        return obj.complaints.filter(stars__isnull=False).count()
 
 
 class HealthCenterCreateUpdateSerializer(serializers.ModelSerializer):
@@ -311,9 +288,14 @@ class ProfileSelfUpdateSerializer(serializers.ModelSerializer):
         validated_data.pop("confirm_password", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        fields = list(validated_data)
         if password:
             instance.set_password(password)
-        instance.save()
+            fields.append("password")
+        # instance غالباً request.user من كاش المصادقة — حفظ الحقول المعدلة فقط
+        # حتى لا تُكتب فوق قيم أحدث (fcm_token، last_login ...)
+        if fields:
+            instance.save(update_fields=fields)
         return instance
 
 # ============== Family ==============
@@ -334,6 +316,60 @@ class FamilyCreateUpdateSerializer(serializers.ModelSerializer):
             'mother_name': {'validators': [validate_name]},
         }
 
+    def validate(self, attrs):
+        """منع إنشاء/تعديل عائلة بنفس اسمي أب وأم عائلة أخرى (بعد التوحيد)"""
+        father = attrs.get('father_name', getattr(self.instance, 'father_name', ''))
+        mother = attrs.get('mother_name', getattr(self.instance, 'mother_name', ''))
+        key = family_identity_key(father, mother)
+        if self.instance and self.instance.identity_key.startswith(key):
+            return attrs  # الأسماء لم تتغير (بعد التوحيد)
+        if Family.objects.filter(identity_key=key).exists():
+            raise serializers.ValidationError("توجد عائلة مسجلة بنفس اسم الأب والأم.")
+        return attrs
+
+
+# ============== Child Prefetch (منع N+1) ==============
+
+# العلاقات المطلوبة لعرض تفاصيل الطفل (ChildDetailSerializer) — لـ select_related
+CHILD_DETAIL_RELATED = (
+    'family', 'health_center__governorate', 'health_center__directorate',
+    'health_center__rating_summary', 'created_by__health_center',
+    'birth_governorate', 'birth_directorate',
+)
+
+
+def child_prefetches():
+    """
+    جداول الطفل وسجلاته باستعلامين لكل الصفحة بدل استعلامات لكل طفل.
+    الـ serializers تقرأ prefetched_schedules / prefetched_records إن وُجدت.
+    """
+    return [
+        Prefetch('personal_schedule', to_attr='prefetched_schedules',
+                 queryset=ChildVaccineSchedule.objects.select_related('vaccine_schedule__vaccine')),
+        Prefetch('vaccine_records', to_attr='prefetched_records',
+                 queryset=VaccineRecord.objects.select_related('vaccine')),
+    ]
+
+
+def _child_schedules(obj):
+    """جداول الطفل (المجلوبة مسبقاً، أو استعلام واحد يُحفظ على الكائن)"""
+    if not hasattr(obj, 'prefetched_schedules'):
+        obj.prefetched_schedules = list(
+            ChildVaccineSchedule.objects.filter(child=obj).select_related('vaccine_schedule__vaccine')
+        )
+    return obj.prefetched_schedules
+
+
+def _child_records(obj):
+    """سجلات تطعيم الطفل (المجلوبة مسبقاً، أو استعلام واحد يُحفظ على الكائن)"""
+    if not hasattr(obj, 'prefetched_records'):
+        obj.prefetched_records = list(VaccineRecord.objects.filter(child=obj).select_related('vaccine'))
+    return obj.prefetched_records
+
+
+def _pending_schedules(obj):
+    return sorted((s for s in _child_schedules(obj) if not s.is_taken), key=lambda s: s.due_date)
+
 
 # ============== Child List (Moved up for dependencies) ==============
 
@@ -353,7 +389,7 @@ class ChildListSerializer(serializers.ModelSerializer):
 
     def get_vaccine_records(self, obj):
         """إرجاع سجلات التطعيم مع مفتاح جاهز يطابق col.id في JS مباشرةً"""
-        records = obj.vaccine_records.select_related('vaccine').all()
+        records = _child_records(obj)
         return [
             {
                 'vaccine_name': r.vaccine.name_ar,
@@ -386,26 +422,23 @@ class ChildListSerializer(serializers.ModelSerializer):
         total = getattr(obj, 'total_schedules', None)
         if taken is None or total is None:
             # احتياطي: في حال استدعينا من مكان آخر بدون annotate
-            from medical.models import ChildVaccineSchedule, VaccineRecord
-            total = ChildVaccineSchedule.objects.filter(child=obj).count()
-            taken = VaccineRecord.objects.filter(child=obj).count()
+            total = len(_child_schedules(obj))
+            taken = len(_child_records(obj))
         return int((taken / total) * 100) if total > 0 else 0
 
     def get_next_vaccine(self, obj):
-        from medical.models import ChildVaccineSchedule
-        import datetime
-        next_schedules = ChildVaccineSchedule.objects.filter(child=obj, is_taken=False).order_by('due_date')
-        first_schedule = next_schedules.first()
+        next_schedules = _pending_schedules(obj)
+        first_schedule = next_schedules[0] if next_schedules else None
         
         if first_schedule:
             # نجلب العمر الدقيق (بالكسور) مباشرةً من جدول اللقاح (مثلاً 2.5 لشهرين ونصف)
             age_months_real = first_schedule.vaccine_schedule.age_in_months
 
             # استخراج جميع الجرعات التي تستحق في نفس الشهر والسنة
-            same_date_schedules = next_schedules.filter(
-                due_date__year=first_schedule.due_date.year,
-                due_date__month=first_schedule.due_date.month
-            )
+            same_date_schedules = [
+                s for s in next_schedules
+                if (s.due_date.year, s.due_date.month) == (first_schedule.due_date.year, first_schedule.due_date.month)
+            ]
             vaccines_list = []
             for s in same_date_schedules:
                 v_name = s.vaccine_schedule.vaccine.name_ar
@@ -439,8 +472,8 @@ class VaccineListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name_ar', 'name_en', 'description', 'is_active', 'schedules']
 
     def get_schedules(self, obj):
-        from medical.models import VaccineSchedule
-        qs = VaccineSchedule.objects.filter(vaccine=obj).order_by('dose_number')
+        # obj.schedules.all() تستخدم prefetch_related('schedules') من الـ ViewSet إن وُجد
+        qs = sorted(obj.schedules.all(), key=lambda s: s.dose_number)
         return [{'id': s.id, 'dose_number': s.dose_number, 'age_in_months': s.age_in_months, 'stage': s.stage} for s in qs]
 
 
@@ -581,9 +614,7 @@ class ChildDetailSerializer(serializers.ModelSerializer):
         return age
     
     def get_upcoming_vaccines(self, obj):
-        import datetime
-        from medical.models import ChildVaccineSchedule
-        schedules = ChildVaccineSchedule.objects.filter(child=obj, is_taken=False).order_by('due_date')
+        schedules = _pending_schedules(obj)
         
         return [
             {
@@ -598,15 +629,14 @@ class ChildDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_full_vaccine_schedule(self, obj):
-        import datetime
-        from medical.models import ChildVaccineSchedule, VaccineRecord
-        schedules = ChildVaccineSchedule.objects.filter(child=obj).select_related(
-            'vaccine_schedule__vaccine'
-        ).order_by('vaccine_schedule__age_in_months', 'vaccine_schedule__dose_number')
+        schedules = sorted(
+            _child_schedules(obj),
+            key=lambda s: (s.vaccine_schedule.age_in_months, s.vaccine_schedule.dose_number)
+        )
 
         vaccine_records = {
             (vr.vaccine_id, vr.dose_number): vr.date_given
-            for vr in VaccineRecord.objects.filter(child=obj)
+            for vr in _child_records(obj)
         }
 
         result = []
@@ -633,9 +663,8 @@ class ChildDetailSerializer(serializers.ModelSerializer):
         taken = getattr(obj, 'taken_count', None)
         total = getattr(obj, 'total_schedules', None)
         if taken is None or total is None:
-            from medical.models import ChildVaccineSchedule
-            total = ChildVaccineSchedule.objects.filter(child=obj).count()
-            taken = VaccineRecord.objects.filter(child=obj).count()
+            total = len(_child_schedules(obj))
+            taken = len(_child_records(obj))
         remaining = total - taken
         return {
             'total': total,
@@ -690,17 +719,17 @@ class ChildCreateUpdateSerializer(serializers.ModelSerializer):
             validated_data['birth_governorate'] = None
             validated_data['birth_directorate'] = None
 
-        # 3. نبحث عن العائلة أو ننشئها تلقائياً
+        # 3. نبحث عن العائلة أو ننشئها تلقائياً (بحث واحد على فهرس مفتاح الهوية)
         family_obj, created = Family.objects.get_or_create(
-            father_name=f_name,
-            mother_name=m_name
+            identity_key=family_identity_key(f_name, m_name),
+            defaults={'father_name': f_name, 'mother_name': m_name}
         )
 
         # ربط حساب العائلة بالمركز الصحي (إذا كان الحساب قد أنشئ للتو عبر Signals)
         # ننتظر قليلاً حتى ينتهي الـ signal من جلب الـ account
         if family_obj.account and not family_obj.account.health_center:
             family_obj.account.health_center = center
-            family_obj.account.save()
+            family_obj.account.save(update_fields=['health_center'])
 
         # 4. منع التكرار (Idempotency Check)
         child_name = validated_data.get('full_name')
@@ -743,7 +772,8 @@ class FamilyDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'father_name', 'mother_name', 'access_code', 'notes', 'children_count', 'children', 'created_at']
     
     def get_children_count(self, obj):
-        return Child.objects.filter(family=obj).count()
+        # count() تستخدم الأطفال المجلوبين مسبقاً (prefetch_related) بدون استعلام
+        return obj.children.count()
 
 # ============== Notifications ==============
 
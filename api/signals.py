@@ -0,0 +1,127 @@
+"""
+- إبطال كاش التقارير عند تغيير البيانات التي تُحسب منها.
+- إبطال كاش البيانات المرجعية (api/reference.py)، ونسخة المراكز في ETag التفاصيل (api/conditional.py).
+- تعليم المراكز المتأثرة لتحديث مكعب التجميع (api/rollups.py).
+- إبطال كاش المصادقة (api/authentication.py) عند تعطيل مستخدم / مركز أو حذف توكن.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from medical.batching import batch_flushed
+from centers.models import Directorate, Governorate, HealthCenter
+from medical.models import Child, Vaccine, VaccineRecord, VaccineSchedule
+from users.models import CustomUser
+
+from . import rollups
+from .authentication import AUTH_NAMESPACE, invalidate_user
+from .cache import bump_version
+
+# مجموعات الكاش المبنية على سجلات التطعيم وتوزيع الأطفال على المراكز
+COVERAGE_NAMESPACE = 'coverage'
+# المحافظات والمديريات واللقاحات وجداولها
+REFERENCE_NAMESPACE = 'reference'
+# أسماء المراكز وبياناتها (تظهر في تفاصيل الطفل والعائلة)
+CENTERS_NAMESPACE = 'centers'
+
+# الحقول المخزنة مع التوكن والتي تؤثر على الصلاحيات — حفظ غيرها (last_login، fcm_token) لا يبطل الكاش
+AUTH_USER_FIELDS = frozenset({'is_active', 'role', 'health_center', 'is_staff', 'is_superuser'})
+AUTH_CENTER_FIELDS = frozenset({'is_active'})
+
+
+# حقول الطفل التي تدخل في تقارير التغطية (update_fields بأسماء الحقول لا _id)
+COVERAGE_CHILD_FIELDS = frozenset({'health_center', 'is_completed', 'completed_date', 'date_of_birth'})
+
+
+@receiver(post_save, sender=VaccineRecord)
+@receiver(post_delete, sender=VaccineRecord)
+@receiver(post_delete, sender=Child)
+def invalidate_coverage_reports(sender, **kwargs):
+    bump_version(COVERAGE_NAMESPACE)
+
+
+@receiver(post_save, sender=Child)
+def invalidate_coverage_for_child(sender, instance, created, update_fields=None, **kwargs):
+    """
+    فقط عند تسجيل طفل أو تغيّر حقل تغطية فعلاً (مقارنة بما قُرئ في Child.from_db) —
+    تعديل الاسم أو رفع النسخة لا يبطل تقارير التغطية.
+    """
+    if update_fields is not None and COVERAGE_CHILD_FIELDS.isdisjoint(update_fields):
+        return
+    state = instance.coverage_state()
+    if created or getattr(instance, '_loaded_coverage', None) != state:
+        bump_version(COVERAGE_NAMESPACE)
+    instance._loaded_coverage = state
+
+
+@receiver(post_save, sender=Governorate)
+@receiver(post_delete, sender=Governorate)
+@receiver(post_save, sender=Directorate)
+@receiver(post_delete, sender=Directorate)
+@receiver(post_save, sender=Vaccine)
+@receiver(post_delete, sender=Vaccine)
+@receiver(post_save, sender=VaccineSchedule)
+@receiver(post_delete, sender=VaccineSchedule)
+def invalidate_reference_data(sender, **kwargs):
+    bump_version(REFERENCE_NAMESPACE)
+
+
+@receiver(post_save, sender=HealthCenter)
+@receiver(post_delete, sender=HealthCenter)
+def invalidate_center_data(sender, **kwargs):
+    bump_version(CENTERS_NAMESPACE)
+
+
+def _affects_auth(created, update_fields, fields):
+    if created:
+        return False  # لا توكن مخزن لسجل جديد
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_auth_for_user(sender, instance, created, update_fields=None, **kwargs):
+    if _affects_auth(created, update_fields, AUTH_USER_FIELDS):
+        invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=HealthCenter)
+def invalidate_auth_for_center(sender, created, update_fields=None, **kwargs):
+    if _affects_auth(created, update_fields, AUTH_CENTER_FIELDS):
+        bump_version(AUTH_NAMESPACE)
+
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_auth_for_deleted_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_auth_for_token(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_delete, sender=HealthCenter)
+def invalidate_auth(sender, **kwargs):
+    bump_version(AUTH_NAMESPACE)
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_delete, sender=Child)
+def refresh_child_rollups(sender, instance, **kwargs):
+    # المركز السابق (Child.from_db) حتى يُحدّث تجميعه أيضاً عند نقل الطفل
+    rollups.mark_centers_dirty([instance.health_center_id, getattr(instance, '_loaded_center_id', None)])
+    instance._loaded_center_id = instance.health_center_id
+
+
+@receiver(post_save, sender=VaccineRecord)
+@receiver(post_delete, sender=VaccineRecord)
+def refresh_record_rollups(sender, instance, **kwargs):
+    rollups.mark_centers_dirty(rollups.centers_of_children([instance.child_id]))
+
+
+@receiver(batch_flushed)
+def invalidate_after_batch(sender, batch, **kwargs):
+    child_ids = set(batch.children) | batch.record_child_ids | batch.deleted_record_child_ids
+    if child_ids:
+        bump_version(COVERAGE_NAMESPACE)
+        rollups.mark_centers_dirty(rollups.centers_of_children(child_ids))
@@ -0,0 +1,195 @@
+"""
+تسجيل الاستعلامات البطيئة في جدول SlowQuery (يُعرض في لوحة الإدارة).
+
+اختياري: SLOW_QUERY_MS=200 يفعّله (0 = معطل، الافتراضي). عند كل اتصال بقاعدة البيانات
+يُضاف execute wrapper يقيس زمن كل استعلام؛ ما يتجاوز الحد يُسجل مع:
+- الـ SQL والمعاملات، والـ view والمسار (من QueryMetricsMiddleware)،
+- مكان الاستدعاء: أول إطار من كود المشروع (serializer method مثلاً) + بقية إطارات المشروع،
+- خطة التنفيذ لعينة من استعلامات SELECT (SLOW_QUERY_EXPLAIN_SAMPLE):
+  PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) — SQLite: EXPLAIN QUERY PLAN.
+
+الكلفة على الاستعلامات العادية: قياس زمن ومقارنة فقط. الاستعلامات البطيئة توضع في طابور
+ويكتبها (ويشغّل EXPLAIN لها) thread خلفي باتصال مستقل — فلا يتأخر الطلب ولا تضيع السجلات
+إذا أُلغي الـ transaction الخاص به.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+MAX_PARAMS_LENGTH = 2000
+MAX_STACK_FRAMES = 8
+# أقصى زمن لإعادة تنفيذ الاستعلام مع EXPLAIN ANALYZE
+EXPLAIN_TIMEOUT_MS = 30000
+# عند ازدحام الطابور تُهمل السجلات الجديدة بدل استهلاك الذاكرة
+QUEUE_SIZE = 1000
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_lock = threading.Lock()
+_local = threading.local()
+_worker = None
+_threshold = None
+_sample = 0.0
+
+_BASE_DIR = str(settings.BASE_DIR) + os.sep
+_SKIPPED_FILES = (
+    __file__, os.path.join(_BASE_DIR, 'core', 'middleware.py'), os.path.join(_BASE_DIR, 'manage.py'),
+)
+
+
+def install():
+    """يُستدعى من ApiConfig.ready — لا شيء إذا كان SLOW_QUERY_MS غير مفعّل"""
+    global _threshold, _sample
+    threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+    if not threshold:
+        return
+    _threshold = threshold / 1000
+    _sample = getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE', 0.1)
+    connection_created.connect(_on_connection_created, dispatch_uid='slow-query-wrapper')
+    atexit.register(wait_until_idle, timeout=5)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    # نفس كائن الاتصال يُعاد فتحه مع كل طلب (CONN_MAX_AGE=0) — wrapper واحد فقط.
+    # يُضاف في أول القائمة: الاتصال يُفتح غالباً داخل كتلة execute_wrapper() لطلب
+    # (QueryMetricsMiddleware مثلاً) وهذه تزيل آخر عنصر عند خروجها
+    if _wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _wrapper)
+
+
+def bind_request(request):
+    """الطلب الحالي لهذا الـ thread (None بعد انتهائه)"""
+    _local.request = request
+
+
+def _wrapper(execute, sql, params, many, context):
+    if getattr(_local, 'recording', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration >= _threshold:
+            _capture(sql, params, many, context['connection'], duration)
+
+
+def _project_frames():
+    """إطارات كود المشروع (الأعمق أولاً) بدون Django والمكتبات"""
+    frames = []
+    frame = sys._getframe(2)
+    while frame and len(frames) < MAX_STACK_FRAMES:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(_BASE_DIR) and 'site-packages' not in filename
+                and filename not in _SKIPPED_FILES):
+            frames.append(f"{filename[len(_BASE_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return frames
+
+
+def _capture(sql, params, many, connection, duration):
+    request = getattr(_local, 'request', None)
+    match = getattr(request, 'resolver_match', None)
+    frames = _project_frames()
+    is_select = not many and sql.lstrip()[:6].upper() == 'SELECT'
+    record = {
+        'alias': connection.alias,
+        'vendor': connection.vendor,
+        'duration_ms': round(duration * 1000, 1),
+        'sql': sql,
+        # executemany: المعاملات قائمة طويلة (أو generator استُهلك) — لا تُحفظ
+        'params': None if many else params,
+        'many': many,
+        'view': match.view_name if match else '',
+        'path': request.path[:500] if request else '',
+        'frames': frames,
+        'explain': is_select and random.random() < _sample,
+    }
+    try:
+        _queue.put_nowait(record)
+    except queue.Full:
+        return
+    _ensure_worker()
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='slow-query-writer', daemon=True)
+            _worker.start()
+
+
+def _explain(record):
+    connection = connections[record['alias']]
+    if record['vendor'] == 'postgresql':
+        with transaction.atomic(using=record['alias']), connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + record['sql'], record['params'])
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            transaction.set_rollback(True, using=record['alias'])
+        return plan
+    if record['vendor'] == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + record['sql'], record['params'])
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    return ''
+
+
+def _save(record):
+    from .models import SlowQuery
+
+    plan = ''
+    if record['explain']:
+        try:
+            plan = _explain(record)
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+    frames = record['frames']
+    SlowQuery.objects.create(
+        duration_ms=record['duration_ms'],
+        database=record['alias'],
+        sql=record['sql'],
+        params=repr(record['params'])[:MAX_PARAMS_LENGTH] if record['params'] is not None else '',
+        many=record['many'],
+        view=record['view'][:200],
+        path=record['path'],
+        caller=frames[0][:500] if frames else '',
+        stack='\n'.join(frames),
+        plan=plan,
+    )
+
+
+def _run():
+    _local.recording = True  # استعلامات هذا الـ thread نفسه لا تُسجل
+    while True:
+        record = _queue.get()
+        try:
+            close_old_connections()
+            _save(record)
+        except Exception:
+            logger.exception("Failed to record slow query")
+        finally:
+            _queue.task_done()
+            if _queue.empty():
+                connections.close_all()
+
+
+def wait_until_idle(timeout=None):
+    """انتظار كتابة السجلات المعلقة (نهاية الأوامر / الاختبارات)"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
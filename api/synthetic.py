@@ -0,0 +1,450 @@
+"""
+توليد بيانات تجريبية بحجم وطني لقياس الأداء (أمر generate_synthetic_data).
+
+- نفس النتيجة لنفس البذرة (seed) على قاعدة بيانات فارغة.
+- كل شيء عبر bulk_create على دفعات من العائلات (بدون signals لكل صف)، والقيم المشتقة
+  (is_taken، is_completed، المركز) تُحسب في Python مع الإنشاء بدل تحديثها لاحقاً؛
+  ثم يُعاد بناء ملخصات التقييم ومكعب التجميع مرة واحدة في النهاية.
+- توزيعات واقعية:
+    * حجم المراكز: توزيع log-normal (مراكز كبيرة قليلة ومراكز صغيرة كثيرة).
+    * تواريخ الميلاد: آخر years سنة مع ميل خفيف للسنوات الأحدث (نمو السكان).
+    * التغطية: نسبة حضور أول زيارة لكل مركز، تتناقص مع كل زيارة تالية،
+      والطفل الذي يفوته موعد يتسرب غالباً (dropout).
+    * التأخير: الجرعة تُعطى غالباً خلال أيام من موعدها (توزيع أُسّي).
+- حسابات العائلات تُنشأ بكلمات مرور غير قابلة للاستخدام (تجزئة PBKDF2 لمليون حساب
+  تستغرق ساعات) — البيانات للقياس لا لتسجيل الدخول.
+
+    from api.synthetic import SyntheticGenerator
+    generator = SyntheticGenerator(seed=42)
+    generator.prepare(min_centers=300)
+    result = generator.run(children=1_000_000)
+"""
+import datetime
+import random
+from collections import defaultdict
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from centers.models import CenterComplaint, CenterRatingSummary, Directorate, HealthCenter
+from medical.identity import family_identity_key
+from medical.models import Child, ChildVaccineSchedule, Family, VaccineRecord, VaccineSchedule
+from medical.services import CHUNK_SIZE, build_family_user, compute_due_date
+from notifications.models import NotificationLog
+
+from . import rollups
+from .cache import bump_version
+from .signals import COVERAGE_NAMESPACE
+
+MALE_NAMES = (
+    'محمد', 'أحمد', 'علي', 'عبدالله', 'عمر', 'خالد', 'صالح', 'ياسر', 'فهد', 'يوسف',
+    'إبراهيم', 'حسن', 'حسين', 'عبدالرحمن', 'سعيد', 'ناصر', 'مراد', 'فيصل', 'هشام', 'وليد',
+    'عادل', 'جمال', 'طارق', 'ماجد', 'منصور', 'نبيل', 'رشاد', 'عبدالكريم', 'عبدالعزيز', 'أنور',
+    'بشير', 'توفيق', 'زكريا', 'سامي', 'شكري', 'صادق', 'عصام', 'غالب', 'قاسم', 'لطفي',
+)
+FEMALE_NAMES = (
+    'فاطمة', 'عائشة', 'مريم', 'خديجة', 'زينب', 'أمل', 'سارة', 'نور', 'هدى', 'أسماء',
+    'رقية', 'سمية', 'حنان', 'ليلى', 'منى', 'سعاد', 'نادية', 'إيمان', 'رحاب', 'بلقيس',
+    'أروى', 'هناء', 'وفاء', 'ياسمين', 'شيماء', 'رنا', 'دعاء', 'عفاف', 'جميلة', 'لمياء',
+)
+PLACES_OF_BIRTH = ('مستشفى', 'المنزل', 'مركز صحي', 'مستوصف خاص')
+PLACES_OF_BIRTH_WEIGHTS = (50, 35, 10, 5)
+
+# عدد الأطفال المسجلين في العائلة
+CHILDREN_PER_FAMILY = (1, 2, 3, 4, 5)
+CHILDREN_PER_FAMILY_WEIGHTS = (40, 30, 17, 9, 4)
+
+STAFF_PER_CENTER = 3
+# احتمال أن يتسرب الطفل نهائياً بعد أن يفوته موعد
+DROPOUT_AFTER_MISS = 0.5
+# متوسط التأخير (أيام) بين موعد الجرعة وإعطائها
+MEAN_DELAY_DAYS = 7
+# نسبة الزيارات التي يقيّم فيها ولي الأمر المركز
+COMPLAINT_RATE = 0.04
+NEGATIVE_COMPLAINTS = ('VACCINE_UNAVAILABLE', 'SUBSTITUTE_GIVEN', 'ILLEGAL_FEES', 'BAD_TREATMENT', 'STAFF_ABSENT')
+# الإشعارات: طلبات التقييم لزيارات آخر NOTIFY_DAYS يوماً + تنبيه لكل طفل متأخر
+NOTIFY_DAYS = 90
+
+
+class SyntheticResult:
+    def __init__(self):
+        self.families = 0
+        self.children = 0
+        self.schedules = 0
+        self.records = 0
+        self.complaints = 0
+        self.notifications = 0
+
+    def add(self, other):
+        for field, value in vars(other).items():
+            setattr(self, field, getattr(self, field) + value)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class SyntheticGenerator:
+    """
+    seed: البذرة (نفس البذرة = نفس البيانات)
+    years: مدى تواريخ الميلاد بالسنوات حتى today
+    batch_size: عدد العائلات في كل دفعة (transaction واحد لكل دفعة)
+    """
+
+    def __init__(self, seed=1, years=6, batch_size=2000, today=None,
+                 complaints=True, notifications=True):
+        self.rng = random.Random(seed)
+        self.years = years
+        self.batch_size = batch_size
+        self.today = today or timezone.now().date()
+        self.complaints = complaints
+        self.notifications = notifications
+
+        self.centers = []
+        self.profiles = {}
+        self.staff = {}
+        self.visits = []
+        self.basic_ids = set()
+        self._due_dates = {}
+        self._seen_keys = set()
+
+    # ---------- البيانات المرجعية ----------
+
+    def prepare(self, min_centers=0):
+        """تحميل جداول اللقاحات والمراكز، وإنشاء مراكز وموظفين تجريبيين عند النقص"""
+        schedules = list(VaccineSchedule.objects.order_by('age_in_months', 'dose_number', 'id'))
+        if not schedules:
+            raise ValidationError("لا توجد جداول لقاحات — شغّل populate_db_vaccines.py أولاً.")
+        by_age = defaultdict(list)
+        for item in schedules:
+            by_age[item.age_in_months].append(item)
+        # الجرعات المستحقة في نفس العمر تُعطى في زيارة واحدة
+        self.visits = sorted(by_age.items())
+        self.basic_ids = {s.id for s in schedules if s.stage == 'BASIC'}
+
+        centers = list(HealthCenter.objects.filter(is_active=True).select_related('directorate').order_by('id'))
+        if len(centers) < min_centers:
+            centers += self._create_centers(min_centers - len(centers), start=len(centers) + 1)
+        if not centers:
+            raise ValidationError("لا توجد مراكز صحية نشطة — استخدم --centers لإنشاء مراكز تجريبية.")
+        self.centers = centers
+
+        for center in centers:
+            self.profiles[center.id] = {
+                'weight': self.rng.lognormvariate(0, 0.9),
+                'coverage': self.rng.uniform(0.75, 0.97),   # حضور أول زيارة
+                'retention': self.rng.uniform(0.93, 0.995),  # تناقص الحضور مع كل زيارة
+                'rating': self.rng.uniform(2.5, 4.8),
+            }
+        self.staff = self._ensure_staff(centers)
+        self._cum_weights = list(accumulate(self.profiles[c.id]['weight'] for c in centers))
+
+    def _create_centers(self, count, start):
+        directorates = list(Directorate.objects.select_related('governorate').order_by('id'))
+        if not directorates:
+            raise ValidationError("لا توجد مديريات — شغّل populate_governorates.py و populate_directorates.py أولاً.")
+        created = []
+        for i in range(start, start + count):
+            directorate = directorates[self.rng.randrange(len(directorates))]
+            # save() فردي: كود المركز يُحجز من عدّاد المديرية
+            center, _ = HealthCenter.objects.get_or_create(
+                name_ar=f"مركز تجريبي {i}", governorate=directorate.governorate, directorate=directorate,
+                defaults={'address': directorate.name_ar, 'is_active': True},
+            )
+            created.append(center)
+        return created
+
+    def _ensure_staff(self, centers):
+        """STAFF_PER_CENTER موظف على الأقل لكل مركز (يسجلون الجرعات)"""
+        User = get_user_model()
+        staff = defaultdict(list)
+        for user_id, center_id in User.objects.filter(
+            health_center__in=centers, role__in=['CENTER_STAFF', 'CENTER_MANAGER'], is_active=True
+        ).order_by('id').values_list('id', 'health_center_id'):
+            staff[center_id].append(user_id)
+
+        missing = [
+            User(username=f"synthetic-{center.center_code or center.id}-{n}", role='CENTER_STAFF',
+                 health_center=center, password=UNUSABLE_PASSWORD_PREFIX)
+            for center in centers
+            for n in range(len(staff[center.id]) + 1, STAFF_PER_CENTER + 1)
+        ]
+        User.objects.bulk_create(missing, batch_size=1000)
+        for user in missing:
+            staff[user.health_center_id].append(user.id)
+        return staff
+
+    # ---------- التوزيعات ----------
+
+    def _date_of_birth(self):
+        span = int(self.years * 365.25)
+        # الأس > 1 يجعل السنوات الأحدث أكثر قليلاً
+        return self.today - datetime.timedelta(days=int(span * self.rng.random() ** 1.15))
+
+    def _due_dates_for(self, dob):
+        """
+        [(موعد الزيارة، قيمته لقاعدة البيانات)] لتاريخ ميلاد —
+        مخزنة لأن تواريخ الميلاد بضعة آلاف فقط مهما كان عدد الأطفال
+        """
+        dates = self._due_dates.get(dob)
+        if dates is None:
+            adapt = connection.ops.adapt_datefield_value
+            dates = self._due_dates[dob] = [
+                (due, adapt(due)) for due in (compute_due_date(dob, age) for age, _ in self.visits)
+            ]
+        return dates
+
+    def _father_name(self):
+        names = self.rng.sample(MALE_NAMES, 4)
+        return ' '.join(names)
+
+    def _family_names(self):
+        """اسما أب وأم بمفتاح هوية لم يُستخدم في هذا التوليد"""
+        while True:
+            father = self._father_name()
+            mother = f"{self.rng.choice(FEMALE_NAMES)} {' '.join(self.rng.sample(MALE_NAMES, 3))}"
+            key = family_identity_key(father, mother)
+            if key not in self._seen_keys:
+                self._seen_keys.add(key)
+                return father, mother, key
+
+    def _stars(self, center_id):
+        return min(5, max(1, round(self.rng.gauss(self.profiles[center_id]['rating'], 1.0))))
+
+    # ---------- التوليد ----------
+
+    def run(self, children, progress=None):
+        """
+        توليد عائلات حتى الوصول لعدد الأطفال المطلوب.
+        progress(result) تُستدعى بعد كل دفعة.
+        """
+        if not self.centers:
+            self.prepare()
+        result = SyntheticResult()
+        while result.children < children:
+            batch = self._generate_batch(children - result.children)
+            result.add(batch)
+            if progress:
+                progress(result)
+
+        for center in self.centers:
+            CenterRatingSummary.refresh(center.id)
+        rollups.refresh_centers()
+        bump_version(COVERAGE_NAMESPACE)
+        return result
+
+    def _generate_batch(self, remaining):
+        rng = self.rng
+        center_ids = [c.id for c in self.centers]
+        centers = {c.id: c for c in self.centers}
+
+        # 1. العائلات وعدد أطفال كل عائلة
+        plan = []
+        while len(plan) < self.batch_size and remaining > 0:
+            count = min(remaining, rng.choices(CHILDREN_PER_FAMILY, CHILDREN_PER_FAMILY_WEIGHTS)[0])
+            plan.append(count)
+            remaining -= count
+        family_centers = rng.choices(center_ids, cum_weights=self._cum_weights, k=len(plan))
+
+        names = [self._family_names() for _ in plan]
+        clashes = range(len(names))
+        while clashes:  # عائلات موجودة من تشغيل سابق — أسماء بديلة
+            existing = set(Family.objects.filter(identity_key__in=[names[i][2] for i in clashes])
+                           .values_list('identity_key', flat=True))
+            clashes = [i for i in clashes if names[i][2] in existing]
+            for i in clashes:
+                names[i] = self._family_names()
+
+        result = SyntheticResult()
+        with transaction.atomic():
+            codes = Family.generate_access_codes(len(plan))
+            families = []
+            for (father, mother, key), code, center_id in zip(names, codes, family_centers):
+                families.append(Family(
+                    father_name=father, mother_name=mother, identity_key=key, access_code=code,
+                    created_by_id=rng.choice(self.staff[center_id]),
+                ))
+
+            User = get_user_model()
+            accounts = []
+            for family, center_id in zip(families, family_centers):
+                account = build_family_user(family, password_hash=UNUSABLE_PASSWORD_PREFIX)
+                account.health_center_id = center_id
+                accounts.append(account)
+            User.objects.bulk_create(accounts, batch_size=CHUNK_SIZE)
+            for family, account in zip(families, accounts):
+                family.account = account
+            Family.objects.bulk_create(families, batch_size=CHUNK_SIZE)
+
+            # 2. الأطفال أولاً (نحتاج معرفاتهم)، ثم جداولهم وجرعاتهم
+            kids, kid_plans = [], []
+            for family, center_id, count in zip(families, family_centers, plan):
+                center = centers[center_id]
+                first_names = rng.sample(MALE_NAMES + FEMALE_NAMES, count)
+                surname = ' '.join(family.father_name.split()[:3])
+                for first_name in first_names:
+                    child, *child_plan = self._child(family, center, first_name, surname)
+                    kids.append(child)
+                    kid_plans.append(child_plan)
+            Child.objects.bulk_create(kids, batch_size=CHUNK_SIZE)
+
+            ops = connection.ops
+            created_at = ops.adapt_datetimefield_value(timezone.now())
+            schedule_rows, record_rows = [], []
+            for child, (schedules, visits, _) in zip(kids, kid_plans):
+                for schedule_id, due, taken in schedules:
+                    schedule_rows.append((child.id, schedule_id, due, taken))
+                for given, staff_id, items in visits:
+                    date_given = ops.adapt_datefield_value(given)
+                    for item in items:
+                        record_rows.append((child.id, item.vaccine_id, item.dose_number, date_given,
+                                            staff_id, child.health_center_id, created_at))
+            _insert_rows(ChildVaccineSchedule, ('child', 'vaccine_schedule', 'due_date', 'is_taken'), schedule_rows)
+            _insert_rows(VaccineRecord, ('child', 'vaccine', 'dose_number', 'date_given',
+                                         'staff', 'health_center', 'created_at'), record_rows)
+
+            if self.complaints:
+                result.complaints = self._complaints(kids, kid_plans)
+            if self.notifications:
+                result.notifications = self._notifications(kids, kid_plans)
+
+        result.families = len(families)
+        result.children = len(kids)
+        result.schedules = len(schedule_rows)
+        result.records = len(record_rows)
+        return result
+
+    def _child(self, family, center, first_name, surname):
+        """
+        طفل (غير محفوظ) + جدوله [(vaccine_schedule_id, due_date, is_taken)]
+        + زياراته [(date_given, staff_id, جداول اللقاحات المعطاة)] + هل فاته موعد
+        """
+        rng = self.rng
+        profile = self.profiles[center.id]
+        dob = self._date_of_birth()
+        staff = self.staff[center.id]
+
+        schedules, visits = [], []
+        active = True
+        chance = profile['coverage']
+        basic_pending = overdue = False
+        last_basic = None
+        for (age, items), (due, db_due) in zip(self.visits, self._due_dates_for(dob)):
+            given = None
+            if active and due <= self.today and rng.random() < chance:
+                given = due + datetime.timedelta(days=int(rng.expovariate(1 / MEAN_DELAY_DAYS)))
+                if given > self.today:
+                    given = None  # سيأتي لاحقاً — ما زال مستحقاً
+            elif due <= self.today and active:
+                active = rng.random() >= DROPOUT_AFTER_MISS
+            chance *= profile['retention']
+
+            taken = given is not None
+            overdue = overdue or (not taken and due < self.today)
+            for item in items:
+                schedules.append((item.id, db_due, taken))
+                if item.id in self.basic_ids:
+                    if not taken:
+                        basic_pending = True
+                    elif last_basic is None or given > last_basic:
+                        last_basic = given
+            if taken:
+                visits.append((given, rng.choice(staff), items))
+
+        completed = not basic_pending and last_basic is not None
+        child = Child(
+            full_name=f"{first_name} {surname}",
+            gender='F' if first_name in FEMALE_NAMES else 'M',
+            date_of_birth=dob,
+            family=family,
+            health_center_id=center.id,
+            birth_governorate_id=center.governorate_id,
+            birth_directorate_id=center.directorate_id,
+            place_of_birth=rng.choices(PLACES_OF_BIRTH, PLACES_OF_BIRTH_WEIGHTS)[0],
+            is_completed=completed,
+            completed_date=last_basic if completed else None,
+            created_by_id=rng.choice(staff),
+        )
+        return child, schedules, visits, overdue and not completed
+
+    def _complaints(self, kids, kid_plans):
+        """تقييم لنسبة COMPLAINT_RATE من الزيارات — مرتبط بأول جرعة في الزيارة"""
+        sampled = []
+        for child, (_, visits, _) in zip(kids, kid_plans):
+            for _, _, items in visits:
+                if self.rng.random() < COMPLAINT_RATE:
+                    sampled.append((child, items[0]))
+        if not sampled:
+            return 0
+
+        record_ids = {}
+        for chunk in _chunks(sorted({child.id for child, _ in sampled})):
+            for pk, child_id, vaccine_id, dose in VaccineRecord.objects.filter(child_id__in=chunk)\
+                    .values_list('id', 'child_id', 'vaccine_id', 'dose_number'):
+                record_ids[(child_id, vaccine_id, dose)] = pk
+
+        complaints = []
+        for child, item in sampled:
+            stars = self._stars(child.health_center_id)
+            complaints.append(CenterComplaint(
+                vaccine_record_id=record_ids[(child.id, item.vaccine_id, item.dose_number)],
+                health_center_id=child.health_center_id,
+                family_id=child.family_id,
+                stars=stars,
+                complaint_type=self.rng.choice(NEGATIVE_COMPLAINTS) if stars <= 2 else None,
+                status=self.rng.choice(('PENDING', 'REVIEWED', 'RESOLVED')),
+            ))
+        CenterComplaint.objects.bulk_create(complaints, batch_size=CHUNK_SIZE)
+        return len(complaints)
+
+    def _notifications(self, kids, kid_plans):
+        """طلب تقييم لكل زيارة في آخر NOTIFY_DAYS يوماً + تنبيه تأخير لكل طفل فاته موعد"""
+        since = self.today - datetime.timedelta(days=NOTIFY_DAYS)
+        notifications = []
+        for child, (_, visits, overdue) in zip(kids, kid_plans):
+            recipient_id = child.family.account_id
+            for given, _, _ in visits:
+                if given >= since:
+                    notifications.append(NotificationLog(
+                        recipient_id=recipient_id,
+                        title="تقييم زيارة التطعيم 🌟",
+                        body=f"تم تسجيل تطعيمات لطفلك {child.full_name}. شاركنا رأيك في الخدمة المقدمة!",
+                        notification_type='COMPLAINT_PROMPT',
+                        is_read=self.rng.random() < 0.6,
+                    ))
+            if overdue:
+                notifications.append(NotificationLog(
+                    recipient_id=recipient_id,
+                    title=f"تحذير: فات موعد تطعيم - {child.full_name}",
+                    body=f"طفلك ({child.full_name}) قد فاته موعد تطعيم. يرجى التوجه للمركز بأقرب وقت!",
+                    notification_type='MISSED',
+                    is_read=self.rng.random() < 0.4,
+                ))
+        NotificationLog.objects.bulk_create(notifications, batch_size=CHUNK_SIZE)
+        return len(notifications)
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _insert_rows(model, fields, rows):
+    """
+    INSERT مُجهّز واحد عبر executemany لجداول الملايين (الاستحقاقات والجرعات):
+    بدون بناء كائن موديل وتجميع SQL لكل دفعة كما في bulk_create.
+    rows: قيم جاهزة لقاعدة البيانات بترتيب fields.
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(f).column) for f in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})", rows
+        )
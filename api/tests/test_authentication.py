@@ -0,0 +1,56 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api import cache as api_cache
+from api.authentication import CachedTokenAuthentication
+from users.models import CustomUser
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """الإبطال لكل مستخدم: حفظ مستخدم لا يفرغ التوكنات المخزنة لغيره"""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        # نسخ العامل من اختبار سابق (قاعدة البيانات أُعيدت لكن اللقطة في الذاكرة)
+        api_cache._versions_checked_at = None
+        self.auth = CachedTokenAuthentication()
+        self.alice = CustomUser.objects.create_user('alice', role='CENTER_STAFF')
+        self.bob = CustomUser.objects.create_user('bob', role='CENTER_STAFF')
+        self.alice_token = Token.objects.create(user=self.alice)
+        self.bob_token = Token.objects.create(user=self.bob)
+
+    def _authenticate(self, token):
+        with CaptureQueriesContext(connection) as ctx:
+            user, _ = self.auth.authenticate_credentials(token.key)
+        return user, len(ctx)
+
+    def test_other_user_save_keeps_cached_token(self):
+        self._authenticate(self.alice_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob.first_name = 'بوب'
+            self.bob.save()
+        _, queries = self._authenticate(self.alice_token)
+        self.assertEqual(queries, 0)
+
+    def test_role_change_reloads_only_that_user(self):
+        self._authenticate(self.alice_token)
+        self._authenticate(self.bob_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.role = 'CENTER_MANAGER'
+            self.alice.save(update_fields=['role'])
+
+        user, _ = self._authenticate(self.alice_token)
+        self.assertEqual(user.role, 'CENTER_MANAGER')
+        _, queries = self._authenticate(self.bob_token)
+        self.assertEqual(queries, 0)
+
+    def test_logout_invalidates_token(self):
+        self._authenticate(self.alice_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice_token.delete()
+        with self.assertRaises(Exception):
+            self.auth.authenticate_credentials(self.alice_token.key)
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+
+@override_settings(CRON_SECRET='test-cron-secret')
+class CronJobViewTests(TestCase):
+    """كل مهمة مجدولة لها رابط مستقل محمي بـ CRON_SECRET"""
+
+    def test_rejects_wrong_secret(self):
+        with mock.patch('api.views.call_command') as command:
+            response = self.client.get('/api/cron/jobs/refresh-rollups/', {'secret': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+        command.assert_not_called()
+
+    def test_unknown_job(self):
+        response = self.client.get('/api/cron/jobs/nope/', {'secret': 'test-cron-secret'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_runs_nightly_jobs(self):
+        for job, command_name in (('refresh-rollups', 'refresh_rollups'), ('precompute-forecast', 'precompute_forecast')):
+            with self.subTest(job=job), mock.patch('api.views.call_command') as command:
+                response = self.client.get(f'/api/cron/jobs/{job}/', {'secret': 'test-cron-secret'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(command.call_args.args, (command_name,))
+
+    def test_provision_sweep_skips_families_still_queued(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from medical.models import Family
+
+        with self.settings(FAMILY_ACCOUNTS_ASYNC=True):
+            old = Family.objects.create(father_name='علي محمد سالم', mother_name='فاطمة أحمد')
+            new = Family.objects.create(father_name='سالم محمد علي', mother_name='منى أحمد')
+        Family.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+        response = self.client.get('/api/cron/jobs/provision-family-accounts/', {'secret': 'test-cron-secret'})
+        self.assertEqual(response.status_code, 200)
+        old.refresh_from_db()
+        new.refresh_from_db()
+        self.assertIsNotNone(old.account_id)
+        self.assertIsNone(new.account_id)
@@ -0,0 +1,35 @@
+import csv
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.importers import ImportResult
+
+
+class ImportChildrenErrorsTests(TestCase):
+    """ملف --errors-csv يحوي كل أخطاء الصفوف حتى بعد تجاوز MAX_REPORTED_ERRORS"""
+
+    def test_errors_csv_is_not_truncated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'children.csv')
+            with open(source, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['full_name', 'gender', 'date_of_birth'])
+                for i in range(5):
+                    writer.writerow([f'طفل {i}', 'X', 'not-a-date'])
+            errors_csv = os.path.join(tmp, 'errors.csv')
+            out = io.StringIO()
+
+            with mock.patch.object(ImportResult, 'MAX_REPORTED_ERRORS', 2):
+                call_command('import_children', source, errors_csv=errors_csv, skip_accounts=True, stdout=out)
+
+            with open(errors_csv, encoding='utf-8-sig') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['row', 'errors'])
+        self.assertEqual(len(rows) - 1, 5)
+        self.assertIn('أخطاء 5', out.getvalue())
+        self.assertIn('و 3 خطأ آخر', out.getvalue())
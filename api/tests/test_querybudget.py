@@ -0,0 +1,94 @@
+import datetime
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import resolve
+
+from api import cache as api_cache
+from api.querybudget import QUERY_BUDGETS, QUERY_HEADROOM, assert_query_budget
+from centers.models import Directorate, Governorate, HealthCenter
+from medical.models import Child, Family, Vaccine, VaccineRecord, VaccineSchedule
+from users.models import CustomUser
+
+CHILDREN_PER_CENTER = 15
+
+
+class QueryBudgetTests(TestCase):
+    """
+    الـ endpoints المسجلة في QUERY_BUDGETS تبقى ضمن ميزانيتها (ناقص QUERY_HEADROOM) مهما كان عدد الصفوف —
+    للإدارة (كل المراكز) ولموظف المركز (مركزه فقط)، والكاش فارغ (أسوأ حالة).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        governorate = Governorate.objects.create(name_ar='إب', code='14')
+        directorate = Directorate.objects.create(governorate=governorate, name_ar='المشنة', code='01')
+        cls.centers = [
+            HealthCenter.objects.create(
+                governorate=governorate, directorate=directorate, name_ar=f'مركز {i}', address='-',
+            )
+            for i in range(2)
+        ]
+        vaccines = [Vaccine.objects.create(name_ar=name) for name in ('BCG', 'OPV', 'Penta')]
+        for month, vaccine in enumerate(vaccines):
+            VaccineSchedule.objects.create(vaccine=vaccine, dose_number=1, age_in_months=month * 2)
+
+        cls.admin = CustomUser.objects.create_user('budget-admin', role='ADMIN', is_staff=True, is_superuser=True)
+        cls.staff = CustomUser.objects.create_user('budget-staff', role='CENTER_STAFF', health_center=cls.centers[0])
+
+        today = datetime.date.today()
+        for center in cls.centers:
+            for i in range(CHILDREN_PER_CENTER):
+                family = Family.objects.create(
+                    father_name=f'علي محمد سالم {center.pk}{i}', mother_name=f'فاطمة أحمد {center.pk}{i}',
+                )
+                child = Child.objects.create(
+                    family=family, full_name=f'طفل {center.pk}{i}', gender='M' if i % 2 else 'F',
+                    date_of_birth=today - datetime.timedelta(days=30 + 20 * i), place_of_birth='-',
+                    health_center=center, created_by=cls.admin,
+                )
+                for vaccine in vaccines[:i % 3 + 1]:
+                    VaccineRecord.objects.create(
+                        child=child, vaccine=vaccine, dose_number=1, date_given=today,
+                        staff=cls.staff, health_center=center,
+                    )
+        cls.child = Child.objects.filter(health_center=cls.centers[0]).first()
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        # إعادة قراءة نسخ الكاش جزء من أسوأ حالة
+        api_cache._versions_checked_at = None
+
+    def _assert_within_budget(self, path):
+        # الميزانية ناقص الهامش: أي استعلام ثابت جديد يُلزم بتحديث QUERY_BUDGETS صراحة
+        budget = QUERY_BUDGETS[resolve(path).view_name] - QUERY_HEADROOM
+        return assert_query_budget(self.client, path, budget=budget)
+
+    def _paths(self):
+        return [
+            '/api/children/',
+            f'/api/children/{self.child.pk}/',
+            f'/api/families/{self.child.family_id}/',
+            f'/api/families/{self.child.family_id}/children/',
+            '/api/health-centers/',
+            f'/api/health-centers/{self.centers[0].pk}/children/',
+            '/api/dashboard/stats/',
+        ]
+
+    def test_every_budget_is_exercised(self):
+        self.assertEqual({resolve(path).view_name for path in self._paths()}, set(QUERY_BUDGETS))
+
+    def test_admin_within_budget(self):
+        self.client.force_login(self.admin)
+        for path in self._paths():
+            with self.subTest(path=path):
+                response = self._assert_within_budget(path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_center_staff_within_budget(self):
+        self.client.force_login(self.staff)
+        for path in self._paths():
+            with self.subTest(path=path):
+                response = self._assert_within_budget(path)
+                self.assertEqual(response.status_code, 200)
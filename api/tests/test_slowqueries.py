@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import TransactionTestCase
+
+from api import slowqueries
+from users.models import CustomUser
+
+
+class SlowQueryWrapperReconnectTests(TransactionTestCase):
+    """
+    الاتصال يُعاد فتحه داخل الطلب (أول استعلام) — أي داخل كتلة عداد QueryMetricsMiddleware.
+    يجب أن يبقى wrapper الاستعلامات البطيئة وحده بعد كل طلب، بدون عدادات متراكمة.
+    """
+
+    def setUp(self):
+        self._stale = []
+        self._wrappers = list(connection.execute_wrappers)
+        connection_created.connect(slowqueries._on_connection_created, dispatch_uid='test-slow-query-wrapper')
+        user = CustomUser.objects.create_user('slow-query-test', role='MINISTRY')
+        self.client.force_login(user)
+
+    def tearDown(self):
+        connection_created.disconnect(dispatch_uid='test-slow-query-wrapper')
+        connection.execute_wrappers[:] = self._wrappers
+        for raw in self._stale:
+            raw.close()
+
+    def _drop_connection(self):
+        # مثل CONN_MAX_AGE=0: الاتصال التالي يُفتح مع أول استعلام في الطلب.
+        # الاتصال القديم يبقى مفتوحاً حتى لا تُحذف قاعدة SQLite المؤقتة في الذاكرة.
+        connection.ensure_connection()
+        self._stale.append(connection.connection)
+        connection.connection = None
+
+    def test_wrappers_do_not_accumulate_across_reconnects(self):
+        with mock.patch.object(slowqueries, '_threshold', 0), \
+                mock.patch.object(slowqueries, '_capture') as capture:
+            for _ in range(4):
+                self._drop_connection()
+                capture.reset_mock()
+                response = self.client.get('/api/governorates/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(connection.execute_wrappers, [*self._wrappers, slowqueries._wrapper])
+                self.assertTrue(capture.called)
@@ -0,0 +1,152 @@
+"""
+سلاسل زمنية للوحة الوزارة: عدد الجرعات / التسجيلات / حالات الاكتمال لكل يوم / أسبوع / شهر.
+
+كل سلسلة استعلام GROUP BY واحد بدالة Trunc (مهما كان طول الفترة)،
+والفترات الفارغة تُملأ بصفر في Python حتى يبقى الرسم البياني متصلاً.
+
+    from api.timeseries import series
+    data = series('doses', 'month', date(2025, 1, 1), date(2025, 12, 31), governorate_id=3)
+"""
+import datetime
+
+from django.db.models import Count, DateField
+from django.db.models.functions import Trunc
+
+from medical.models import Child, VaccineRecord
+
+# لكل مؤشر: الاستعلام، حقل المركز (للفلترة حسب المنطقة)، وحقل التاريخ الذي يُجمّع عليه
+METRICS = {
+    'doses': {
+        'queryset': lambda: VaccineRecord.objects.all(),
+        'center_field': 'health_center',
+        'date_field': 'date_given',
+    },
+    'registrations': {
+        'queryset': lambda: Child.objects.all(),
+        'center_field': 'health_center',
+        'date_field': 'created_at',
+    },
+    'completions': {
+        'queryset': lambda: Child.objects.filter(is_completed=True),
+        'center_field': 'health_center',
+        'date_field': 'completed_date',
+    },
+}
+
+BUCKETS = ('day', 'week', 'month')
+
+# الفترة الافتراضية لكل وحدة (عدد الوحدات حتى اليوم)
+DEFAULT_SPAN = {'day': 90, 'week': 26, 'month': 12}
+
+# حد أقصى لعدد النقاط في سلسلة واحدة (يمنع طلب 20 سنة يومياً مثلاً)
+MAX_POINTS = 1000
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - datetime.timedelta(days=day.weekday())  # الاثنين (مثل TruncWeek)
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + datetime.timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return day + datetime.timedelta(days=1)
+
+
+def periods(bucket, date_from, date_to):
+    """بدايات كل الفترات بين التاريخين (شاملة)"""
+    current, end = _bucket_start(date_from, bucket), _bucket_start(date_to, bucket)
+    result = []
+    while current <= end:
+        result.append(current)
+        current = _next_bucket(current, bucket)
+    return result
+
+
+def default_range(bucket, today):
+    """(date_from, date_to) الافتراضية: آخر DEFAULT_SPAN وحدة حتى اليوم"""
+    start = _bucket_start(today, bucket)
+    for _ in range(DEFAULT_SPAN[bucket] - 1):
+        start = _bucket_start(start - datetime.timedelta(days=1), bucket)
+    return start, today
+
+
+def shift_year(day, years):
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:  # 29 فبراير
+        return day.replace(year=day.year + years, day=28)
+
+
+def bucket_counts(queryset, date_field, bucket, date_from, date_to):
+    """
+    عدد الصفوف لكل فترة — استعلام واحد.
+    يعيد (قائمة بدايات الفترات، قائمة الأعداد) بنفس الترتيب والطول.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    all_periods = periods(bucket, date_from, date_to)
+    if len(all_periods) > MAX_POINTS:
+        raise ValueError(f"range too long: more than {MAX_POINTS} {bucket}s")
+
+    # __date لحقول DateTimeField (بتوقيت المشروع) — DateField تُفلتر مباشرة
+    field = queryset.model._meta.get_field(date_field)
+    lookup = f'{date_field}__date' if field.get_internal_type() == 'DateTimeField' else date_field
+
+    rows = queryset.filter(**{f'{lookup}__gte': date_from, f'{lookup}__lte': date_to})\
+        .annotate(period=Trunc(date_field, bucket, output_field=DateField()))\
+        .values('period').annotate(count=Count('pk')).order_by()
+    counts = {row['period']: row['count'] for row in rows}
+    return all_periods, [counts.get(p, 0) for p in all_periods]
+
+
+def build_queryset(metric, center_id=None, directorate_id=None, governorate_id=None):
+    config = METRICS[metric]
+    center_field = config['center_field']
+
+    qs = config['queryset']()
+    if center_id:
+        qs = qs.filter(**{f'{center_field}_id': center_id})
+    if directorate_id:
+        qs = qs.filter(**{f'{center_field}__directorate_id': directorate_id})
+    if governorate_id:
+        qs = qs.filter(**{f'{center_field}__governorate_id': governorate_id})
+    return qs
+
+
+def series(metric, bucket, date_from, date_to, compare=False, **scope):
+    """
+    سلسلة مؤشر واحد. compare=True يضيف نفس الفترة من السنة السابقة (استعلام إضافي واحد).
+    scope: center_id، directorate_id، governorate_id
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    queryset = build_queryset(metric, **scope)
+    date_field = METRICS[metric]['date_field']
+
+    labels, counts = bucket_counts(queryset, date_field, bucket, date_from, date_to)
+    data = {
+        'metric': metric,
+        'bucket': bucket,
+        'date_from': date_from,
+        'date_to': date_to,
+        'periods': labels,
+        'counts': counts,
+        'total': sum(counts),
+    }
+    if compare:
+        prev_from, prev_to = shift_year(date_from, -1), shift_year(date_to, -1)
+        prev_labels, prev_counts = bucket_counts(queryset, date_field, bucket, prev_from, prev_to)
+        data['previous_year'] = {
+            'date_from': prev_from,
+            'date_to': prev_to,
+            'periods': prev_labels,
+            'counts': prev_counts,
+            'total': sum(prev_counts),
+        }
+    return data
@@ -9,8 +9,10 @@ from .views import (
     HealthCenterViewSet, UserViewSet, FamilyViewSet,
     ChildViewSet, VaccineViewSet, VaccineRecordViewSet,
     UpdateFCMTokenView, DashboardStatsView, ReportsByCenterView,
-    NotificationViewSet, AllVaccinesCoverageReportView,
-    TriggerRemindersCronView,
+    NotificationViewSet, AllVaccinesCoverageReportView, DoseCoverageReportView,
+    CohortCoverageReportView, DropoutReportView, DefaulterListView, DataExportView,
+    RegionRollupView, TimeSeriesView, DemandForecastView, ThroughputReportView, CacheStatsView, MetricsView,
+    TriggerRemindersCronView, CronJobView,
     CenterComplaintViewSet, CenterComplaintReportView
 )
 
@@ -44,8 +46,22 @@ urlpatterns = [
     # Reports (New)
     path('reports/by-center/', ReportsByCenterView.as_view(), name='reports_by_center'),
     path('reports/all-vaccines-coverage/', AllVaccinesCoverageReportView.as_view(), name='all-vaccines-coverage'),
+    path('reports/dose-coverage/', DoseCoverageReportView.as_view(), name='dose-coverage'),
+    path('reports/cohort-coverage/', CohortCoverageReportView.as_view(), name='cohort-coverage'),
+    path('reports/dropout/', DropoutReportView.as_view(), name='dropout'),
+    path('reports/rollups/', RegionRollupView.as_view(), name='region-rollups'),
+    path('reports/timeseries/', TimeSeriesView.as_view(), name='timeseries'),
+    path('reports/forecast/', DemandForecastView.as_view(), name='demand-forecast'),
+    path('reports/throughput/', ThroughputReportView.as_view(), name='throughput'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('defaulters/', DefaulterListView.as_view(), name='defaulters'),
+
+    # Streaming exports (CSV / NDJSON)
+    path('exports/<str:dataset>.<str:fmt>', DataExportView.as_view(), name='data-export'),
     path('reports/complaints/', CenterComplaintReportView.as_view(), name='complaints-report'),
     
     # Webhook for Render cron jobs
     path('cron/trigger-reminders/', TriggerRemindersCronView.as_view(), name='cron_trigger_reminders'),
+    path('cron/jobs/<str:job>/', CronJobView.as_view(), name='cron_job'),
 ]
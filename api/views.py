@@ -7,19 +7,23 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q  # ✅ للحسابات المُجمَّعة في قاعدة البيانات
+from django.db.models import Count, Exists, Max, OuterRef, Prefetch, Q, Sum  # ✅ للحسابات المُجمَّعة في قاعدة البيانات
 
 from django.shortcuts import render, get_object_or_404
+from django.http import HttpResponse, StreamingHttpResponse
 import datetime
+from collections import defaultdict
 from datetime import timedelta     # For stats
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
 from django.utils import timezone  # For stats (هنا الاستدعاء الصحيح)
 
 from users.models import CustomUser
 from centers.models import HealthCenter, Governorate, Directorate
-from medical.models import Child, Family, Vaccine, VaccineRecord, ChildVaccineSchedule
+from medical.models import Child, Family, Vaccine, VaccineRecord, ChildVaccineSchedule, VaccineSchedule
 
 from .serializers import (
     GovernorateSerializer, DirectorateSerializer,
@@ -28,11 +32,25 @@ from .serializers import (
     ProfileSelfUpdateSerializer,
     FamilyListSerializer, FamilyDetailSerializer, FamilyCreateUpdateSerializer,
     ChildListSerializer, ChildDetailSerializer, ChildCreateUpdateSerializer,
+    CHILD_DETAIL_RELATED, child_prefetches,
     VaccineListSerializer, VaccineDetailSerializer, VaccineCreateUpdateSerializer,
     VaccineRecordListSerializer, VaccineRecordDetailSerializer, VaccineRecordCreateUpdateSerializer,
     NotificationLogSerializer
 )
-from .permissions import IsCenterStaffOrReadOnly
+from .authentication import CachedTokenAuthentication
+from .permissions import HasMetricsToken, IsCenterStaffOrReadOnly
+from .cache import cache_response, cached, stats as cache_stats
+from .conditional import VersionedRetrieveMixin
+from .reference import ReferenceDataMixin
+from .models import RegionRollup, RegionVaccineRollup
+from .exports import DATASETS, FORMATS as EXPORT_FORMATS, build_queryset as build_export_queryset
+from .forecast import DEFAULT_WEEKS as FORECAST_DEFAULT_WEEKS, MAX_WEEKS as FORECAST_MAX_WEEKS, forecast as demand_forecast
+from .timeseries import (
+    BUCKETS as TIMESERIES_BUCKETS, METRICS as TIMESERIES_METRICS,
+    bucket_counts, default_range as timeseries_default_range, series as timeseries,
+)
+from medical.analytics import REGION_FIELDS, cohort_coverage
+from .signals import COVERAGE_NAMESPACE
 from notifications.models import NotificationLog
 
 # ============== Child Pagination ==============
@@ -48,7 +66,7 @@ class ChildPagination(PageNumberPagination):
 
 # ============== Governorate ViewSet ==============
 
-class GovernorateViewSet(viewsets.ModelViewSet):
+class GovernorateViewSet(ReferenceDataMixin, viewsets.ModelViewSet):
     """
     API للمحافظات (إدارة كاملة للسوبر أدمن والوزارة)
     """
@@ -66,11 +84,11 @@ class GovernorateViewSet(viewsets.ModelViewSet):
 
 # ============== Directorate ViewSet ==============
 
-class DirectorateViewSet(viewsets.ModelViewSet):
+class DirectorateViewSet(ReferenceDataMixin, viewsets.ModelViewSet):
     """
     API للمديريات (إدارة كاملة للسوبر أدمن والوزارة)
     """
-    queryset = Directorate.objects.all()
+    queryset = Directorate.objects.select_related('governorate')
     serializer_class = DirectorateSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['governorate']
@@ -90,7 +108,8 @@ class HealthCenterViewSet(viewsets.ModelViewSet):
     """
     API للمراكز الصحية
     """
-    queryset = HealthCenter.objects.all()
+    # rating_summary: متوسط التقييم وعدده بدون استعلام لكل مركز
+    queryset = HealthCenter.objects.select_related('governorate', 'directorate', 'rating_summary')
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -100,7 +119,7 @@ class HealthCenterViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
         
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['governorate', 'directorate', 'is_active']
     search_fields = ['name_ar', 'name_en', 'center_code']
@@ -124,7 +143,7 @@ class HealthCenterViewSet(viewsets.ModelViewSet):
     def children(self, request, pk=None):
         """الأطفال في المركز"""
         center = self.get_object()
-        children = Child.objects.filter(health_center=center)
+        children = _child_list_queryset(Child.objects.filter(health_center=center))
         serializer = ChildListSerializer(children, many=True)
         return Response(serializer.data)
 
@@ -138,9 +157,11 @@ class HealthCenterViewSet(viewsets.ModelViewSet):
         center = self.get_object()
         reviews = center.complaints.filter(stars__isnull=False).order_by('-created_at')
         serializer = CenterReviewSerializer(reviews, many=True)
+        summary = getattr(center, 'rating_summary', None)
         return Response({
-            'count': reviews.count(),
-            'average': round(sum(r.stars for r in reviews) / reviews.count(), 1) if reviews.exists() else 0.0,
+            'count': summary.stars_count if summary else 0,
+            'average': round(summary.stars_sum / summary.stars_count, 1) if summary and summary.stars_count else 0.0,
+            'histogram': summary.histogram if summary else {},
             'results': serializer.data,
         })
 
@@ -167,7 +188,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return CustomUser.objects.none()
         
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['role', 'is_active', 'health_center']
     search_fields = ['username', 'first_name', 'last_name']
@@ -211,7 +232,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 # ============== Family ViewSet ==============
 
-class FamilyViewSet(viewsets.ModelViewSet):
+class FamilyViewSet(VersionedRetrieveMixin, viewsets.ModelViewSet):
     """
     API للعائلات
     """
@@ -220,14 +241,30 @@ class FamilyViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        qs = Family.objects.all()
+        if self.action == 'retrieve':
+            # تفاصيل كل الأطفال بعدد ثابت من الاستعلامات مهما كان عددهم
+            qs = qs.prefetch_related(Prefetch(
+                'children',
+                queryset=Child.objects.select_related(*CHILD_DETAIL_RELATED).prefetch_related(*child_prefetches()),
+            ))
         # 1. الموظفين والإدارة: يرون كل العائلات (لأغراض البحث والتسجيل)
         if user.is_superuser or getattr(user, 'role', None) in ['CENTER_MANAGER', 'CENTER_STAFF', 'MINISTRY']:
-            return Family.objects.all()
+            return qs
             
         # 2. العائلات (Customer): يرون بياناتهم فقط
-        return Family.objects.filter(account=user)
+        return qs.filter(account=user)
+
+    def version_parts(self, pk):
+        """نسخة العائلة + نسخ أطفالها (تفاصيل العائلة تشمل تفاصيل كل طفل) — استعلام واحد"""
+        return self.get_queryset().prefetch_related(None).filter(pk=pk).annotate(
+            children_version=Sum('children__version'),
+            children_count=Count('children'),
+            last_child=Max('children__id'),
+            ratings_updated=Max('children__health_center__rating_summary__updated_at'),
+        ).values_list('version', 'children_version', 'children_count', 'last_child', 'ratings_updated').first()
         
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     filter_backends = [filters.SearchFilter]
     search_fields = ['father_name', 'mother_name', 'access_code']
     
@@ -257,14 +294,25 @@ class FamilyViewSet(viewsets.ModelViewSet):
     def children(self, request, pk=None):
         """أطفال العائلة"""
         family = self.get_object()
-        children = Child.objects.filter(family=family)
+        children = _child_list_queryset(Child.objects.filter(family=family))
         serializer = ChildListSerializer(children, many=True)
         return Response(serializer.data)
 
 
 # ============== Child ViewSet ==============
 
-class ChildViewSet(viewsets.ModelViewSet):
+def _child_list_queryset(qs):
+    """
+    ✅ annotate() لنسبة التحصين + prefetch للجداول والسجلات —
+    عدد ثابت من الاستعلامات لقائمة الأطفال مهما كان طولها (يحل N+1 Query)
+    """
+    return qs.annotate(
+        taken_count=Count('vaccine_records', distinct=True),
+        total_schedules=Count('personal_schedule', distinct=True),
+    ).select_related('family', 'health_center').prefetch_related(*child_prefetches())
+
+
+class ChildViewSet(VersionedRetrieveMixin, viewsets.ModelViewSet):
     """
     API للأطفال
     """
@@ -273,19 +321,27 @@ class ChildViewSet(viewsets.ModelViewSet):
     pagination_class = ChildPagination  # فقط هذا الـ ViewSet يستخدم Pagination
     
     def get_queryset(self):
-        user = self.request.user
-
-        # ✅ استخدام annotate() لحساب نسبة التحصين في استعلام واحد (يحل N+1 Query)
-        base_qs = Child.objects.annotate(
-            taken_count=Count('vaccine_records', distinct=True),
-            total_schedules=Count('personal_schedule', distinct=True),
-        ).select_related('family', 'health_center')
+        if self.action == 'retrieve':
+            base_qs = _child_list_queryset(Child.objects.select_related(*CHILD_DETAIL_RELATED))
+        elif self.action == 'list':
+            base_qs = _child_list_queryset(Child.objects.all())
+        else:
+            base_qs = Child.objects.select_related('family', 'health_center')
+        return self._for_user(base_qs)
 
+    def _for_user(self, qs):
+        user = self.request.user
         if user.is_superuser or getattr(user, 'role', None) in ['CENTER_MANAGER', 'CENTER_STAFF', 'MINISTRY']:
-            return base_qs
-        return base_qs.filter(family__account=user)
+            return qs
+        return qs.filter(family__account=user)
+
+    def version_parts(self, pk):
+        """نسخة الطفل والعائلة وتقييم المركز — استعلام مفهرس واحد بدون annotate"""
+        return self._for_user(Child.objects.filter(pk=pk)).values_list(
+            'version', 'family__version', 'health_center__rating_summary__updated_at'
+        ).first()
         
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     
     # استخدام الملف api/filters.py للفلترات المتقدمة
@@ -315,21 +371,64 @@ class ChildViewSet(viewsets.ModelViewSet):
         serializer = VaccineRecordListSerializer(records, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """
+        استيراد جماعي للأطفال من ملف CSV / XLSX (الحقل: file).
+        يعيد عدد السجلات المنشأة وأخطاء كل صف.
+        """
+        from django.core.exceptions import ValidationError as DjangoValidationError
+        from .importers import ChildImporter, iter_rows
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            batch_size = max(1, min(int(request.data.get('batch_size', 1000)), 5000))
+        except (TypeError, ValueError):
+            batch_size = 1000
+
+        # موظفو المراكز يسجلون في مركزهم فقط (مثل تسجيل الطفل الفردي)
+        importer = ChildImporter(
+            health_center=getattr(request.user, 'health_center', None),
+            created_by=request.user,
+            batch_size=batch_size,
+            lock_center=not request.user.is_superuser,
+        )
+        try:
+            result = importer.run(iter_rows(upload, upload.name))
+        except DjangoValidationError as e:
+            return Response({'error': ' '.join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # حسابات العائلات الجديدة تُنشأ في الخلفية (تجزئة كلمات المرور مكلفة)
+        from medical import provisioning
+        provisioning.enqueue(importer.new_family_ids)
+
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+
 
 # ============== Vaccine ViewSet ==============
 
-class VaccineViewSet(viewsets.ModelViewSet):
+class VaccineViewSet(ReferenceDataMixin, viewsets.ModelViewSet):
     """
-    API للقاحات
+    API للقاحات (القائمة من كاش البيانات المرجعية — التفاصيل فيها عدد السجلات فلا تُخزن)
     """
     queryset = Vaccine.objects.all()
+    reference_actions = ('list',)
+
+    def reference_variant(self):
+        return 'all' if self._is_ministry() else 'active'
+
+    def _is_ministry(self):
+        user = self.request.user
+        return getattr(user, 'role', None) == 'MINISTRY' or getattr(user, 'is_superuser', False)
     
     def get_queryset(self):
-        user = self.request.user
-        qs = Vaccine.objects.all()
+        # جداول الجرعات باستعلام واحد لكل القائمة (VaccineListSerializer.schedules)
+        qs = Vaccine.objects.prefetch_related('schedules')
         # Ministry and admins see all vaccines including inactive ones
-        is_ministry = getattr(user, 'role', None) == 'MINISTRY' or getattr(user, 'is_superuser', False)
-        if not is_ministry:
+        if not self._is_ministry():
             qs = qs.filter(is_active=True)
         # Allow filtering to only show vaccines that have a description (Rich Data)
         if self.request.query_params.get('has_description') == 'true':
@@ -344,7 +443,7 @@ class VaccineViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
         
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name_ar', 'name_en']
     
@@ -380,7 +479,7 @@ class VaccineRecordViewSet(viewsets.ModelViewSet):
             health_center=getattr(user, 'health_center', None)
         )
 
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['child', 'vaccine']
     search_fields = ['child__full_name', 'vaccine__name_ar']
@@ -456,7 +555,7 @@ class UpdateFCMTokenView(APIView):
         
         user = request.user
         user.fcm_token = token
-        user.save()
+        user.save(update_fields=['fcm_token'])
         return Response({'message': 'FCM Token updated successfully', 'user': user.username})
 
 
@@ -573,13 +672,11 @@ class DashboardStatsView(APIView):
                 })
             centers_report.sort(key=lambda x: x['coverage_rate'], reverse=True)
 
-        last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+        # آخر 7 أيام: استعلام واحد مجمّع حسب اليوم
+        last_7_days, vaccination_trend = bucket_counts(
+            records_qs, 'date_given', 'day', today - timedelta(days=6), today
+        )
         chart_labels = [day.strftime('%a') for day in last_7_days] 
-        
-        vaccination_trend = []
-        for day in last_7_days:
-            count = records_qs.filter(date_given=day).count()
-            vaccination_trend.append(count)
 
         data = {
             'kpis': {
@@ -604,6 +701,205 @@ class DashboardStatsView(APIView):
         return Response(data)
 
 
+# ============== Region Roll-up (Drill-down) ==============
+
+class RegionRollupView(APIView):
+    """
+    API التنقل الهرمي في التجميعات المسبقة: محافظات ← مديريات ← مراكز.
+    يقرأ مستوى واحداً في كل طلب (صفوف قليلة مفهرسة) بدلاً من حساب التقرير من السجلات.
+
+    Query params:
+        level: governorate | directorate | center (الافتراضي governorate)
+        parent_id: المحافظة (لمستوى directorate) أو المديرية (لمستوى center)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        level = request.query_params.get('level') or 'governorate'
+        parent_id = request.query_params.get('parent_id')
+        if level not in dict(RegionRollup.LEVEL_CHOICES):
+            return Response({'error': 'level يجب أن يكون governorate أو directorate أو center'}, status=400)
+
+        rollups_qs = RegionRollup.objects.filter(level=level)
+        if parent_id:
+            if not parent_id.isdigit():
+                return Response({'error': 'parent_id يجب أن يكون رقماً'}, status=400)
+            rollups_qs = rollups_qs.filter(parent_id=int(parent_id))
+        rollups_qs = list(rollups_qs.order_by('name'))
+
+        vaccines = defaultdict(list)
+        for row in RegionVaccineRollup.objects.filter(
+            level=level, region_id__in=[r.region_id for r in rollups_qs]
+        ).order_by('vaccine_id', 'dose_number').values('region_id', 'vaccine_id', 'vaccine__key', 'dose_number', 'doses'):
+            vaccines[row['region_id']].append({
+                'vaccine_id': row['vaccine_id'],
+                'vaccine_key': row['vaccine__key'],
+                'dose_number': row['dose_number'],
+                'doses': row['doses'],
+            })
+
+        results = []
+        for r in rollups_qs:
+            results.append({
+                'id': r.region_id,
+                'parent_id': r.parent_id,
+                'name': r.name,
+                'children': r.children,
+                'completed': r.completed,
+                'defaulters': r.defaulters,
+                'doses': r.doses,
+                'completion_rate': round((r.completed / r.children * 100), 1) if r.children > 0 else 0,
+                'vaccines': vaccines.get(r.region_id, []),
+                'updated_at': r.updated_at,
+            })
+
+        return Response({'level': level, 'parent_id': parent_id, 'results': results})
+
+
+# ============== Defaulters Worklist ==============
+
+class DefaulterListView(APIView):
+    """
+    API قائمة المتخلفين عن التطعيم (لفرق المتابعة الميدانية):
+    طفل لكل صف، مرتبة حسب أقدم جرعة متأخرة (الأكثر تأخراً أولاً).
+
+    - المتخلف بنفس تعريف لوحة التحكم (defaulters_count) والـ rollups: طفل غير مكتمل
+      (is_completed=False) له جرعة غير مأخوذة تاريخ استحقاقها قبل اليوم.
+    - ترقيم keyset على الفهرس الجزئي schedule_untaken_due_idx (due_date, child): الصفحة
+      تقرأ الفهرس من الـ cursor وتأخذ من كل طفل أقدم جرعة متأخرة فقط (NOT EXISTS أقدم منها)
+      وتتوقف بعد limit+1 طفل — لا GROUP BY على كل الجرعات المتأخرة ولا OFFSET.
+      الكلفة: الجرعات المتأخرة الأخرى للأطفال نفسهم وجرعات المراكز الأخرى (عند الفلترة
+      بمركز/منطقة) تُقرأ من الفهرس وتُتخطى.
+    - صيغة مضغوطة: columns مرة واحدة ثم rows كمصفوفات.
+
+    Query params: health_center_id، directorate_id، governorate_id، limit (حتى 500)، cursor
+    """
+    permission_classes = [IsAuthenticated]
+
+    COLUMNS = [
+        'child_id', 'full_name', 'gender', 'date_of_birth', 'access_code',
+        'health_center_id', 'oldest_due', 'days_overdue', 'overdue_doses',
+    ]
+    MAX_LIMIT = 500
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        today = timezone.now().date()
+
+        overdue = ChildVaccineSchedule.objects.filter(
+            is_taken=False, due_date__lt=today, child__is_completed=False
+        )
+
+        if user.role in ['CENTER_MANAGER', 'CENTER_STAFF']:
+            if not user.health_center_id:
+                return Response({'error': 'الحساب غير مرتبط بمركز صحي'}, status=400)
+            overdue = overdue.filter(child__health_center_id=user.health_center_id)
+        elif not (user.is_superuser or user.role in ['ADMIN', 'MINISTRY']):
+            raise PermissionDenied('غير مصرح لك بعرض قائمة المتخلفين.')
+
+        try:
+            limit = max(1, min(int(params.get('limit') or 100), self.MAX_LIMIT))
+            if params.get('health_center_id'):
+                overdue = overdue.filter(child__health_center_id=int(params['health_center_id']))
+            if params.get('directorate_id'):
+                overdue = overdue.filter(child__health_center__directorate_id=int(params['directorate_id']))
+            if params.get('governorate_id'):
+                overdue = overdue.filter(child__health_center__governorate_id=int(params['governorate_id']))
+            after = self._decode_cursor(params.get('cursor'))
+        except ValueError:
+            return Response({'error': 'معاملات غير صالحة (limit / ids / cursor)'}, status=400)
+
+        # صف واحد لكل طفل: جرعته المتأخرة الأقدم (والأصغر id عند تساوي التاريخ)
+        earlier = ChildVaccineSchedule.objects.filter(
+            child_id=OuterRef('child_id'), is_taken=False, due_date__lt=today,
+        ).filter(Q(due_date__lt=OuterRef('due_date')) | Q(due_date=OuterRef('due_date'), id__lt=OuterRef('id')))
+        page = overdue.filter(~Exists(earlier))
+        if after:
+            page = page.filter(Q(due_date__gt=after[0]) | Q(due_date=after[0], child_id__gt=after[1]))
+        page = list(page.order_by('due_date', 'child_id').values_list('child_id', 'due_date')[:limit + 1])
+
+        has_more = len(page) > limit
+        page = page[:limit]
+        child_ids = [child_id for child_id, _ in page]
+
+        children = {
+            row[0]: row[1:] for row in Child.objects.filter(id__in=child_ids)
+            .values_list('id', 'full_name', 'gender', 'date_of_birth', 'family__access_code', 'health_center_id')
+        }
+        doses = dict(
+            ChildVaccineSchedule.objects.filter(child_id__in=child_ids, is_taken=False, due_date__lt=today)
+            .values('child_id').annotate(n=Count('id')).values_list('child_id', 'n')
+        )
+        rows = [
+            [child_id, *children[child_id], due, (today - due).days, doses.get(child_id, 0)]
+            for child_id, due in page if child_id in children
+        ]
+
+        next_cursor = None
+        if has_more and page:
+            next_cursor = f"{page[-1][1].isoformat()}_{page[-1][0]}"
+
+        return Response({
+            'columns': self.COLUMNS,
+            'rows': rows,
+            'next_cursor': next_cursor,
+        })
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        """'YYYY-MM-DD_<child_id>' → (date, child_id)"""
+        if not cursor:
+            return None
+        due, _, child_id = cursor.partition('_')
+        return datetime.date.fromisoformat(due), int(child_id)
+
+
+# ============== Streaming Exports ==============
+
+class DataExportView(APIView):
+    """
+    API تصدير متدفق: /api/exports/<children|records|schedules>.<csv|ndjson>
+
+    موظفو المراكز يصدّرون بيانات مركزهم فقط؛ الوزارة والإدارة كل البيانات.
+    Query params: health_center_id، directorate_id، governorate_id،
+                  date_from، date_to (YYYY-MM-DD — على تاريخ الميلاد / الإعطاء / الاستحقاق)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset, fmt):
+        if dataset not in DATASETS or fmt not in EXPORT_FORMATS:
+            return Response({'error': 'تصدير غير معروف'}, status=404)
+
+        user = request.user
+        params = request.query_params
+        try:
+            filters = {
+                'center_id': int(params['health_center_id']) if params.get('health_center_id') else None,
+                'directorate_id': int(params['directorate_id']) if params.get('directorate_id') else None,
+                'governorate_id': int(params['governorate_id']) if params.get('governorate_id') else None,
+                'date_from': datetime.date.fromisoformat(params['date_from']) if params.get('date_from') else None,
+                'date_to': datetime.date.fromisoformat(params['date_to']) if params.get('date_to') else None,
+            }
+        except ValueError:
+            return Response({'error': 'معاملات غير صالحة (ids / date_from / date_to)'}, status=400)
+
+        if user.role in ['CENTER_MANAGER', 'CENTER_STAFF']:
+            if not user.health_center_id:
+                return Response({'error': 'الحساب غير مرتبط بمركز صحي'}, status=400)
+            filters['center_id'] = user.health_center_id
+        elif not (user.is_superuser or user.role in ['ADMIN', 'MINISTRY']):
+            raise PermissionDenied('غير مصرح لك بتصدير البيانات.')
+
+        stream, content_type = EXPORT_FORMATS[fmt]
+        response = StreamingHttpResponse(
+            stream(dataset, build_export_queryset(dataset, **filters)), content_type=content_type
+        )
+        filename = f"{dataset}-{timezone.now():%Y%m%d-%H%M}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 # ============== Reports By Center View ==============
 
 class ReportsByCenterView(APIView):
@@ -612,6 +908,7 @@ class ReportsByCenterView(APIView):
     """
     permission_classes = [IsAdminUser]
 
+    @cache_response(COVERAGE_NAMESPACE)
     def get(self, request):
         centers = HealthCenter.objects.filter(is_active=True).select_related('governorate', 'directorate')
         
@@ -637,6 +934,30 @@ class ReportsByCenterView(APIView):
 
 # ============== Vaccine Coverage Report View ==============
 
+def _region_params(request):
+    """governorate_id / directorate_id من الرابط كأرقام (أو None) — ValueError إذا كانت غير صالحة"""
+    governorate_id = request.query_params.get('governorate_id') or None
+    directorate_id = request.query_params.get('directorate_id') or None
+    return (
+        int(governorate_id) if governorate_id else None,
+        int(directorate_id) if directorate_id else None,
+    )
+
+
+def _coverage_scope(governorate_id, directorate_id):
+    """الأطفال المستهدفون وسجلاتهم حسب مركز الطفل (المديرية أولاً ثم المحافظة)"""
+    children_qs = Child.objects.all()
+    records_qs = VaccineRecord.objects.all()
+
+    if directorate_id:
+        children_qs = children_qs.filter(health_center__directorate_id=directorate_id)
+        records_qs = records_qs.filter(child__health_center__directorate_id=directorate_id)
+    elif governorate_id:
+        children_qs = children_qs.filter(health_center__governorate_id=governorate_id)
+        records_qs = records_qs.filter(child__health_center__governorate_id=governorate_id)
+    return children_qs, records_qs
+
+
 class AllVaccinesCoverageReportView(APIView):
     """
     API تقرير تغطية لكل اللقاحات مفلترة حسب المحافظة (ومديرية محددة اختيارياً)
@@ -644,20 +965,20 @@ class AllVaccinesCoverageReportView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        governorate_id = request.query_params.get('governorate_id')
-        directorate_id = request.query_params.get('directorate_id')
-        
+        try:
+            governorate_id, directorate_id = _region_params(request)
+        except ValueError:
+            return Response({'error': 'governorate_id / directorate_id يجب أن تكون أرقاماً'}, status=400)
+
+        return Response(cached(
+            COVERAGE_NAMESPACE, ('vaccines', governorate_id, directorate_id),
+            lambda: self.compute(governorate_id, directorate_id),
+        ))
+
+    @staticmethod
+    def compute(governorate_id, directorate_id):
         vaccines = Vaccine.objects.all()
-        
-        children_qs = Child.objects.all()
-        records_qs = VaccineRecord.objects.all()
-        
-        if directorate_id:
-            children_qs = children_qs.filter(health_center__directorate_id=directorate_id)
-            records_qs = records_qs.filter(child__health_center__directorate_id=directorate_id)
-        elif governorate_id:
-            children_qs = children_qs.filter(health_center__governorate_id=governorate_id)
-            records_qs = records_qs.filter(child__health_center__governorate_id=governorate_id)
+        children_qs, records_qs = _coverage_scope(governorate_id, directorate_id)
             
         total_children = children_qs.count()
         
@@ -679,16 +1000,420 @@ class AllVaccinesCoverageReportView(APIView):
                 'coverage_percentage': round((v_count / total_children * 100), 1) if total_children > 0 else 0
             })
             
-        return Response({
+        return {
             'filters': {
                 'governorate_id': governorate_id,
                 'directorate_id': directorate_id
             },
             'target_children': total_children,
             'vaccines_coverage': result
+        }
+
+
+class DoseCoverageReportView(APIView):
+    """
+    API تقرير التغطية على مستوى الجرعة (لقاح × جرعة) مفلتر حسب المحافظة / المديرية.
+    استعلام GROUP BY واحد على سجلات التطعيم، والنتيجة مخزنة مؤقتاً لكل منطقة
+    (تُبطل عند تسجيل/حذف جرعة أو طفل).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            governorate_id, directorate_id = _region_params(request)
+        except ValueError:
+            return Response({'error': 'governorate_id / directorate_id يجب أن تكون أرقاماً'}, status=400)
+
+        return Response(cached(
+            COVERAGE_NAMESPACE, ('doses', governorate_id, directorate_id),
+            lambda: self.compute(governorate_id, directorate_id),
+        ))
+
+    @staticmethod
+    def compute(governorate_id, directorate_id):
+        children_qs, records_qs = _coverage_scope(governorate_id, directorate_id)
+        total_children = children_qs.count()
+
+        # (child, vaccine, dose_number) فريد → عدد السجلات = عدد الأطفال لكل جرعة
+        counts = {
+            (row['vaccine_id'], row['dose_number']): row['vaccinated_count']
+            for row in records_qs.values('vaccine_id', 'dose_number').annotate(vaccinated_count=Count('id'))
+        }
+
+        # الجرعات المجدولة تظهر حتى لو لم تُعطَ بعد (تغطية 0)
+        doses = set(counts) | set(VaccineSchedule.objects.values_list('vaccine_id', 'dose_number'))
+        vaccines = {v.id: v for v in Vaccine.objects.filter(id__in={d[0] for d in doses})}
+
+        result = []
+        for vaccine_id, dose_number in sorted(doses):
+            vaccine = vaccines.get(vaccine_id)
+            if not vaccine:
+                continue
+            count = counts.get((vaccine_id, dose_number), 0)
+            result.append({
+                'vaccine_id': vaccine_id,
+                'vaccine_name': vaccine.name_ar,
+                'vaccine_key': vaccine.key,
+                'dose_number': dose_number,
+                'vaccinated_count': count,
+                'coverage_percentage': round((count / total_children * 100), 1) if total_children > 0 else 0
+            })
+
+        return {
+            'filters': {
+                'governorate_id': governorate_id,
+                'directorate_id': directorate_id
+            },
+            'target_children': total_children,
+            'doses_coverage': result
+        }
+
+
+# مؤشرات التسرب: (الاسم، مفتاح اللقاح Vaccine.key، الجرعة الأولى، الجرعة الأخيرة)
+DROPOUT_PAIRS = (
+    ('penta1_penta3', 'Pentavalent Vaccine', 1, 3),
+    ('mr1_mr2', 'Measles-Rubella Vaccine', 1, 2),
+)
+
+# مستوى التجميع → (حقل id، حقل الاسم) عبر مركز الطفل
+DROPOUT_LEVELS = {
+    'governorate': ('child__health_center__governorate_id', 'child__health_center__governorate__name_ar'),
+    'directorate': ('child__health_center__directorate_id', 'child__health_center__directorate__name_ar'),
+    'center': ('child__health_center_id', 'child__health_center__name_ar'),
+}
+
+
+class DropoutReportView(APIView):
+    """
+    API معدل التسرب (Penta1→Penta3، MR1→MR2) لكل منطقة أو مركز:
+    (أطفال الجرعة الأولى − أطفال الجرعة الأخيرة) ÷ أطفال الجرعة الأولى.
+    استعلام تجميع شرطي واحد، والنتيجة مخزنة مع بقية تقارير التغطية.
+
+    Query params: level (governorate | directorate | center)، governorate_id، directorate_id
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        level = request.query_params.get('level') or 'governorate'
+        try:
+            governorate_id, directorate_id = _region_params(request)
+            if level not in DROPOUT_LEVELS:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'معاملات غير صالحة (level / governorate_id / directorate_id)'}, status=400)
+
+        return Response(cached(
+            COVERAGE_NAMESPACE, ('dropout', level, governorate_id, directorate_id),
+            lambda: self.compute(level, governorate_id, directorate_id),
+        ))
+
+    @staticmethod
+    def _rates(counts):
+        rates = {}
+        for name, _, first, last in DROPOUT_PAIRS:
+            started, finished = counts[f'{name}_first'], counts[f'{name}_last']
+            rates[f'{name}_dropout'] = round((started - finished) / started * 100, 1) if started else None
+        return rates
+
+    @classmethod
+    def compute(cls, level, governorate_id, directorate_id):
+        id_field, name_field = DROPOUT_LEVELS[level]
+        _, records_qs = _coverage_scope(governorate_id, directorate_id)
+
+        aggregates = {}
+        for name, key, first, last in DROPOUT_PAIRS:
+            aggregates[f'{name}_first'] = Count('id', filter=Q(vaccine__key=key, dose_number=first))
+            aggregates[f'{name}_last'] = Count('id', filter=Q(vaccine__key=key, dose_number=last))
+
+        pairs_filter = Q()
+        for _, key, first, last in DROPOUT_PAIRS:
+            pairs_filter |= Q(vaccine__key=key, dose_number__in=[first, last])
+
+        grouped = records_qs.filter(pairs_filter).values(id_field, name_field).annotate(**aggregates).order_by(name_field)
+
+        rows = []
+        totals = dict.fromkeys(aggregates, 0)
+        for item in grouped:
+            counts = {k: item[k] for k in aggregates}
+            for k, v in counts.items():
+                totals[k] += v
+            rows.append({'id': item[id_field], 'name': item[name_field], **counts, **cls._rates(counts)})
+
+        return {
+            'filters': {'level': level, 'governorate_id': governorate_id, 'directorate_id': directorate_id},
+            'totals': {**totals, **cls._rates(totals)},
+            'rows': rows,
+        }
+
+
+class CohortCoverageReportView(APIView):
+    """
+    API تغطية الأفواج (مؤشر EPI): نسبة أطفال كل شهر ميلاد الذين أخذوا الجرعة
+    (أو أكملوا التطعيمات الأساسية إذا لم يُحدد لقاح) قبل عمر 12 / 24 شهراً، حسب المنطقة.
+
+    Query params:
+        level: national | governorate | directorate (الافتراضي national)
+        vaccine_key, dose_number: الجرعة المطلوبة (بدونها = مكتمل التطعيمات الأساسية)
+        milestones: الأعمار بالأشهر مفصولة بفواصل (الافتراضي 12,24)
+        governorate_id, directorate_id, born_from, born_to (YYYY-MM)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            governorate_id, directorate_id = _region_params(request)
+            level = params.get('level') or 'national'
+            if level not in REGION_FIELDS:
+                raise ValueError
+            dose_number = int(params['dose_number']) if params.get('dose_number') else None
+            milestones = tuple(int(m) for m in (params.get('milestones') or '12,24').split(',') if m.strip())
+            if not milestones or any(m <= 0 or m > 120 for m in milestones):
+                raise ValueError
+            born_from = params.get('born_from') or None
+            born_to = params.get('born_to') or None
+            for month in (born_from, born_to):
+                if month:
+                    datetime.datetime.strptime(month, '%Y-%m')
+        except ValueError:
+            return Response({'error': 'معاملات غير صالحة (level / dose_number / milestones / born_from / born_to)'}, status=400)
+
+        vaccine_key = params.get('vaccine_key') or None
+        scope = dict(governorate_id=governorate_id, directorate_id=directorate_id, born_from=born_from, born_to=born_to)
+        rows = cached(
+            COVERAGE_NAMESPACE,
+            ('cohort', level, vaccine_key, dose_number, milestones, timezone.now().date(), *scope.values()),
+            lambda: cohort_coverage(level, vaccine_key, dose_number, milestones, **scope),
+        )
+        return Response({
+            'filters': {'level': level, 'vaccine_key': vaccine_key, 'dose_number': dose_number, **scope},
+            'milestones': milestones,
+            'rows': rows,
+        })
+
+
+
+class TimeSeriesView(APIView):
+    """
+    API السلاسل الزمنية: /api/reports/timeseries/?metric=doses&bucket=month
+
+    Query params:
+        metric: doses | registrations | completions
+        bucket: day | week | month (الافتراضي day)
+        date_from, date_to (YYYY-MM-DD — الافتراضي آخر 90 يوماً / 26 أسبوعاً / 12 شهراً)
+        compare=yoy: إضافة نفس الفترة من السنة السابقة
+        health_center_id, directorate_id, governorate_id
+    موظفو المراكز يرون مركزهم فقط.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        metric = params.get('metric') or 'doses'
+        bucket = params.get('bucket') or 'day'
+        if metric not in TIMESERIES_METRICS or bucket not in TIMESERIES_BUCKETS:
+            return Response({'error': 'metric / bucket غير صالح'}, status=400)
+
+        try:
+            governorate_id, directorate_id = _region_params(request)
+            center_id = int(params['health_center_id']) if params.get('health_center_id') else None
+            date_from, date_to = timeseries_default_range(bucket, timezone.now().date())
+            if params.get('date_from'):
+                date_from = datetime.date.fromisoformat(params['date_from'])
+            if params.get('date_to'):
+                date_to = datetime.date.fromisoformat(params['date_to'])
+            if date_from > date_to:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'معاملات غير صالحة (ids / date_from / date_to)'}, status=400)
+
+        if user.role in ['CENTER_MANAGER', 'CENTER_STAFF']:
+            if not user.health_center_id:
+                return Response({'error': 'الحساب غير مرتبط بمركز صحي'}, status=400)
+            center_id = user.health_center_id
+        elif not (user.is_superuser or user.role in ['ADMIN', 'MINISTRY']):
+            raise PermissionDenied('غير مصرح لك بعرض هذا التقرير.')
+
+        compare = params.get('compare') == 'yoy'
+        scope = dict(center_id=center_id, directorate_id=directorate_id, governorate_id=governorate_id)
+        try:
+            data = cached(
+                COVERAGE_NAMESPACE,
+                ('timeseries', metric, bucket, date_from, date_to, compare, *scope.values()),
+                lambda: timeseries(metric, bucket, date_from, date_to, compare=compare, **scope),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response(data)
+
+
+class DemandForecastView(APIView):
+    """
+    API توقع الطلب على اللقاحات: الجرعات المتوقعة لكل لقاح لكل أسبوع قادم
+    (المواعيد المستحقة × نسبة الحضور التاريخية لكل مركز).
+
+    Query params: weeks (الافتراضي 8، الحد 52)، health_center_id، directorate_id، governorate_id
+    العرض الوطني يُقرأ من اللقطة الليلية (precompute_forecast). موظفو المراكز يرون مركزهم فقط.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        try:
+            governorate_id, directorate_id = _region_params(request)
+            center_id = int(params['health_center_id']) if params.get('health_center_id') else None
+            weeks = int(params.get('weeks') or FORECAST_DEFAULT_WEEKS)
+            if not 1 <= weeks <= FORECAST_MAX_WEEKS:
+                raise ValueError
+        except ValueError:
+            return Response({'error': f'معاملات غير صالحة (ids / weeks من 1 إلى {FORECAST_MAX_WEEKS})'}, status=400)
+
+        if user.role in ['CENTER_MANAGER', 'CENTER_STAFF']:
+            if not user.health_center_id:
+                return Response({'error': 'الحساب غير مرتبط بمركز صحي'}, status=400)
+            center_id = user.health_center_id
+        elif not (user.is_superuser or user.role in ['ADMIN', 'MINISTRY']):
+            raise PermissionDenied('غير مصرح لك بعرض هذا التقرير.')
+
+        today = timezone.now().date()
+        scope = dict(center_id=center_id, directorate_id=directorate_id, governorate_id=governorate_id)
+        data = cached(
+            COVERAGE_NAMESPACE, ('forecast', weeks, today, *scope.values()),
+            lambda: demand_forecast(weeks, today, **scope),
+        )
+        return Response({'filters': {'weeks': weeks, **scope}, **data})
+
+
+class ThroughputReportView(APIView):
+    """
+    API إنتاجية الموظفين والمراكز (للتخطيط لجلسات التطعيم):
+    الجرعات لكل (يوم، موظف، مركز) + الحمل حسب ساعة اليوم ويوم الأسبوع (من created_at).
+    استعلامان مجمّعان على VaccineRecord (فهرس record_center_date_idx) بدون جلب السجلات.
+
+    Query params: date_from، date_to (YYYY-MM-DD، الافتراضي آخر 30 يوماً)،
+                  health_center_id، directorate_id، governorate_id
+    مدير المركز يرى مركزه فقط.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        try:
+            governorate_id, directorate_id = _region_params(request)
+            center_id = int(params['health_center_id']) if params.get('health_center_id') else None
+            date_to = datetime.date.fromisoformat(params['date_to']) if params.get('date_to') else timezone.now().date()
+            date_from = datetime.date.fromisoformat(params['date_from']) if params.get('date_from') \
+                else date_to - timedelta(days=29)
+            if date_from > date_to:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'معاملات غير صالحة (ids / date_from / date_to)'}, status=400)
+
+        if user.role == 'CENTER_MANAGER':
+            if not user.health_center_id:
+                return Response({'error': 'الحساب غير مرتبط بمركز صحي'}, status=400)
+            center_id = user.health_center_id
+        elif not (user.is_superuser or user.role in ['ADMIN', 'MINISTRY']):
+            raise PermissionDenied('غير مصرح لك بعرض هذا التقرير.')
+
+        scope = dict(center_id=center_id, directorate_id=directorate_id, governorate_id=governorate_id)
+        return Response(cached(
+            COVERAGE_NAMESPACE, ('throughput', date_from, date_to, *scope.values()),
+            lambda: self.compute(date_from, date_to, **scope),
+        ))
+
+    @staticmethod
+    def compute(date_from, date_to, center_id=None, directorate_id=None, governorate_id=None):
+        records = VaccineRecord.objects.filter(date_given__gte=date_from, date_given__lte=date_to)
+        if center_id:
+            records = records.filter(health_center_id=center_id)
+        if directorate_id:
+            records = records.filter(health_center__directorate_id=directorate_id)
+        if governorate_id:
+            records = records.filter(health_center__governorate_id=governorate_id)
+
+        daily = records.values('date_given', 'staff_id', 'staff__username', 'health_center_id')\
+            .annotate(doses=Count('id')).order_by('date_given', 'staff_id')
+
+        staff, centers = {}, defaultdict(lambda: defaultdict(int))
+        daily_rows = []
+        for row in daily:
+            daily_rows.append([row['date_given'], row['staff_id'], row['staff__username'],
+                               row['health_center_id'], row['doses']])
+            entry = staff.setdefault(row['staff_id'], {
+                'staff_id': row['staff_id'], 'username': row['staff__username'],
+                'doses': 0, 'active_days': set(), 'peak_day': 0,
+            })
+            entry['doses'] += row['doses']
+            entry['active_days'].add(row['date_given'])
+            entry['peak_day'] = max(entry['peak_day'], row['doses'])
+            centers[row['health_center_id']][row['date_given']] += row['doses']
+
+        for entry in staff.values():
+            entry['active_days'] = len(entry['active_days'])
+            entry['avg_per_day'] = round(entry['doses'] / entry['active_days'], 1)
+
+        # الحمل حسب (يوم الأسبوع 1=الاثنين، الساعة) بتوقيت المشروع
+        heatmap = [[0] * 24 for _ in range(7)]
+        hourly = records.annotate(weekday=ExtractIsoWeekDay('created_at'), hour=ExtractHour('created_at'))\
+            .values('weekday', 'hour').annotate(doses=Count('id')).order_by()
+        for row in hourly:
+            heatmap[row['weekday'] - 1][row['hour']] = row['doses']
+        by_hour = [sum(day[h] for day in heatmap) for h in range(24)]
+
+        return {
+            'filters': {'date_from': date_from, 'date_to': date_to, 'health_center_id': center_id,
+                        'directorate_id': directorate_id, 'governorate_id': governorate_id},
+            'total_doses': sum(by_hour),
+            'staff': sorted(staff.values(), key=lambda x: x['doses'], reverse=True),
+            'centers': [
+                {
+                    'health_center_id': cid,
+                    'session_days': len(days),
+                    'doses': sum(days.values()),
+                    'avg_per_day': round(sum(days.values()) / len(days), 1),
+                    'max_per_day': max(days.values()),
+                }
+                for cid, days in centers.items()
+            ],
+            'by_hour': by_hour,
+            'peak_hour': by_hour.index(max(by_hour)) if any(by_hour) else None,
+            'heatmap': heatmap,
+            'daily': {
+                'columns': ['date', 'staff_id', 'username', 'health_center_id', 'doses'],
+                'rows': daily_rows,
+            },
+        }
+
+
+class CacheStatsView(APIView):
+    """
+    API إحصائيات الكاش لهذا الـ worker: hit / miss ونسبة الإصابة والنسخة لكل مجموعة
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        from django.conf import settings
+        return Response({
+            'backend': settings.CACHES[settings.API_CACHE_ALIAS]['BACKEND'],
+            'namespaces': cache_stats(),
         })
 
 
+class MetricsView(APIView):
+    """
+    مقاييس Prometheus (صيغة نصية) مجمعة من كل عمال gunicorn — انظر core/metrics.py
+    """
+    permission_classes = [HasMetricsToken]
+
+    def get(self, request):
+        from core.metrics import render as render_metrics
+        body, content_type = render_metrics()
+        return HttpResponse(body, content_type=content_type)
+
 # ================= Notifications =================
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -763,8 +1488,22 @@ class CustomAuthTokenView(ObtainAuthToken):
 
 # ================= External Cron Webhook =================
 
+import hmac
+import io
+import time
+
+from django.conf import settings
 from django.core.management import call_command
 
+from medical import provisioning
+
+
+def _check_cron_secret(request):
+    secret = request.query_params.get('secret') or ''
+    if not hmac.compare_digest(secret.encode(), settings.CRON_SECRET.encode()):
+        raise PermissionDenied("Invalid Secret Key!")
+
+
 class TriggerRemindersCronView(APIView):
     """
     API لتشغيل إشعارات النظام من خلال خدمات مجانية مثل cron-job.org
@@ -772,17 +1511,53 @@ class TriggerRemindersCronView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        secret = request.query_params.get('secret')
-        # تحقق بسيط من المفتاح لضمان الأمان
-        if secret != 'secure_care4child_cron_2026':
-            raise PermissionDenied("Invalid Secret Key!")
-            
+        _check_cron_secret(request)
+
         try:
+            # المهام الثقيلة لها روابط مستقلة (CronJobView) — كل مهمة في طلب منفصل
             call_command('send_reminders')
             return Response({"success": True, "message": "Notification engine ran successfully."})
         except Exception as e:
             return Response({"success": False, "error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class CronJobView(APIView):
+    """
+    مهام الصيانة المجدولة — رابط لكل مهمة حتى لا تجتمع في طلب HTTP واحد:
+        /api/cron/jobs/<job>/?secret=<CRON_SECRET>
+
+    الجدول المطلوب (cron-job.org أو crontab):
+        refresh-rollups        ليلياً   — إعادة بناء المكعب (المتخلفون يتغيرون بمرور الأيام بدون أي كتابة)
+        precompute-forecast    ليلياً   — بعد refresh-rollups
+        refresh-dirty-rollups  كل دقيقة — فقط إذا ROLLUPS_ASYNC=False
+        provision-family-accounts  كل 10 دقائق — حسابات العائلات التي ضاعت من الطابور الخلفي
+                                   (medical/provisioning.py)
+    """
+    permission_classes = [AllowAny]
+
+    # اسم المهمة في الرابط -> (أمر الإدارة، معاملاته)
+    JOBS = {
+        'refresh-rollups': ('refresh_rollups', {}),
+        'refresh-dirty-rollups': ('refresh_rollups', {'dirty': True}),
+        'precompute-forecast': ('precompute_forecast', {}),
+        'provision-family-accounts': ('provision_family_accounts', {
+            'min_age': provisioning.SWEEP_MIN_AGE, 'limit': provisioning.SWEEP_LIMIT, 'processes': 1,
+        }),
+    }
+
+    def get(self, request, job):
+        _check_cron_secret(request)
+        if job not in self.JOBS:
+            return Response({"success": False, "error": f"Unknown job: {job}"}, status=status.HTTP_404_NOT_FOUND)
+
+        command, options = self.JOBS[job]
+        started = time.monotonic()
+        try:
+            call_command(command, stdout=io.StringIO(), **options)
+        except Exception as e:
+            return Response({"success": False, "error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({"success": True, "job": job, "seconds": round(time.monotonic() - started, 1)})
+
 # ================= Complaints =================
 
 from centers.models import CenterComplaint
@@ -835,28 +1610,48 @@ class CenterComplaintViewSet(viewsets.ModelViewSet):
 class CenterComplaintReportView(APIView):
     """
     API تقرير شكاوى المراكز للوزارة
+    فلاتر اختيارية: status، date_from، date_to (YYYY-MM-DD — على تاريخ الشكوى)
+    التقرير كله استعلامان مهما كان عدد المراكز: عدد الشكاوى لكل (مركز × نوع) + آخر شكوى لكل مركز
     """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        centers = HealthCenter.objects.filter(is_active=True).annotate(
-            total_complaints=Count('complaints')
-        ).filter(total_complaints__gt=0)
-        
-        report_data = []
-        for center in centers:
-            complaints = CenterComplaint.objects.filter(health_center=center)
-            complaints_by_type = complaints.values('complaint_type').annotate(count=Count('id'))
-            
-            types_dict = {item['complaint_type']: item['count'] for item in complaints_by_type}
-            
-            report_data.append({
-                'center_id': center.id,
-                'center_name': center.name_ar,
-                'total_complaints': center.total_complaints,
-                'complaints_by_type': types_dict,
-                'latest_complaint_date': complaints.order_by('-created_at').first().created_at if complaints.exists() else None
+        params = request.query_params
+        status_filter = params.get('status')
+        if status_filter and status_filter not in dict(CenterComplaint.STATUS_CHOICES):
+            return Response({'error': 'حالة غير صالحة'}, status=400)
+        try:
+            date_from = datetime.date.fromisoformat(params['date_from']) if params.get('date_from') else None
+            date_to = datetime.date.fromisoformat(params['date_to']) if params.get('date_to') else None
+        except ValueError:
+            return Response({'error': 'صيغة التاريخ غير صالحة (YYYY-MM-DD)'}, status=400)
+
+        complaints = CenterComplaint.objects.filter(health_center__is_active=True)
+        if status_filter:
+            complaints = complaints.filter(status=status_filter)
+        if date_from:
+            complaints = complaints.filter(created_at__date__gte=date_from)
+        if date_to:
+            complaints = complaints.filter(created_at__date__lte=date_to)
+
+        report = {}
+        by_type = complaints.values('health_center_id', 'health_center__name_ar', 'complaint_type')\
+            .annotate(count=Count('id')).order_by()
+        for row in by_type:
+            entry = report.setdefault(row['health_center_id'], {
+                'center_id': row['health_center_id'],
+                'center_name': row['health_center__name_ar'],
+                'total_complaints': 0,
+                'complaints_by_type': {},
+                'latest_complaint_date': None,
             })
-            
-        report_data.sort(key=lambda x: x['total_complaints'], reverse=True)
+            entry['total_complaints'] += row['count']
+            entry['complaints_by_type'][row['complaint_type']] = row['count']
+
+        latest = complaints.values('health_center_id').annotate(latest=Max('created_at')).order_by()
+        for row in latest:
+            if row['health_center_id'] in report:
+                report[row['health_center_id']]['latest_complaint_date'] = row['latest']
+
+        report_data = sorted(report.values(), key=lambda x: x['total_complaints'], reverse=True)
         return Response(report_data)
\ No newline at end of file
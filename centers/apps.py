@@ -5,3 +5,6 @@ class CentersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'centers'
     verbose_name = 'إدارة المراكز'
+
+    def ready(self):
+        import centers.signals
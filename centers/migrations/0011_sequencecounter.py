@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+def seed_center_counters(apps, schema_editor):
+    """تهيئة عدّاد كل مديرية بأعلى رقم تسلسلي مستخدم في أكواد المراكز الحالية"""
+    HealthCenter = apps.get_model('centers', 'HealthCenter')
+    SequenceCounter = apps.get_model('centers', 'SequenceCounter')
+
+    highest = {}
+    centers = HealthCenter.objects.exclude(governorate=None).exclude(directorate=None)\
+        .values_list('center_code', 'governorate__code', 'directorate__code')
+    for center_code, gov_code, dir_code in centers:
+        prefix = f"{gov_code}{dir_code}"
+        if not center_code or not center_code.startswith(prefix):
+            continue
+        try:
+            seq = int(center_code[len(prefix):])
+        except ValueError:
+            continue
+        highest[prefix] = max(highest.get(prefix, 0), seq)
+
+    SequenceCounter.objects.bulk_create([
+        SequenceCounter(name=f"center:{prefix}", value=seq) for prefix, seq in highest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0010_add_stars_to_complaint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCounter',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='اسم العدّاد')),
+                ('value', models.BigIntegerField(default=0, verbose_name='آخر قيمة محجوزة')),
+            ],
+            options={
+                'verbose_name': 'عدّاد تسلسلي',
+                'verbose_name_plural': 'العدّادات التسلسلية',
+            },
+        ),
+        migrations.RunPython(seed_center_counters, reverse_code=migrations.RunPython.noop),
+    ]
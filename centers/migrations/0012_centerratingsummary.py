@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Q, Sum, Value, When
+
+# نسخة ثابتة من centers/ratings.py وقت كتابة الـ migration (لا تعتمد على كود التطبيق)
+LEGACY_SCORES = {
+    'EXCELLENT': 5,
+    'GOOD': 4,
+    'OTHER': 3,
+    'SUBSTITUTE_GIVEN': 2,
+}
+
+
+def summary_values(complaints):
+    legacy_score = Case(
+        *[When(complaint_type=t, then=Value(score)) for t, score in LEGACY_SCORES.items()],
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    aggregates = {
+        'stars_count': Count('id', filter=Q(stars__isnull=False)),
+        'stars_sum': Sum('stars', filter=Q(stars__isnull=False)),
+        'legacy_count': Count('id', filter=Q(complaint_type__isnull=False)),
+        'legacy_sum': Sum(legacy_score, filter=Q(complaint_type__isnull=False)),
+    }
+    for star in range(1, 6):
+        aggregates[f'stars_{star}'] = Count('id', filter=Q(stars=star))
+
+    values = complaints.aggregate(**aggregates)
+    return {key: value or 0 for key, value in values.items()}
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    """ملخص لكل مركز لديه تقييمات"""
+    CenterComplaint = apps.get_model('centers', 'CenterComplaint')
+    CenterRatingSummary = apps.get_model('centers', 'CenterRatingSummary')
+    center_ids = CenterComplaint.objects.values_list('health_center_id', flat=True).distinct()
+    CenterRatingSummary.objects.bulk_create([
+        CenterRatingSummary(
+            health_center_id=center_id,
+            **summary_values(CenterComplaint.objects.filter(health_center_id=center_id))
+        )
+        for center_id in center_ids
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0011_sequencecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CenterRatingSummary',
+            fields=[
+                ('health_center', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='centers.healthcenter', verbose_name='المركز')),
+                ('stars_count', models.PositiveIntegerField(default=0, verbose_name='عدد التقييمات بالنجوم')),
+                ('stars_sum', models.PositiveIntegerField(default=0, verbose_name='مجموع النجوم')),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('legacy_count', models.PositiveIntegerField(default=0)),
+                ('legacy_sum', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'ملخص تقييمات مركز',
+                'verbose_name_plural': 'ملخصات تقييمات المراكز',
+            },
+        ),
+        migrations.RunPython(backfill_rating_summaries, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings  # لاستدعاء موديل اليوزر بطريقة آمنة
 
 class Governorate(models.Model):
@@ -71,20 +71,9 @@ class HealthCenter(models.Model):
             # Generate Code: GovCode + DirCode + 4-digit Serial
             prefix = f"{self.governorate.code}{self.directorate.code}"
             
-            # Find last center in this dir to increment
-            last_center = HealthCenter.objects.filter(
-                governorate=self.governorate, 
-                directorate=self.directorate
-            ).order_by('center_code').last()
-            
-            if last_center and last_center.center_code.startswith(prefix):
-                try:
-                    last_seq = int(last_center.center_code[len(prefix):])
-                    new_seq = last_seq + 1
-                except ValueError:
-                    new_seq = 1
-            else:
-                new_seq = 1
+            # الرقم التالي من عدّاد المديرية (حجز ذري — لا تعارض مع الإضافات المتزامنة)
+            from .sequences import allocate
+            new_seq, _ = allocate(f"center:{prefix}")
             
             self.center_code = f"{prefix}{new_seq:04d}"
             
@@ -168,4 +157,80 @@ class CenterComplaint(models.Model):
     def __str__(self):
         stars_str = f"{self.stars}⭐" if self.stars else self.get_complaint_type_display()
         return f"{stars_str} — {self.health_center.name_ar}"
-
\ No newline at end of file
+
+
+
+class CenterRatingSummary(models.Model):
+    """
+    ملخص تقييمات المركز (عدد، مجموع، توزيع النجوم 1-5، ونقاط التقييمات القديمة)
+    يُحدّث عند حفظ/حذف أي CenterComplaint — فعرض قائمة المراكز لا يحتاج استعلامات إضافية.
+    """
+    health_center = models.OneToOneField(
+        HealthCenter,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rating_summary',
+        verbose_name="المركز"
+    )
+    stars_count = models.PositiveIntegerField(default=0, verbose_name="عدد التقييمات بالنجوم")
+    stars_sum = models.PositiveIntegerField(default=0, verbose_name="مجموع النجوم")
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    # التقييمات القديمة (complaint_type) — تُستخدم فقط إذا لم توجد نجوم
+    legacy_count = models.PositiveIntegerField(default=0)
+    legacy_sum = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "ملخص تقييمات مركز"
+        verbose_name_plural = "ملخصات تقييمات المراكز"
+
+    def __str__(self):
+        return f"{self.health_center_id}: {self.average_rating} ({self.stars_count})"
+
+    @property
+    def average_rating(self):
+        if self.stars_count:
+            return round(self.stars_sum / self.stars_count, 1)
+        if self.legacy_count:
+            return round(self.legacy_sum / self.legacy_count, 1)
+        return 0.0
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f'stars_{star}') for star in range(1, 6)}
+
+    @classmethod
+    def refresh(cls, health_center_id):
+        """
+        إعادة حساب ملخص مركز واحد (استعلام تجميع واحد + كتابة).
+        صف الملخص يُقفل (select_for_update) قبل التجميع: التحديثات المتزامنة لنفس المركز
+        تتسلسل وآخرها يحسب من أحدث البيانات. get_or_create يعالج الإدراج المتزامن لأول تقييم.
+        """
+        from .ratings import summary_values
+        with transaction.atomic():
+            cls.objects.get_or_create(health_center_id=health_center_id)
+            summary = cls.objects.select_for_update().get(health_center_id=health_center_id)
+            values = summary_values(CenterComplaint.objects.filter(health_center_id=health_center_id))
+            for field, value in values.items():
+                setattr(summary, field, value)
+            summary.save()
+        return summary
+
+class SequenceCounter(models.Model):
+    """
+    عدّاد تسلسلي في قاعدة البيانات لتوليد الأكواد (كود المركز، رقم حساب العائلة).
+    الحجز يتم بعملية ذرية واحدة — راجع centers/sequences.py
+    """
+    name = models.CharField(max_length=100, primary_key=True, verbose_name="اسم العدّاد")
+    value = models.BigIntegerField(default=0, verbose_name="آخر قيمة محجوزة")
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+    class Meta:
+        verbose_name = "عدّاد تسلسلي"
+        verbose_name_plural = "العدّادات التسلسلية"
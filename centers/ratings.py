@@ -0,0 +1,33 @@
+"""
+ملخص تقييمات المركز (CenterRatingSummary) — يُحسب باستعلام تجميع شرطي واحد
+ويُحدّث عند حفظ/حذف أي تقييم (centers/signals.py).
+"""
+from django.db.models import Case, Count, IntegerField, Q, Sum, Value, When
+
+# نقاط التقييمات القديمة (قبل حقل النجوم) حسب نوع الشكوى — أي نوع آخر = 1
+LEGACY_SCORES = {
+    'EXCELLENT': 5,
+    'GOOD': 4,
+    'OTHER': 3,
+    'SUBSTITUTE_GIVEN': 2,
+}
+
+
+def summary_values(complaints):
+    """قيم الملخص لمجموعة تقييمات"""
+    legacy_score = Case(
+        *[When(complaint_type=t, then=Value(score)) for t, score in LEGACY_SCORES.items()],
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    aggregates = {
+        'stars_count': Count('id', filter=Q(stars__isnull=False)),
+        'stars_sum': Sum('stars', filter=Q(stars__isnull=False)),
+        'legacy_count': Count('id', filter=Q(complaint_type__isnull=False)),
+        'legacy_sum': Sum(legacy_score, filter=Q(complaint_type__isnull=False)),
+    }
+    for star in range(1, 6):
+        aggregates[f'stars_{star}'] = Count('id', filter=Q(stars=star))
+
+    values = complaints.aggregate(**aggregates)
+    return {key: value or 0 for key, value in values.items()}
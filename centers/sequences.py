@@ -0,0 +1,46 @@
+"""
+حجز قيم تسلسلية من جدول SequenceCounter بعملية ذرية واحدة.
+
+    from centers.sequences import allocate
+    first, last = allocate('center:1401', count=1)
+
+على PostgreSQL و SQLite (3.35+) تُنفَّذ كـ:
+    INSERT ... ON CONFLICT (name) DO UPDATE SET value = value + n RETURNING value
+أي رحلة واحدة لقاعدة البيانات بدون أي تعارض بين الطلبات المتزامنة
+(قفل الصف يضمن أن كل طلب يحصل على نطاق مختلف).
+بقية قواعد البيانات: select_for_update داخل transaction.
+"""
+from django.db import connection, transaction
+
+from .models import SequenceCounter
+
+_UPSERT_VENDORS = ('postgresql', 'sqlite')
+
+
+def allocate(name, count=1):
+    """
+    حجز count قيمة متتالية من العدّاد name.
+    يعيد (أول قيمة، آخر قيمة) — أول قيمة لعدّاد جديد هي 1.
+    """
+    if count < 1:
+        raise ValueError("count must be >= 1")
+
+    if connection.vendor in _UPSERT_VENDORS:
+        table = connection.ops.quote_name(SequenceCounter._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (name, value) VALUES (%s, %s) "
+                f"ON CONFLICT (name) DO UPDATE SET value = {table}.value + excluded.value "
+                f"RETURNING value",
+                [name, count],
+            )
+            last = cursor.fetchone()[0]
+    else:
+        with transaction.atomic():
+            counter, _ = SequenceCounter.objects.select_for_update().get_or_create(name=name)
+            counter.value += count
+            counter.save(update_fields=['value'])
+            last = counter.value
+
+    return last - count + 1, last
+
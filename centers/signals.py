@@ -0,0 +1,41 @@
+"""
+تحديث ملخص تقييمات المركز (CenterRatingSummary) عند حفظ/حذف التقييمات.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import CenterComplaint, CenterRatingSummary
+
+# الحقول التي يُحسب منها الملخص — حفظ غيرها (status مثلاً) لا يعيد الحساب
+RATING_FIELDS = frozenset({'health_center', 'stars', 'complaint_type'})
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=CenterComplaint)
+def remember_previous_center(sender, instance, update_fields=None, **kwargs):
+    """حفظ المركز السابق إذا نُقل التقييم لمركز آخر (استعلام فقط إذا قد يتغير المركز)"""
+    instance._previous_center_id = (
+        CenterComplaint.objects.filter(pk=instance.pk).values_list('health_center_id', flat=True).first()
+        if instance.pk and _touches(update_fields, {'health_center'}) else None
+    )
+
+
+def _refresh_centers(instance):
+    previous = getattr(instance, '_previous_center_id', None)
+    for center_id in {instance.health_center_id, previous}:
+        if center_id:
+            CenterRatingSummary.refresh(center_id)
+
+
+@receiver(post_save, sender=CenterComplaint)
+def refresh_rating_summary(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, RATING_FIELDS):
+        _refresh_centers(instance)
+
+
+@receiver(post_delete, sender=CenterComplaint)
+def refresh_rating_summary_on_delete(sender, instance, **kwargs):
+    _refresh_centers(instance)
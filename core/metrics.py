@@ -0,0 +1,114 @@
+"""
+مقاييس التشغيل بصيغة Prometheus (prometheus_client) — تُعرض على /api/metrics/.
+
+- زمن الطلبات لكل (view، method) كـ histogram + عدد الطلبات حسب رمز الحالة.
+- عدد استعلامات قاعدة البيانات وزمنها لكل view (من QueryMetricsMiddleware).
+- مدة المهام المجدولة (send_reminders، refresh_rollups ...) ونتيجتها وآخر تشغيل ناجح.
+- إرسالات FCM حسب النتيجة، وطلبات كاش الـ API (hit / miss) لكل مجموعة.
+
+تعدد العمال (gunicorn): عند تعريف PROMETHEUS_MULTIPROC_DIR قبل تشغيل العمال
+(gunicorn.conf.py يعرّفه) يكتب كل عامل قيمه في ملفات داخل المجلد، ويجمعها
+الـ endpoint من كل العمال. أوامر cron التي تعمل بنفس المتغير تكتب في المجلد نفسه
+فتظهر مدد المهام أيضاً؛ بدونه يعرض كل عامل مقاييسه فقط (مناسب للتطوير).
+
+    from core.metrics import track_job
+
+    @track_job('send_reminders')
+    def handle(self, *args, **options): ...
+"""
+import contextlib
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# الـ views غير المعروفة (404 مثلاً) تُجمع تحت اسم واحد حتى لا ينفجر عدد السلاسل
+UNMATCHED_VIEW = 'unmatched'
+KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+REQUEST_LATENCY = Histogram(
+    'c4c_http_request_duration_seconds', 'زمن الاستجابة لكل view',
+    ['view', 'method'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    'c4c_http_requests_total', 'عدد الطلبات حسب رمز الحالة',
+    ['view', 'method', 'status'],
+)
+DB_QUERIES = Histogram(
+    'c4c_http_request_db_queries', 'عدد استعلامات قاعدة البيانات لكل طلب',
+    ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_TIME = Counter(
+    'c4c_http_request_db_seconds_total', 'مجموع زمن استعلامات قاعدة البيانات',
+    ['view'],
+)
+
+JOB_DURATION = Histogram(
+    'c4c_job_duration_seconds', 'مدة تشغيل المهام المجدولة',
+    ['job'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+JOB_RUNS = Counter('c4c_job_runs_total', 'عدد تشغيلات المهام حسب النتيجة', ['job', 'outcome'])
+JOB_LAST_SUCCESS = Gauge(
+    'c4c_job_last_success_timestamp_seconds', 'وقت آخر تشغيل ناجح (unix)',
+    ['job'], multiprocess_mode='mostrecent',
+)
+
+# sent / failed / no_token / simulated
+FCM_SENDS = Counter('c4c_fcm_sends_total', 'إرسالات FCM حسب النتيجة', ['type', 'outcome'])
+
+CACHE_REQUESTS = Counter(
+    'c4c_api_cache_requests_total', 'طلبات كاش الـ API حسب المجموعة والنتيجة',
+    ['namespace', 'result'],
+)
+
+
+def observe_request(view, method, status, duration, queries, db_duration):
+    view = view or UNMATCHED_VIEW
+    if method not in KNOWN_METHODS:
+        method = 'OTHER'
+    REQUEST_LATENCY.labels(view, method).observe(duration)
+    REQUESTS.labels(view, method, str(status)).inc()
+    DB_QUERIES.labels(view).observe(queries)
+    DB_TIME.labels(view).inc(db_duration)
+
+
+def count_fcm(notification_type, outcome):
+    FCM_SENDS.labels(notification_type, outcome).inc()
+
+
+def count_cache(namespace, hit):
+    CACHE_REQUESTS.labels(namespace, 'hit' if hit else 'miss').inc()
+
+
+@contextlib.contextmanager
+def track_job(name):
+    """قياس مدة مهمة ونتيجتها (context manager أو decorator)"""
+    started = time.monotonic()
+    try:
+        yield
+    except BaseException:
+        JOB_RUNS.labels(name, 'failure').inc()
+        raise
+    else:
+        JOB_RUNS.labels(name, 'success').inc()
+        JOB_LAST_SUCCESS.labels(name).set_to_current_time()
+    finally:
+        JOB_DURATION.labels(name).observe(time.monotonic() - started)
+
+
+def render():
+    """(النص، content type) — مجمّع من كل العمال في وضع تعدد العمليات"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,95 @@
+"""
+قياس استعلامات قاعدة البيانات لكل طلب:
+- ترويسة Server-Timing (تظهر في تبويب Network بأدوات المطور):
+      Server-Timing: db;dur=12.4;desc="7 queries", app;dur=48.0
+- سطر log بصيغة JSON في المسجل c4c.requests — WARNING عند تجاوز ميزانية الـ endpoint
+  (api/querybudget.py)، و INFO لباقي الطلبات.
+- مقاييس Prometheus (core/metrics.py): زمن الطلب وعدد الاستعلامات وزمنها لكل view.
+- ربط الطلب بالاستعلامات البطيئة (api/slowqueries.py) لمعرفة الـ view المسبب.
+"""
+import contextlib
+import json
+import logging
+import time
+
+from django.db import connections
+
+from api import slowqueries
+from api.querybudget import budget_for
+
+from . import metrics
+
+logger = logging.getLogger('c4c.requests')
+
+
+class _QueryCounter:
+    """execute_wrapper يعدّ الاستعلامات ويجمع زمنها"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def _remove_wrapper(connection, wrapper):
+    # بالهوية لا بـ pop(): اتصال يُفتح أثناء الطلب قد يضيف wrapper خاصاً به
+    # (api/slowqueries.py) فلا يكون عدادنا آخر القائمة
+    wrappers = connection.execute_wrappers
+    for i in range(len(wrappers) - 1, -1, -1):
+        if wrappers[i] is wrapper:
+            del wrappers[i]
+            return
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        slowqueries.bind_request(request)
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    connection.execute_wrappers.append(counter)
+                    stack.callback(_remove_wrapper, connection, counter)
+                response = self.get_response(request)
+        finally:
+            slowqueries.bind_request(None)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = counter.duration * 1000
+
+        if not response.has_header('Server-Timing'):
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{counter.count} queries", app;dur={total_ms:.1f}'
+            )
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        budget = budget_for(view_name) if view_name else None
+        over_budget = budget is not None and counter.count > budget
+        metrics.observe_request(view_name, request.method, response.status_code,
+                                total_ms / 1000, counter.count, counter.duration)
+
+        level = logging.WARNING if over_budget else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'queries': counter.count,
+                'query_budget': budget,
+                'over_budget': over_budget,
+                'db_ms': round(db_ms, 1),
+                'total_ms': round(total_ms, 1),
+            }, ensure_ascii=False))
+        return response
@@ -71,6 +71,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryMetricsMiddleware',  # ⏱️ أولاً: يقيس كل استعلامات الطلب (Server-Timing)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -175,10 +176,91 @@ LOGIN_REDIRECT_URL = 'centers:dashboard'
 LOGOUT_REDIRECT_URL = '/users/login/'
 LOGIN_URL = '/users/login/'
 
+# حسابات العائلات: تُنشأ في الخلفية بعد تسجيل الطفل بدلاً من داخل الطلب
+# (تجزئة كلمة المرور PBKDF2 مكلفة). False = إنشاء متزامن كما في السابق.
+FAMILY_ACCOUNTS_ASYNC = os.environ.get('FAMILY_ACCOUNTS_ASYNC', 'True') == 'True'
+# مفتاح بعثرة أكواد العائلات (medical/models.py) — الافتراضي SECRET_KEY.
+# تعريفه مستقلاً يسمح بتدوير SECRET_KEY بدون تغيير تبديل الأكواد (تغييره آمن لكنه يبعثر الترتيب من جديد).
+FAMILY_CODE_SECRET = os.environ.get('FAMILY_CODE_SECRET', '')
+
+# مكعب التجميع (api/rollups.py): المراكز المعلّمة يعيد حسابها thread خلفي بعد ثوانٍ.
+# False = تبقى معلّمة حتى يعالجها cron: python manage.py refresh_rollups --dirty
+ROLLUPS_ASYNC = os.environ.get('ROLLUPS_ASYNC', 'True') == 'True'
+
+# ======================================================
+# ⚡ الكاش — CACHE_BACKEND: locmem (الافتراضي) | file | redis | dummy
+# ======================================================
+# locmem خاص بكل worker؛ file و redis مشتركان بين عمال gunicorn.
+# الإبطال (api/cache.py) عبر جدول CacheVersion في قاعدة البيانات فيراه كل العمال مع أي backend.
+# redis يحتاج حزمة redis (اختيارية): pip install redis ثم CACHE_LOCATION=redis://host:6379/1
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'care4child'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+_cache_class, _cache_location = _CACHE_BACKENDS[CACHE_BACKEND]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # نتائج التقارير والبيانات المرجعية وردود الـ views المخزنة (api/cache.py)
+    'api': {
+        'BACKEND': _cache_class,
+        'LOCATION': os.environ.get('CACHE_LOCATION', _cache_location),
+        'TIMEOUT': 600,
+    },
+}
+API_CACHE_ALIAS = 'api'
+# أقصى مدة (ثوانٍ) قبل أن يرى worker إبطالاً تم في worker آخر
+CACHE_VERSION_CHECK_SECONDS = float(os.environ.get('CACHE_VERSION_CHECK_SECONDS', '1'))
+
+# ======================================================
+# 📈 مقاييس Prometheus (core/metrics.py) على /api/metrics/
+# ======================================================
+# Prometheus يرسل: Authorization: Bearer <METRICS_TOKEN> — بدونه الوصول لمستخدمي is_staff فقط.
+# تجميع عمال gunicorn يحتاج PROMETHEUS_MULTIPROC_DIR (يعرّفه gunicorn.conf.py تلقائياً).
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# ======================================================
+# 🐢 الاستعلامات البطيئة (api/slowqueries.py) — تُعرض في لوحة الإدارة
+# ======================================================
+# SLOW_QUERY_MS=200 يسجل كل استعلام أبطأ من 200ms (0 = معطل)
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '0'))
+# نسبة استعلامات SELECT البطيئة التي تُعاد مع EXPLAIN (ANALYZE, BUFFERS) على PostgreSQL
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', '0.1'))
+
+# مفتاح روابط cron الخارجية (api/cron/...) — يُرسل كـ ?secret=
+CRON_SECRET = os.environ.get('CRON_SECRET', 'secure_care4child_cron_2026')
+
+# مدة تخزين (token ← المستخدم + مركزه) في كاش المصادقة (api/authentication.py)
+AUTH_CACHE_SECONDS = int(os.environ.get('AUTH_CACHE_SECONDS', '60'))
+
+# ======================================================
+# ⏱️ سجل الطلبات (core/middleware.py) — سطر JSON لكل طلب: عدد الاستعلامات وزمنها
+# ======================================================
+# REQUEST_LOG_LEVEL=WARNING لتسجيل الطلبات التي تتجاوز ميزانية الاستعلامات فقط
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'c4c.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # REST Framework Config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -0,0 +1,22 @@
+# ============================================================
+# gunicorn.conf.py — يُقرأ تلقائياً عند تشغيل gunicorn من مجلد المشروع
+# ============================================================
+# مقاييس Prometheus (core/metrics.py) في وضع تعدد العمال: كل عامل يكتب قيمه
+# في ملفات داخل PROMETHEUS_MULTIPROC_DIR ويجمعها /api/metrics/ من كل العمال.
+# المتغير يجب أن يُعرّف قبل بدء العمال — لذلك هنا وليس في settings.py.
+import os
+import shutil
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/c4c-metrics')
+
+
+def on_starting(server):
+    # ملفات تشغيل سابق تجعل العدادات تبدأ من قيم قديمة
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,201 @@
+"""
+محرك تحليل الأفواج (Birth-cohort coverage) — مؤشر EPI القياسي:
+نسبة الأطفال الذين أخذوا الجرعة (أو أكملوا التطعيمات الأساسية) قبل بلوغ
+عمر 12 / 24 شهراً، حسب شهر الميلاد والمنطقة.
+
+البيانات تُجلب كأعمدة مسطحة ببضعة استعلامات (بدون حلقة لكل طفل) وتُقرأ على دفعات
+مباشرة إلى مصفوفات NumPy (بدون قائمة tuples لكل الأطفال)، والحساب كله عمليات متجهة:
+
+    from medical.analytics import cohort_coverage
+    rows = cohort_coverage(level='governorate', vaccine_key='Pentavalent Vaccine', dose_number=3)
+"""
+import datetime
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.db import connections
+from django.db.models import Count, Max, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from centers.models import Directorate, Governorate
+from .models import Child, VaccineRecord, VaccineSchedule
+
+DEFAULT_MILESTONES = (12, 24)
+# صفوف لكل fetchmany عند تحويل نتيجة الاستعلام إلى أعمدة
+FETCH_CHUNK = 20000
+
+# مستوى التجميع → حقل المنطقة في جدول الأطفال (حسب مركز الطفل)
+REGION_FIELDS = {
+    'national': None,
+    'governorate': 'health_center__governorate_id',
+    'directorate': 'health_center__directorate_id',
+}
+
+
+def _month(value):
+    """'2024-03' أو date → datetime64[M]"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.strftime('%Y-%m')
+    return np.datetime64(value, 'M')
+
+
+def _child_filters(governorate_id=None, directorate_id=None, born_from=None, born_to=None, prefix=''):
+    filters = {f'{prefix}date_of_birth__isnull': False}
+    if directorate_id:
+        filters[f'{prefix}health_center__directorate_id'] = directorate_id
+    elif governorate_id:
+        filters[f'{prefix}health_center__governorate_id'] = governorate_id
+    if born_from:
+        filters[f'{prefix}date_of_birth__gte'] = _month(born_from).astype('M8[D]').item()
+    if born_to:
+        filters[f'{prefix}date_of_birth__lt'] = (_month(born_to) + 1).astype('M8[D]').item()
+    return filters
+
+
+def _columns(queryset, *dtypes):
+    """
+    أعمدة NumPy من استعلام values_list: الصفوف تُقرأ بـ fetchmany على دفعات FETCH_CHUNK
+    وكل دفعة تُحوّل مباشرة (np.fromiter) — لا تُبنى قائمة Python بكل الصفوف.
+    cursor خام بدون محولات Django: التواريخ تصل كـ date (PostgreSQL) أو نص ISO (SQLite)
+    وكلاهما يُقبل في datetime64.
+    """
+    dtype = np.dtype([(f'f{i}', t) for i, t in enumerate(dtypes)])
+    sql, params = queryset.query.sql_with_params()
+    chunks = []
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(FETCH_CHUNK):
+            chunks.append(np.fromiter(rows, dtype=dtype, count=len(rows)))
+    data = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+    return [np.ascontiguousarray(data[name]) for name in dtype.names]
+
+
+def load_cohort(level='national', **scope):
+    """
+    أعمدة الأطفال مرتبة حسب id:
+    child_id (int64)، dob (datetime64[D])، region (int64، -1 بدون منطقة)
+    """
+    region_field = REGION_FIELDS[level]
+    children = Child.objects.filter(**_child_filters(**scope)).order_by('id').annotate(
+        region=Coalesce(region_field, Value(-1)) if region_field else Value(-1)
+    )
+    child_id, dob, region = _columns(
+        children.values_list('id', 'date_of_birth', 'region'), np.int64, 'M8[D]', np.int64
+    )
+    return {'child_id': child_id, 'dob': dob, 'region': region}
+
+
+def load_completion_dates(vaccine_key=None, dose_number=None, **scope):
+    """
+    (child_id, تاريخ) لكل طفل حقق الهدف:
+    - لقاح + جرعة: تاريخ إعطاء تلك الجرعة.
+    - بدون تحديد: تاريخ آخر جرعة أساسية (BASIC) لمن أخذ كل الجرعات الأساسية.
+    """
+    records = VaccineRecord.objects.filter(**_child_filters(prefix='child__', **scope))
+
+    if vaccine_key:
+        rows = records.filter(vaccine__key=vaccine_key, dose_number=dose_number or 1)\
+            .values_list('child_id', 'date_given')
+    else:
+        basic = set(VaccineSchedule.objects.filter(stage='BASIC').values_list('vaccine_id', 'dose_number'))
+        if not basic:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype='M8[D]')
+        rows = records.filter(reduce(or_, (Q(vaccine_id=v, dose_number=d) for v, d in basic)))\
+            .values('child_id')\
+            .annotate(doses=Count('id'), last_given=Max('date_given'))\
+            .filter(doses=len(basic))\
+            .values_list('child_id', 'last_given')
+
+    child_ids, dates = _columns(rows, np.int64, 'M8[D]')
+    return child_ids, dates
+
+
+def compute_cohort_coverage(cohort, done_child_ids, done_dates, milestones=DEFAULT_MILESTONES, as_of=None):
+    """
+    الحساب المتجه: لكل (شهر ميلاد، منطقة) × عمر (بالأشهر):
+    eligible = أطفال بلغوا هذا العمر حتى as_of
+    covered  = منهم من حقق الهدف في تاريخ ≤ تاريخ بلوغ العمر
+    يعيد (group_months, group_regions, children, {milestone: (eligible, covered)})
+    """
+    as_of = np.datetime64(as_of or timezone.now().date(), 'D')
+    child_ids, dob, region = cohort['child_id'], cohort['dob'], cohort['region']
+    n = len(child_ids)
+
+    # تاريخ تحقيق الهدف لكل طفل (NaT إن لم يتحقق) — ربط عبر بحث ثنائي على ids المرتبة
+    done = np.full(n, np.datetime64('NaT'), dtype='M8[D]')
+    if n and len(done_child_ids):
+        pos = np.searchsorted(child_ids, done_child_ids)
+        pos_clipped = np.minimum(pos, n - 1)
+        found = (pos < n) & (child_ids[pos_clipped] == done_child_ids)
+        done[pos_clipped[found]] = done_dates[found]
+
+    birth_month = dob.astype('M8[M]')
+    day_of_month = dob - birth_month.astype('M8[D]')
+    has_done = ~np.isnat(done)
+
+    # مفتاح المجموعة = شهر الميلاد × المنطقة
+    month_index = birth_month.astype(np.int64)
+    region_span = int(region.max()) + 2 if n else 1
+    group_key = month_index * region_span + (region + 1)
+    keys, inverse = np.unique(group_key, return_inverse=True)
+    size = len(keys)
+
+    children = np.bincount(inverse, minlength=size)
+    results = {}
+    for months in milestones:
+        reached_on = (birth_month + int(months)).astype('M8[D]') + day_of_month
+        eligible = reached_on <= as_of
+        covered = eligible & has_done & (done <= reached_on)
+        results[months] = (
+            np.bincount(inverse, weights=eligible, minlength=size).astype(np.int64),
+            np.bincount(inverse, weights=covered, minlength=size).astype(np.int64),
+        )
+
+    group_months = (keys // region_span).astype('M8[M]')
+    group_regions = keys % region_span - 1
+    return group_months, group_regions, children, results
+
+
+def _region_names(level, region_ids):
+    ids = [int(r) for r in set(region_ids.tolist()) if r >= 0]
+    if level == 'governorate':
+        return dict(Governorate.objects.filter(id__in=ids).values_list('id', 'name_ar'))
+    if level == 'directorate':
+        return dict(Directorate.objects.filter(id__in=ids).values_list('id', 'name_ar'))
+    return {}
+
+
+def cohort_coverage(level='national', vaccine_key=None, dose_number=None,
+                    milestones=DEFAULT_MILESTONES, as_of=None, **scope):
+    """
+    جدول التغطية: صف لكل (شهر ميلاد، منطقة) مع التغطية عند كل عمر.
+    scope: governorate_id, directorate_id, born_from, born_to ('YYYY-MM')
+    """
+    if level not in REGION_FIELDS:
+        raise ValueError(f"level must be one of {', '.join(REGION_FIELDS)}")
+
+    cohort = load_cohort(level, **scope)
+    done_ids, done_dates = load_completion_dates(vaccine_key, dose_number, **scope)
+    months, regions, children, results = compute_cohort_coverage(
+        cohort, done_ids, done_dates, milestones=milestones, as_of=as_of
+    )
+    names = _region_names(level, regions)
+
+    results = {m: (eligible.tolist(), covered.tolist()) for m, (eligible, covered) in results.items()}
+    rows = []
+    for i, (month, region_id, count) in enumerate(zip(months.astype(str).tolist(), regions.tolist(), children.tolist())):
+        row = {
+            'birth_month': month,
+            'region_id': region_id if region_id >= 0 else None,
+            'region_name': names.get(region_id),
+            'children': count,
+        }
+        for m in milestones:
+            eligible, covered = results[m][0][i], results[m][1][i]
+            row[f'eligible_{m}m'] = eligible
+            row[f'covered_{m}m'] = covered
+            row[f'coverage_{m}m'] = round(covered / eligible * 100, 1) if eligible else None
+        rows.append(row)
+    return rows
@@ -0,0 +1,135 @@
+"""
+تأجيل آثار الـ signals الطبية أثناء العمليات الجماعية.
+
+الاستخدام:
+    from medical.batching import deferred_signals
+
+    with deferred_signals() as batch:
+        children = Child.objects.bulk_create([...])
+        batch.add_children(children)   # bulk_create لا يطلق post_save
+
+عند الخروج من الكتلة تُطبَّق كل الآثار المؤجلة بعمليات مجمّعة:
+إدراج الجداول دفعة واحدة، مزامنة is_taken، إعادة حساب الاكتمال،
+إنشاء حسابات العائلات (تجزئة على عدة عمليات)، ثم إشعارات التقييم المجمّعة.
+الكتلة والتطبيق في transaction واحد: إذا فشلت الكتلة لا يبقى صف محفوظ بدون جدوله
+أو حسابه، والإشعارات تُرسل بعد الـ commit فقط.
+مع defer_accounts=True تبقى العائلات بدون حساب ليلتقطها المسار الخلفي
+(medical.provisioning / أمر provision_family_accounts).
+الحفظ العادي (save/create) داخل الكتلة يُسجَّل تلقائياً عبر الـ signals.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from . import services
+
+_local = threading.local()
+
+# يُرسل بعد تطبيق دفعة (bulk_create لا يطلق post_save) — لإبطال الكاش مثلاً
+batch_flushed = Signal()
+
+
+class SignalBatch:
+    def __init__(self, notify=True, defer_accounts=False, processes=1):
+        self.notify = notify
+        self.defer_accounts = defer_accounts
+        self.processes = processes
+        self.children = {}
+        self.families = {}
+        self.record_child_ids = set()
+        self.deleted_record_child_ids = set()
+        self.created_records = []
+        # سجلات أُضيفت داخل كتلة متداخلة بـ notify=False
+        self.quiet_record_ids = set()
+
+    @contextmanager
+    def options(self, notify, defer_accounts):
+        """خيارات كتلة متداخلة — الأشد يغلب: لا إشعار إذا منعته أي كتلة، وتأجيل الحسابات كذلك"""
+        saved = self.notify, self.defer_accounts
+        self.notify = self.notify and notify
+        self.defer_accounts = self.defer_accounts or defer_accounts
+        try:
+            yield self
+        finally:
+            self.notify, self.defer_accounts = saved
+
+    def add_children(self, children):
+        for child in children:
+            self.children[child.pk] = child
+
+    def add_families(self, families):
+        if self.defer_accounts:
+            return  # يلتقطها المسار الخلفي (العائلات بدون حساب)
+        for family in families:
+            self.families[family.pk] = family
+
+    def add_records(self, records, created=True):
+        for record in records:
+            self.record_child_ids.add(record.child_id)
+            if created:
+                self.created_records.append(record)
+                if not self.notify:
+                    self.quiet_record_ids.add(record.pk)
+
+    def add_deleted_records(self, records):
+        for record in records:
+            self.deleted_record_child_ids.add(record.child_id)
+
+    def flush(self):
+        """تطبيق الآثار المؤجلة — كل خطوة عملية مجمّعة واحدة (أو دفعات)"""
+        services.bulk_generate_schedules(self.children.values())
+
+        created_child_ids = {r.child_id for r in self.created_records}
+        if created_child_ids:
+            services.assign_centers_from_records(created_child_ids)
+        if self.record_child_ids:
+            services.mark_taken_schedules(self.record_child_ids)
+        if self.deleted_record_child_ids:
+            services.revert_untaken_schedules(self.deleted_record_child_ids)
+
+        touched = self.record_child_ids | self.deleted_record_child_ids
+        if touched:
+            services.recompute_completion(touched)
+            services.bump_child_versions(touched)
+
+        if self.families:
+            services.provision_family_accounts(self.families.values(), processes=self.processes)
+
+        prompts = [r for r in self.created_records if r.pk not in self.quiet_record_ids]
+        if prompts:
+            transaction.on_commit(lambda: services.send_batched_visit_prompts(prompts))
+
+        batch_flushed.send(sender=SignalBatch, batch=self)
+
+
+def current_batch():
+    """الدفعة النشطة في هذا الـ thread (أو None)"""
+    return getattr(_local, 'batch', None)
+
+
+@contextmanager
+def deferred_signals(notify=True, defer_accounts=False, processes=1):
+    """
+    notify=False يمنع إشعارات التقييم (مثلاً عند استيراد سجلات قديمة).
+    defer_accounts=True يترك إنشاء حسابات العائلات للمسار الخلفي،
+    و processes > 1 يوزع تجزئة كلمات المرور على عدة عمليات.
+    الكتل المتداخلة تنضم للدفعة الخارجية مع احترام notify و defer_accounts لما يُضاف
+    داخلها (SignalBatch.options). الكتلة والتطبيق داخل transaction.atomic() —
+    إذا حدث استثناء يُلغى كل ما كُتب ولا يتم التطبيق.
+    """
+    outer = current_batch()
+    if outer is not None:
+        with outer.options(notify, defer_accounts):
+            yield outer
+        return
+
+    batch = SignalBatch(notify=notify, defer_accounts=defer_accounts, processes=processes)
+    with transaction.atomic():
+        _local.batch = batch
+        try:
+            yield batch
+        finally:
+            _local.batch = None
+        batch.flush()
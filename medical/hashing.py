@@ -0,0 +1,41 @@
+"""
+تجزئة كلمات مرور حسابات العائلات (PBKDF2) على عدة عمليات (process pool).
+
+هذه الوحدة لا تستورد أي موديلات حتى يمكن تحميلها داخل العمليات الفرعية
+مباشرة (spawn) قبل تهيئة Django بالكامل.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# أقل عدد كلمات مرور يستحق تشغيل process pool (تكلفة إنشاء العمليات)
+MIN_PARALLEL = 32
+
+
+def _setup_django():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+        django.setup()
+
+
+def _hash_chunk(passwords):
+    _setup_django()
+    from django.contrib.auth.hashers import make_password
+    return [make_password(p) for p in passwords]
+
+
+def hash_passwords(passwords, processes=None):
+    """
+    make_password لقائمة كلمات مرور مع الحفاظ على الترتيب.
+    processes=1 → تنفيذ في نفس العملية، None → عدد الأنوية.
+    """
+    passwords = list(passwords)
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1 or len(passwords) < MIN_PARALLEL:
+        return _hash_chunk(passwords)
+
+    size = max(1, -(-len(passwords) // (processes * 4)))
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return [h for hashed in pool.map(_hash_chunk, chunks) for h in hashed]
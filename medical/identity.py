@@ -0,0 +1,37 @@
+"""
+مفتاح هوية العائلة: بصمة (sha256) لاسمي الأب والأم بعد التوحيد،
+حتى يكون البحث عن العائلة استعلاماً واحداً على فهرس فريد
+ولا تتكرر العائلة بسبب مسافات زائدة أو اختلاف كتابة الهمزات والتشكيل.
+"""
+import hashlib
+import re
+import unicodedata
+
+# التشكيل (الفتحة .. السكون، الشدة، الألف الخنجرية) + علامات القرآن الصغيرة
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
+# التطويل (ـ) والمحارف غير المرئية (ZWNJ / ZWJ / علامات الاتجاه)
+_INVISIBLE = re.compile('[\u0640\u200b-\u200f\u202a-\u202e\u2066-\u2069\ufeff]')
+
+_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+})
+
+
+def normalize_name(name):
+    """
+    توحيد الاسم قبل المقارنة:
+    NFKC، حذف التشكيل والتطويل، توحيد الألف والياء والتاء المربوطة،
+    دمج المسافات، وتحويل الحروف اللاتينية لحالة موحدة.
+    """
+    name = unicodedata.normalize('NFKC', name or '')
+    name = _INVISIBLE.sub('', _DIACRITICS.sub('', name))
+    name = name.translate(_LETTER_MAP)
+    return ' '.join(name.split()).casefold()
+
+
+def family_identity_key(father_name, mother_name):
+    """بصمة ثابتة الطول (64 حرف) لزوج الأب/الأم بعد التوحيد"""
+    raw = f"{normalize_name(father_name)}\x1f{normalize_name(mother_name)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
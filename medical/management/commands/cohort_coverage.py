@@ -0,0 +1,63 @@
+"""
+أمر إدارة لحساب تغطية الأفواج (مؤشر EPI) حسب شهر الميلاد والمنطقة.
+
+الاستخدام:
+    python manage.py cohort_coverage
+    python manage.py cohort_coverage --level governorate --vaccine "Pentavalent Vaccine" --dose 3
+    python manage.py cohort_coverage --born-from 2023-01 --born-to 2023-12 --csv cohort.csv
+"""
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from medical.analytics import DEFAULT_MILESTONES, REGION_FIELDS, cohort_coverage
+
+
+class Command(BaseCommand):
+    help = 'تغطية الأفواج عند عمر 12 / 24 شهراً حسب شهر الميلاد والمنطقة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--level', choices=list(REGION_FIELDS), default='national')
+        parser.add_argument('--vaccine', help='مفتاح اللقاح (Vaccine.key) — بدونه: مكتمل التطعيمات الأساسية')
+        parser.add_argument('--dose', type=int, default=None, help='رقم الجرعة (مع --vaccine)')
+        parser.add_argument('--milestones', default=','.join(map(str, DEFAULT_MILESTONES)),
+                            help='الأعمار بالأشهر مفصولة بفواصل')
+        parser.add_argument('--governorate', type=int, help='id المحافظة')
+        parser.add_argument('--directorate', type=int, help='id المديرية')
+        parser.add_argument('--born-from', help='أول شهر ميلاد (YYYY-MM)')
+        parser.add_argument('--born-to', help='آخر شهر ميلاد (YYYY-MM)')
+        parser.add_argument('--csv', help='حفظ الجدول في ملف CSV')
+
+    def handle(self, *args, **options):
+        try:
+            milestones = tuple(int(m) for m in options['milestones'].split(',') if m.strip())
+        except ValueError:
+            raise CommandError('--milestones يجب أن تكون أرقاماً مثل 12,24')
+
+        started = time.monotonic()
+        rows = cohort_coverage(
+            options['level'], options['vaccine'], options['dose'], milestones,
+            governorate_id=options['governorate'], directorate_id=options['directorate'],
+            born_from=options['born_from'], born_to=options['born_to'],
+        )
+        elapsed = time.monotonic() - started
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='', encoding='utf-8-sig') as out:
+                if rows:
+                    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+                    writer.writeheader()
+                    writer.writerows(rows)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ {len(rows)} صف في {options['csv']}"))
+        else:
+            header = ['شهر الميلاد', 'المنطقة', 'الأطفال'] + [f'{m} شهر' for m in milestones]
+            self.stdout.write(' | '.join(header))
+            for row in rows:
+                cells = [row['birth_month'], row['region_name'] or '—', str(row['children'])]
+                for m in milestones:
+                    coverage = row[f'coverage_{m}m']
+                    cells.append('—' if coverage is None else f"{coverage}% ({row[f'covered_{m}m']}/{row[f'eligible_{m}m']})")
+                self.stdout.write(' | '.join(cells))
+
+        self.stdout.write(f"\n{len(rows)} مجموعة — {elapsed:.2f} ث")
@@ -0,0 +1,48 @@
+"""
+أمر إدارة لإنشاء حسابات العائلات التي لم يُنشأ لها حساب بعد
+(المسار الخلفي لـ create_family_user وللاستيراد الجماعي).
+تجزئة كلمات المرور موزعة على عدة عمليات.
+
+الاستخدام:
+    python manage.py provision_family_accounts
+    python manage.py provision_family_accounts --processes 8 --batch-size 1000
+    python manage.py provision_family_accounts --min-age 300 --limit 100   # تمشيط دوري (cron)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.metrics import track_job
+from medical.models import Family
+from medical.services import provision_pending_family_accounts
+
+
+class Command(BaseCommand):
+    help = 'إنشاء حسابات العائلات المعلّقة (بدون حساب) على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='عدد العمليات لتجزئة كلمات المرور (الافتراضي: عدد الأنوية)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=None, help='الحد الأقصى للحسابات في هذا التشغيل')
+        parser.add_argument('--min-age', type=int, default=None,
+                            help='تجاهل العائلات الأحدث من هذا العدد من الثواني (ما زالت في الطابور الخلفي)')
+
+    @track_job('provision_family_accounts')
+    def handle(self, *args, **options):
+        pending = Family.objects.filter(account__isnull=True).count()
+        if not pending:
+            self.stdout.write('لا توجد عائلات بدون حساب.')
+            return
+
+        self.stdout.write(f'عائلات بدون حساب: {pending}')
+        started = time.monotonic()
+        created = provision_pending_family_accounts(
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            min_age=options['min_age'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'تم إنشاء {created} حساب خلال {time.monotonic() - started:.1f} ث.'
+        ))
@@ -0,0 +1,40 @@
+"""
+إضافة Family.identity_key وتعبئته للعائلات الموجودة.
+العائلات القديمة المكررة (نفس الاسمين بعد التوحيد) تأخذ الأقدم منها المفتاح
+العادي والبقية "<key>:<id>" حتى يمكن فرض الفهرس الفريد بدون دمج بيانات.
+"""
+from django.db import migrations, models
+
+from medical.identity import family_identity_key
+
+
+def populate_identity_keys(apps, schema_editor):
+    Family = apps.get_model('medical', 'Family')
+    seen = set()
+    batch = []
+    for family in Family.objects.order_by('id').only('id', 'father_name', 'mother_name').iterator(chunk_size=2000):
+        key = family_identity_key(family.father_name, family.mother_name)
+        family.identity_key = key if key not in seen else f"{key}:{family.id}"
+        seen.add(key)
+        batch.append(family)
+        if len(batch) >= 2000:
+            Family.objects.bulk_update(batch, ['identity_key'])
+            batch = []
+    if batch:
+        Family.objects.bulk_update(batch, ['identity_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0016_vaccinerecord_health_center'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='family',
+            name='identity_key',
+            field=models.CharField(editable=False, max_length=80, null=True, verbose_name='مفتاح الهوية'),
+        ),
+        migrations.RunPython(populate_identity_keys, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# الفهرس الفريد في migration منفصل (transaction مستقل عن تعبئة البيانات على PostgreSQL)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0017_family_identity_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='family',
+            name='identity_key',
+            field=models.CharField(editable=False, max_length=80, unique=True, verbose_name='مفتاح الهوية'),
+        ),
+    ]
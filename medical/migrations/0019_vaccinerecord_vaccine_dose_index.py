@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0011_sequencecounter'),
+        ('medical', '0018_alter_family_identity_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaccinerecord',
+            index=models.Index(fields=['vaccine', 'dose_number'], name='record_vaccine_dose_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0019_vaccinerecord_vaccine_dose_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='childvaccineschedule',
+            index=models.Index(condition=models.Q(('is_taken', False)), fields=['due_date', 'child'], name='schedule_untaken_due_idx'),
+        ),
+    ]
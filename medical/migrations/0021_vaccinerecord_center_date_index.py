@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0012_centerratingsummary'),
+        ('medical', '0020_childvaccineschedule_untaken_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaccinerecord',
+            index=models.Index(fields=['health_center', 'date_given'], name='record_center_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0021_vaccinerecord_center_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='نسخة البيانات'),
+        ),
+        migrations.AddField(
+            model_name='family',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='نسخة البيانات'),
+        ),
+    ]
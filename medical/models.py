@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.utils.crypto import salted_hmac
 from centers.models import Governorate, Directorate, HealthCenter
+from .identity import family_identity_key
 
 class Vaccine(models.Model):
     name_ar = models.CharField(max_length=100, verbose_name="اسم اللقاح (عربي)")
@@ -45,7 +48,74 @@ class VaccineSchedule(models.Model):
 
 # --- الكيانات الجديدة (New Unified Logic) ---
 
-class Family(models.Model):
+class VersionedModel(models.Model):
+    """
+    عداد نسخة يزيد ذرياً (F) مع كل حفظ، ومن الـ signals عند تعديل البيانات التابعة
+    (سجلات التطعيم، الجدول). منه يُبنى ETag للطلبات المشروطة (api/conditional.py).
+    بعد الحفظ يصبح version حقلاً مؤجلاً: يُقرأ من قاعدة البيانات عند الوصول إليه فقط
+    (لا SELECT إضافي بعد كل حفظ).
+    """
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="نسخة البيانات")
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        bump = self.pk is not None and not self._state.adding
+        if not bump:
+            return super().save(*args, **kwargs)
+
+        previous = self.__dict__.get('version')
+        self.version = F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            if previous is None:
+                self.__dict__.pop('version', None)
+            else:
+                self.version = previous
+            raise
+        self.__dict__.pop('version', None)
+
+
+# أرقام الحسابات الجديدة 6 خانات فأكثر (القديمة العشوائية 5 خانات) فلا تتعارض معها.
+# كود العائلة هو أيضاً كلمة مرور حسابها، لذا يُبعثر الرقم التسلسلي بتبديل Feistel
+# مفتاحه سري (FAMILY_CODE_SECRET أو SECRET_KEY): معرفة كود لا تكشف أكواد العائلات المجاورة.
+# تغيير المفتاح يغير التبديل، والأكواد المستخدمة مسبقاً تُتخطى عند الحجز (generate_access_codes).
+_FAMILY_CODE_ROUNDS = 8
+
+
+def _feistel(index, bits, width):
+    """تبديل مفتاحي على [0, 2**bits) — bits زوجي"""
+    half = bits // 2
+    mask = (1 << half) - 1
+    left, right = index >> half, index & mask
+    secret = getattr(settings, 'FAMILY_CODE_SECRET', '') or settings.SECRET_KEY
+    for r in range(_FAMILY_CODE_ROUNDS):
+        digest = salted_hmac('medical.family_code', f'{width}:{r}:{right}', secret=secret).digest()
+        left, right = right, left ^ (int.from_bytes(digest[:8], 'big') & mask)
+    return (left << half) | right
+
+
+def _scramble_family_serial(n):
+    """تحويل الرقم التسلسلي n (يبدأ من 1) إلى لاحقة الكود"""
+    index, width = n - 1, 6
+    space = 9 * 10 ** (width - 1)
+    while index >= space:
+        index -= space
+        width += 1
+        space = 9 * 10 ** (width - 1)
+    bits = space.bit_length() + space.bit_length() % 2
+    # cycle walking: تكرار التبديل حتى تقع النتيجة داخل المجال (تبقى تبديلاً بدون تكرار)
+    index = _feistel(index, bits, width)
+    while index >= space:
+        index = _feistel(index, bits, width)
+    return 10 ** (width - 1) + index
+
+
+class Family(VersionedModel):
     """
     جدول العائلة الجديد:
     - يحل محل الأب والأم المنفصلين.
@@ -62,6 +132,8 @@ class Family(models.Model):
     # 2. الحساب (User Account) - للدخول للتطبيق
     account = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='family_profile', null=True, blank=True)
     access_code = models.CharField("رقم الحساب (ID)", max_length=20, unique=True, editable=False)
+    # بصمة الاسمين بعد التوحيد (medical/identity.py) — للبحث عن العائلة بفهرس فريد
+    identity_key = models.CharField("مفتاح الهوية", max_length=80, unique=True, editable=False)
     
     notes = models.TextField("ملاحظات", blank=True, null=True)
 
@@ -74,25 +146,43 @@ class Family(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.access_code:
-            import random
-            from datetime import datetime
-            
-            while True:
-                code_suffix = random.randint(10000, 99999)
-                current_year = datetime.now().year
-                new_code = f"F-{current_year}-{code_suffix}"
-                
-                if not Family.objects.filter(access_code=new_code).exists():
-                    self.access_code = new_code
-                    break
+            self.access_code = Family.generate_access_codes(1)[0]
+
+        # إعادة حساب المفتاح عند تغيير الأسماء؛ المفاتيح ذات اللاحقة (عائلات قديمة مكررة
+        # مثل "<key>:<id>") تبقى كما هي ما دامت الأسماء لم تتغير
+        key = family_identity_key(self.father_name, self.mother_name)
+        if not (self.identity_key or '').startswith(key):
+            self.identity_key = key
         
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def generate_access_codes(count):
+        """
+        حجز count رقم حساب فريد من عدّاد السنة الحالية بعملية ذرية واحدة
+        واستعلام تحقق واحد للدفعة كلها (بدل تخمين عشوائي واستعلام لكل كود).
+        """
+        from datetime import datetime
+        from centers.sequences import allocate
+
+        current_year = datetime.now().year
+        codes = []
+        while len(codes) < count:
+            first, last = allocate(f"family:{current_year}", count - len(codes))
+            batch = [f"F-{current_year}-{_scramble_family_serial(n)}" for n in range(first, last + 1)]
+            # أكواد صدرت بمفتاح / تبديل سابق قد تتقاطع مع الجديدة — تُتخطى ويُحجز بدلها
+            taken = set()
+            for i in range(0, len(batch), 5000):
+                taken.update(Family.objects.filter(access_code__in=batch[i:i + 5000])
+                             .values_list('access_code', flat=True))
+            codes.extend(code for code in batch if code not in taken)
+        return codes
+
     def __str__(self):
         return f"{self.access_code} | {self.father_name} & {self.mother_name}"
 
 
-class Child(models.Model):
+class Child(VersionedModel):
     GENDER_CHOICES = (
         ('M', 'ذكر'),
         ('F', 'أنثى'),
@@ -124,6 +214,21 @@ class Child(models.Model):
     def __str__(self):
         return self.full_name
 
+    # الحقول التي تُحسب منها تقارير التغطية — تغيّر غيرها (الاسم مثلاً) لا يبطل كاشها (api/signals.py)
+    COVERAGE_FIELDS = ('health_center_id', 'is_completed', 'completed_date', 'date_of_birth')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # المركز كما قُرئ من قاعدة البيانات — لتحديث تجميع المركز السابق عند النقل (api/signals.py)
+        instance._loaded_center_id = instance.__dict__.get('health_center_id')
+        instance._loaded_coverage = instance.coverage_state()
+        return instance
+
+    def coverage_state(self):
+        """قيم COVERAGE_FIELDS المحمّلة (None للحقول المؤجلة)"""
+        return tuple(self.__dict__.get(field) for field in self.COVERAGE_FIELDS)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -154,6 +259,12 @@ class VaccineRecord(models.Model):
 
     class Meta:
         unique_together = ('child', 'vaccine', 'dose_number')
+        indexes = [
+            # تقارير التغطية على مستوى الجرعة (GROUP BY vaccine, dose_number)
+            models.Index(fields=['vaccine', 'dose_number'], name='record_vaccine_dose_idx'),
+            # تقرير الإنتاجية (مركز + فترة تاريخ)
+            models.Index(fields=['health_center', 'date_given'], name='record_center_date_idx'),
+        ]
         verbose_name = "سجل تطعيم"
         verbose_name_plural = "سجلات التطعيم"
 
@@ -172,4 +283,12 @@ class ChildVaccineSchedule(models.Model):
 
     class Meta:
         verbose_name = "استحقاق لقاح"
-        verbose_name_plural = "استحقاقات اللقاحات"
\ No newline at end of file
+        verbose_name_plural = "استحقاقات اللقاحات"
+        indexes = [
+            # فهرس جزئي للجرعات غير المأخوذة فقط (قائمة المتخلفين والتذكيرات حسب تاريخ الاستحقاق)
+            models.Index(
+                fields=['due_date', 'child'],
+                condition=models.Q(is_taken=False),
+                name='schedule_untaken_due_idx',
+            ),
+        ]
\ No newline at end of file
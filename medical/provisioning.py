@@ -0,0 +1,78 @@
+"""
+إنشاء حسابات العائلات في الخلفية بدلاً من طلب تسجيل الطفل.
+
+تجزئة كلمة المرور (PBKDF2) مكلفة (~100+ ms لكل حساب)، لذلك عند إنشاء عائلة
+نضع معرفها في طابور بعد نجاح الـ transaction، ويقوم thread خلفي واحد بإنشاء
+الحسابات على دفعات.
+
+الطابور في ذاكرة العامل فقط — يضيع إذا أُعيد تشغيل العامل قبل تفريغه. الاحتياط تمشيط دوري
+للعائلات بدون حساب: /api/cron/jobs/provision-family-accounts/ (CronJobView) كل 10 دقائق،
+يتجاهل العائلات الأحدث من SWEEP_MIN_AGE (ما زالت في الطابور) ويعالج حتى SWEEP_LIMIT عائلة.
+أقصى تأخير لحساب عائلة ضاع من الطابور: SWEEP_MIN_AGE + فترة الـ cron (~15 دقيقة)،
+ما لم يتجاوز عدد العائلات المعلقة SWEEP_LIMIT في كل تشغيل (الاستيراد الجماعي مثلاً —
+له الأمر provision_family_accounts بعدة عمليات).
+"""
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+# التمشيط الدوري (cron): عمر العائلة الأدنى بالثواني، وأقصى عدد حسابات لكل تشغيل
+# (~100ms تجزئة لكل حساب — التشغيل يبقى ضمن مهلة طلب HTTP)
+SWEEP_MIN_AGE = 5 * 60
+SWEEP_LIMIT = 100
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_worker = None
+
+
+def enqueue(family_ids):
+    """إضافة عائلات للطابور الخلفي (يُستدعى بعد commit)"""
+    family_ids = [pk for pk in family_ids if pk]
+    if not family_ids:
+        return
+    for pk in family_ids:
+        _queue.put(pk)
+    _ensure_worker()
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='family-provisioning', daemon=True)
+            _worker.start()
+
+
+def _drain():
+    ids = [_queue.get()]
+    while len(ids) < BATCH_SIZE:
+        try:
+            ids.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return ids
+
+
+def _run():
+    from .models import Family
+    from .services import provision_family_accounts
+
+    while True:
+        ids = _drain()
+        try:
+            close_old_connections()
+            families = Family.objects.filter(pk__in=ids, account__isnull=True)
+            provision_family_accounts(families)
+        except Exception:
+            logger.exception("Family account provisioning failed for %s families", len(ids))
+        finally:
+            connections.close_all()
+            for _ in ids:
+                _queue.task_done()
+
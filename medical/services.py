@@ -0,0 +1,304 @@
+"""
+خدمات السجلات الطبية — عمليات مجمّعة (set-based) بدلاً من العمل سطراً بسطر.
+تستخدمها الـ signals للحالة الفردية، وتستخدمها مسارات الإدخال الجماعي
+(الاستيراد، أوامر الإصلاح، البيانات التجريبية) عبر medical.batching.
+"""
+import logging
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .hashing import hash_passwords
+from .models import Child, ChildVaccineSchedule, Family, VaccineRecord, VaccineSchedule
+
+logger = logging.getLogger(__name__)
+
+# حجم الدفعة لاستعلامات IN و bulk_create (يبقى تحت حد متغيرات SQLite)
+CHUNK_SIZE = 5000
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def compute_due_date(date_of_birth, age_in_months):
+    """تاريخ الاستحقاق = الميلاد + الأشهر الكاملة + كسر الشهر (بالأيام)"""
+    months_int = int(age_in_months)
+    days_extra = int((age_in_months - months_int) * 30)
+    return date_of_birth + relativedelta(months=months_int) + timedelta(days=days_extra)
+
+
+def bulk_generate_schedules(children, standard_schedules=None):
+    """
+    إنشاء الجدول الشخصي (ChildVaccineSchedule) لمجموعة أطفال دفعة واحدة.
+    يتجاهل الأطفال الذين لديهم جدول مسبقاً أو بدون تاريخ ميلاد.
+    """
+    children = [c for c in children if c.pk and c.date_of_birth]
+    if not children:
+        return 0
+
+    if standard_schedules is None:
+        standard_schedules = list(VaccineSchedule.objects.all())
+    if not standard_schedules:
+        return 0
+
+    existing = set()
+    for chunk in _chunks([c.pk for c in children]):
+        existing.update(
+            ChildVaccineSchedule.objects.filter(child_id__in=chunk)
+            .values_list('child_id', flat=True).distinct()
+        )
+
+    personal_schedule_list = [
+        ChildVaccineSchedule(
+            child_id=child.pk,
+            vaccine_schedule=item,
+            due_date=compute_due_date(child.date_of_birth, item.age_in_months),
+            is_taken=False,
+        )
+        for child in children if child.pk not in existing
+        for item in standard_schedules
+    ]
+    ChildVaccineSchedule.objects.bulk_create(personal_schedule_list, batch_size=CHUNK_SIZE)
+    return len(personal_schedule_list)
+
+
+def _matching_record():
+    return VaccineRecord.objects.filter(
+        child_id=OuterRef('child_id'),
+        vaccine_id=OuterRef('vaccine_schedule__vaccine_id'),
+        dose_number=OuterRef('vaccine_schedule__dose_number'),
+    )
+
+
+def mark_taken_schedules(child_ids):
+    """is_taken = True لكل استحقاق له سجل تطعيم مطابق (لقاح + جرعة)"""
+    updated = 0
+    for chunk in _chunks(child_ids):
+        updated += ChildVaccineSchedule.objects.filter(
+            child_id__in=chunk, is_taken=False
+        ).filter(Exists(_matching_record())).update(is_taken=True)
+    return updated
+
+
+def revert_untaken_schedules(child_ids):
+    """is_taken = False لكل استحقاق حُذف سجل تطعيمه"""
+    updated = 0
+    for chunk in _chunks(child_ids):
+        updated += ChildVaccineSchedule.objects.filter(
+            child_id__in=chunk, is_taken=True
+        ).exclude(Exists(_matching_record())).update(is_taken=False)
+    return updated
+
+
+def recompute_completion(child_ids):
+    """
+    إعادة حساب is_completed لمجموعة أطفال باستعلامي UPDATE فقط:
+    مكتمل = لديه استحقاقات أساسية (BASIC) ولا يوجد منها غير مأخوذ.
+    """
+    today = timezone.now().date()
+    basic = ChildVaccineSchedule.objects.filter(child_id=OuterRef('pk'), vaccine_schedule__stage='BASIC')
+    pending = basic.filter(is_taken=False)
+
+    changed = 0
+    for chunk in _chunks(child_ids):
+        changed += Child.objects.filter(pk__in=chunk, is_completed=False)\
+            .filter(Exists(basic)).exclude(Exists(pending))\
+            .update(is_completed=True, completed_date=today)
+        changed += Child.objects.filter(pk__in=chunk, is_completed=True)\
+            .filter(Exists(pending))\
+            .update(is_completed=False, completed_date=None)
+    return changed
+
+
+def assign_centers_from_records(child_ids=None):
+    """
+    تعيين health_center للأطفال بدون مركز من أول جرعة مسجّلة بمركز — UPDATE واحد.
+    child_ids=None تعني كل الأطفال بدون مركز.
+    """
+    first_center = VaccineRecord.objects.filter(
+        child_id=OuterRef('pk'),
+        health_center__isnull=False,
+    ).order_by('date_given', 'id').values('health_center_id')[:1]
+
+    qs = Child.objects.filter(health_center__isnull=True).filter(Exists(first_center))
+    if child_ids is None:
+        return qs.update(health_center=Subquery(first_center), version=F('version') + 1)
+
+    updated = 0
+    for chunk in _chunks(child_ids):
+        updated += qs.filter(pk__in=chunk).update(health_center=Subquery(first_center), version=F('version') + 1)
+    return updated
+
+
+def bump_child_versions(child_ids):
+    """زيادة عداد النسخة (ETag) لأطفال تغيرت سجلاتهم أو جداولهم بعمليات update() جماعية"""
+    updated = 0
+    for chunk in _chunks(child_ids):
+        updated += Child.objects.filter(pk__in=chunk).update(version=F('version') + 1)
+    return updated
+
+
+def build_family_user(family, password_hash=None):
+    """
+    حساب العائلة (غير محفوظ):
+    اسم المستخدم = كود العائلة، كلمة المرور = كود العائلة
+    """
+    User = get_user_model()
+    name_parts = family.father_name.split()
+    return User(
+        username=family.access_code,
+        password=password_hash or make_password(family.access_code),
+        role='CUSTOMER',
+        first_name=name_parts[0] if name_parts else '',
+        last_name=name_parts[-1] if len(name_parts) > 1 else '',
+    )
+
+
+def provision_family_accounts(families, processes=1):
+    """
+    إنشاء حسابات العائلات دفعة واحدة (bulk_create) وربطها بالعائلة.
+    - مركز الحساب = مركز أول طفل في العائلة (كما يفعل تسجيل الطفل الفردي).
+    - تجزئة كلمات المرور (PBKDF2) تتم على process pool عند processes > 1.
+    - إذا وُجد مستخدم بنفس الكود مسبقاً (توقف سابق قبل الربط) نربطه فقط،
+      إلا إذا كان مربوطاً بعائلة أخرى — تُتخطى العائلة ويُسجل تحذير.
+    """
+    families = [f for f in families if f.pk and f.access_code and not f.account_id]
+    if not families:
+        return 0
+
+    User = get_user_model()
+    existing_users = {}
+    linked_user_ids = set()
+    centers = {}
+    for chunk in _chunks(families):
+        users = User.objects.filter(username__in=[f.access_code for f in chunk]).in_bulk(field_name='username')
+        existing_users.update(users)
+        linked_user_ids.update(
+            Family.objects.filter(account_id__in=[u.pk for u in users.values()]).values_list('account_id', flat=True)
+        )
+        for family_id, center_id in Child.objects.filter(
+            family_id__in=[f.pk for f in chunk], health_center__isnull=False
+        ).order_by('id').values_list('family_id', 'health_center_id'):
+            centers.setdefault(family_id, center_id)
+
+    conflicts = [f for f in families
+                 if f.access_code in existing_users and existing_users[f.access_code].pk in linked_user_ids]
+    if conflicts:
+        logger.warning(
+            "Skipped %s families whose access code is the username of another family's account: %s",
+            len(conflicts), ', '.join(f.access_code for f in conflicts[:20]),
+        )
+        skipped = {f.pk for f in conflicts}
+        families = [f for f in families if f.pk not in skipped]
+
+    new_families = [f for f in families if f.access_code not in existing_users]
+    hashes = hash_passwords([f.access_code for f in new_families], processes=processes)
+
+    users = []
+    for family, password_hash in zip(new_families, hashes):
+        user = build_family_user(family, password_hash=password_hash)
+        user.health_center_id = centers.get(family.pk)
+        users.append(user)
+    User.objects.bulk_create(users, batch_size=1000)
+
+    for family, user in zip(new_families, users):
+        family.account = user
+    for family in families:
+        if family.access_code in existing_users:
+            family.account = existing_users[family.access_code]
+    Family.objects.bulk_update(families, ['account'], batch_size=1000)
+    return len(users)
+
+
+def provision_pending_family_accounts(processes=None, batch_size=500, limit=None, min_age=None):
+    """
+    المسار الخلفي: إنشاء حسابات كل العائلات التي لم يُنشأ لها حساب بعد،
+    على دفعات، مع توزيع التجزئة على عدة عمليات.
+    min_age (ثوانٍ): تجاهل العائلات الأحدث — ما زالت في طابور medical.provisioning.
+    """
+    pending = Family.objects.filter(account__isnull=True)
+    if min_age:
+        pending = pending.filter(created_at__lte=timezone.now() - timedelta(seconds=min_age))
+    created = 0
+    last_id = 0
+    while limit is None or created < limit:
+        size = batch_size if limit is None else min(batch_size, limit - created)
+        families = list(pending.filter(pk__gt=last_id).order_by('pk')[:size])
+        if not families:
+            break
+        last_id = families[-1].pk
+        created += provision_family_accounts(families, processes=processes)
+    return created
+
+
+def send_visit_prompt(record, child=None, center=None):
+    """
+    إشعار FCM واحد لولي الأمر يخبره بإمكانية تقييم زيارة التطعيم
+    """
+    child = child or record.child
+    family = child.family
+    # نستخدم المركز المسجل في الجرعة (الجديد)، أو مركز الطفل كاحتياط
+    center = center or record.health_center or child.health_center
+
+    if not center or not family or not family.account:
+        return False
+
+    from notifications.services import FCMService
+
+    return FCMService.send_notification(
+        user=family.account,
+        title="تقييم زيارة التطعيم 🌟",
+        body=(
+            f"تم تسجيل تطعيمات لطفلك "
+            f"{child.full_name} في {center.name_ar}. "
+            f"شاركنا رأيك في الخدمة المقدمة!"
+        ),
+        notification_type='COMPLAINT_PROMPT',
+        data={
+            'type': 'COMPLAINT_PROMPT',
+            'vaccine_record_id': str(record.id),
+            'center_name': center.name_ar,
+            'child_name': child.full_name,
+        }
+    )
+
+
+def send_batched_visit_prompts(records):
+    """
+    إشعار واحد لكل طفل عن جرعات اليوم المسجّلة دفعة واحدة،
+    مع تجاهل الأطفال الذين سُجّلت لهم جرعات اليوم قبل الدفعة (أُرسل لهم مسبقاً).
+    """
+    today = timezone.now().date()
+    records = [r for r in records if r.pk and r.date_given == today]
+    if not records:
+        return 0
+
+    batch_ids = [r.pk for r in records]
+    child_ids = {r.child_id for r in records}
+    already_prompted = set()
+    for chunk in _chunks(child_ids):
+        already_prompted.update(
+            VaccineRecord.objects.filter(child_id__in=chunk, date_given=today)
+            .exclude(id__in=batch_ids).values_list('child_id', flat=True)
+        )
+
+    first_by_child = {}
+    for record in sorted(records, key=lambda r: r.pk):
+        if record.child_id not in already_prompted:
+            first_by_child.setdefault(record.child_id, record)
+
+    sent = 0
+    for chunk in _chunks([r.pk for r in first_by_child.values()]):
+        fresh = VaccineRecord.objects.filter(pk__in=chunk)\
+            .select_related('health_center', 'child__health_center', 'child__family__account')
+        for record in fresh:
+            if send_visit_prompt(record):
+                sent += 1
+    return sent
@@ -1,8 +1,13 @@
 from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from .models import Child, VaccineSchedule, ChildVaccineSchedule, Family, VaccineRecord
-from dateutil.relativedelta import relativedelta
-from datetime import timedelta
+from . import provisioning
+from .batching import current_batch
+from .services import (
+    bulk_generate_schedules, bump_child_versions, compute_due_date, provision_family_accounts, send_visit_prompt,
+)
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 @receiver(post_save, sender=Child)
@@ -10,35 +15,16 @@ def generate_child_schedule(sender, instance, created, **kwargs):
     """
     Generate vaccination schedule automatically when a new Child is created.
     This ensures logic is consistent across Admin, API, and Custom Views.
+    Inside deferred_signals() the child is queued and scheduled in one bulk insert.
     """
     if created:
-        # Check if schedules already exist (to avoid duplication if manually handled elsewhere)
-        if ChildVaccineSchedule.objects.filter(child=instance).exists():
+        batch = current_batch()
+        if batch is not None:
+            batch.add_children([instance])
             return
 
-        standard_schedules = VaccineSchedule.objects.all()
-        personal_schedule_list = []
-        
-        for item in standard_schedules:
-            # Calculate due date
-            months_int = int(item.age_in_months)
-            days_extra = int((item.age_in_months - months_int) * 30)
-            
-            # Use instance.date_of_birth
-            if instance.date_of_birth:
-                due_date = instance.date_of_birth + relativedelta(months=months_int) + timedelta(days=days_extra)
-                
-                personal_schedule_list.append(
-                    ChildVaccineSchedule(
-                        child=instance,
-                        vaccine_schedule=item,
-                        due_date=due_date,
-                        is_taken=False
-                    )
-                )
-        
-        if personal_schedule_list:
-            ChildVaccineSchedule.objects.bulk_create(personal_schedule_list)
+        # Skips children whose schedules already exist (manually handled elsewhere)
+        bulk_generate_schedules([instance])
 
 
 @receiver(post_save, sender=Family)
@@ -47,25 +33,33 @@ def create_family_user(sender, instance, created, **kwargs):
     إنشاء حساب مستخدم تلقائي للعائلة عند إنشائها.
     اسم المستخدم = كود العائلة
     كلمة المرور = كود العائلة
+
+    تجزئة كلمة المرور مكلفة، لذلك مع FAMILY_ACCOUNTS_ASYNC يُنشأ الحساب في الخلفية
+    عند تسجيل أول طفل للعائلة (queue_family_account) بدلاً من طلب التسجيل نفسه.
     """
-    if created and not instance.account:
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        # إنشاء المستخدم
-        if instance.access_code:
-            user = User.objects.create_user(
-                username=instance.access_code,
-                password=instance.access_code,
-                role='CUSTOMER',  # دور جديد للأهالي
-                
-                first_name=instance.father_name.split()[0], # الاسم الأول للأب
-                last_name=instance.father_name.split()[-1] if len(instance.father_name.split()) > 1 else ""
-            )
-            
-            # ربط الحساب بالعائلة
-            instance.account = user
-            instance.save()
+    if created and not instance.account and instance.access_code:
+        batch = current_batch()
+        if batch is not None:
+            batch.add_families([instance])
+            return
+
+        if not getattr(settings, 'FAMILY_ACCOUNTS_ASYNC', True):
+            provision_family_accounts([instance])
+
+
+@receiver(post_save, sender=Child)
+def queue_family_account(sender, instance, created, **kwargs):
+    """
+    حساب العائلة يُنشأ في الخلفية بعد نجاح الـ transaction الذي أُدرج فيه الطفل —
+    لا بعد إدراج العائلة — حتى يجد مركز الطفل ليكون مركز الحساب.
+    العائلات بلا أطفال يلتقطها الأمر provision_family_accounts.
+    """
+    if not created or current_batch() is not None or not getattr(settings, 'FAMILY_ACCOUNTS_ASYNC', True):
+        return
+    family = instance.family
+    if family.account_id is None and family.access_code:
+        family_id = family.pk
+        transaction.on_commit(lambda: provisioning.enqueue([family_id]))
 
 
 @receiver(post_save, sender=VaccineRecord)
@@ -77,6 +71,11 @@ def sync_vaccine_record_to_child(sender, instance, created, **kwargs):
     3. نتحقق ما إذا كان الطفل قد أكمل جميع التلقيحات الأساسية (BASIC)
     4. إذا أكمل الأساسي، نحدّث حالة الطفل (is_completed = True)
     """
+    batch = current_batch()
+    if batch is not None:
+        batch.add_records([instance], created=created)
+        return
+
     child = instance.child
     vaccine = instance.vaccine
     dose = instance.dose_number
@@ -122,6 +121,11 @@ def handle_vaccine_record_deletion(sender, instance, **kwargs):
     """
     عند حذف سجل تطعيم بالخطأ، نعيد حالة الجدول للطفل كغير مكتمل
     """
+    batch = current_batch()
+    if batch is not None:
+        batch.add_deleted_records([instance])
+        return
+
     child = instance.child
     vaccine = instance.vaccine
     dose = instance.dose_number
@@ -148,6 +152,18 @@ def handle_vaccine_record_deletion(sender, instance, **kwargs):
             child.completed_date = None
             child.save(update_fields=['is_completed', 'completed_date'])
 
+@receiver(post_save, sender=VaccineRecord)
+@receiver(post_delete, sender=VaccineRecord)
+@receiver(post_save, sender=ChildVaccineSchedule)
+def bump_child_version(sender, instance, **kwargs):
+    """
+    تغيير سجلات الطفل أو جدوله يغير بيانات صفحته — نزيد عداد النسخة حتى يتغير الـ ETag.
+    داخل deferred_signals() تتم الزيادة مرة واحدة لكل طفل عند تطبيق الدفعة.
+    """
+    if current_batch() is None:
+        bump_child_versions([instance.child_id])
+
+
 @receiver(post_save, sender=VaccineSchedule)
 def backfill_vaccine_schedule(sender, instance, created, **kwargs):
     """
@@ -157,16 +173,13 @@ def backfill_vaccine_schedule(sender, instance, created, **kwargs):
     """
     if created:
         today = timezone.now().date()
-        months_int = int(instance.age_in_months)
-        days_extra = int((instance.age_in_months - months_int) * 30)
-        
         personal_schedule_list = []
         
         # جلب جميع الأطفال الذين لديهم تاريخ ميلاد
-        children = Child.objects.filter(date_of_birth__isnull=False)
+        children = Child.objects.filter(date_of_birth__isnull=False).only('id', 'date_of_birth')
         
         for child in children:
-            due_date = child.date_of_birth + relativedelta(months=months_int) + timedelta(days=days_extra)
+            due_date = compute_due_date(child.date_of_birth, instance.age_in_months)
             
             # إذا كان تاريخ الاستحقاق اليوم أو في المستقبل (أي أن الطفل لم يتجاوز العمر المطلوب)
             if due_date >= today:
@@ -181,7 +194,7 @@ def backfill_vaccine_schedule(sender, instance, created, **kwargs):
                 
         # حفظ السجلات دفعة واحدة في قاعدة البيانات لتحسين الأداء
         if personal_schedule_list:
-            ChildVaccineSchedule.objects.bulk_create(personal_schedule_list)
+            ChildVaccineSchedule.objects.bulk_create(personal_schedule_list, batch_size=5000)
 
 
 @receiver(post_delete, sender=Child)
@@ -227,15 +240,12 @@ def send_complaint_notification(sender, instance, created, **kwargs):
     if not created:
         return
 
-    child = instance.child
-    family = child.family
-
-    # نستخدم المركز المسجل في الجرعة (الجديد)، أو مركز الطفل كاحتياط
-    center = instance.health_center or child.health_center
-
-    if not center or not family or not family.account:
+    # داخل deferred_signals() تُرسل الإشعارات مجمّعة عند الخروج من الكتلة
+    if current_batch() is not None:
         return
 
+    child = instance.child
+
     # التأكد من عدم إرسال إشعارات متكررة لنفس الطفل في نفس اليوم
     today = timezone.now().date()
     other_records_today = VaccineRecord.objects.filter(
@@ -246,21 +256,4 @@ def send_complaint_notification(sender, instance, created, **kwargs):
     if other_records_today:
         return  # تم إرسال إشعار مسبقاً للجرعة الأولى اليوم
 
-    from notifications.services import FCMService
-
-    FCMService.send_notification(
-        user=family.account,
-        title="تقييم زيارة التطعيم 🌟",
-        body=(
-            f"تم تسجيل تطعيمات لطفلك "
-            f"{child.full_name} في {center.name_ar}. "
-            f"شاركنا رأيك في الخدمة المقدمة!"
-        ),
-        notification_type='COMPLAINT_PROMPT',
-        data={
-            'type': 'COMPLAINT_PROMPT',
-            'vaccine_record_id': str(instance.id),
-            'center_name': center.name_ar,
-            'child_name': child.full_name,
-        }
-    )
+    send_visit_prompt(instance, child=child)
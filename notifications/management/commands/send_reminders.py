@@ -4,6 +4,7 @@ from datetime import timedelta
 from collections import defaultdict
 from medical.models import ChildVaccineSchedule
 from notifications.services import FCMService
+from core.metrics import track_job
 
 
 def age_to_arabic(age_in_months: float) -> str:
@@ -42,6 +43,7 @@ def age_to_arabic(age_in_months: float) -> str:
 class Command(BaseCommand):
     help = 'Sends vaccination reminders (3, 2, 1 days before) and missed alerts (1 day after)'
 
+    @track_job('send_reminders')
     def handle(self, *args, **options):
         self.stdout.write("Starting notification engine...")
         today = timezone.now().date()
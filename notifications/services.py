@@ -3,6 +3,8 @@ import firebase_admin
 from firebase_admin import credentials, messaging
 from django.conf import settings
 import os
+from core.metrics import count_fcm
+
 from .models import NotificationLog
 
 logger = logging.getLogger(__name__)
@@ -36,6 +38,7 @@ class FCMService:
             NotificationLog.objects.create(recipient=user, title=title, body=body, 
                                          notification_type=notification_type, sent_via_fcm=False, 
                                          fcm_response="No FCM Token")
+            count_fcm(notification_type, 'no_token')
             return False
 
         # نحاول تشغيل فايربيز الآن فقط (عند الإرسال)
@@ -67,12 +70,14 @@ class FCMService:
                 NotificationLog.objects.create(recipient=user, title=title, body=body, 
                                              notification_type=notification_type, sent_via_fcm=True, 
                                              fcm_response=f"Success: {response}")
+                count_fcm(notification_type, 'sent')
                 return True
             except Exception as e:
                 logger.error(f"FCM Send Error: {e}")
                 NotificationLog.objects.create(recipient=user, title=title, body=body, 
                                              notification_type=notification_type, sent_via_fcm=False, 
                                              fcm_response=f"Error: {str(e)}")
+                count_fcm(notification_type, 'failed')
                 return False
         
         # وضع المحاكاة إذا فشل الاتصال بفايربيز
@@ -80,6 +85,7 @@ class FCMService:
         NotificationLog.objects.create(recipient=user, title=title, body=body, 
                                      notification_type=notification_type, sent_via_fcm=True, 
                                      fcm_response="Simulated (Check Credentials)")
+        count_fcm(notification_type, 'simulated')
         return True
 
     @staticmethod